@@ -1,17 +1,17 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
-from .models import CustomUser
+from .models import PERMISSION_FIELDS, CustomUser, PermissionProfile
 
 
 @admin.register(CustomUser)
 class CustomUserAdmin(UserAdmin):
-    list_display = ['username', 'email', 'role', 'phone', 'is_active', 'created_at']
-    list_filter = ['role', 'is_active', 'can_add_product', 'can_create_invoice', 'can_manage_users']
+    list_display = ['username', 'email', 'role', 'permission_profile', 'phone', 'is_active', 'created_at']
+    list_filter = ['role', 'permission_profile', 'is_active', 'can_add_product', 'can_create_invoice', 'can_manage_users']
     search_fields = ['username', 'email', 'phone']
     
     fieldsets = UserAdmin.fieldsets + (
         ('Role & Contact', {
-            'fields': ('role', 'phone')
+            'fields': ('role', 'phone', 'permission_profile')
         }),
         ('Inventory Permissions', {
             'fields': (
@@ -65,3 +65,15 @@ class CustomUserAdmin(UserAdmin):
             'fields': ('can_manage_users',),
         }),
     )
+
+
+@admin.register(PermissionProfile)
+class PermissionProfileAdmin(admin.ModelAdmin):
+    list_display = ['name', 'description', 'updated_at']
+    search_fields = ['name']
+    fields = ['name', 'description'] + PERMISSION_FIELDS
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if change:
+            obj.sync_users()
@@ -0,0 +1,9 @@
+from .permissions import PermissionSet
+
+
+def permissions(request):
+    """Expose the current user's resolved permissions as {{ user_perms.can_... }}."""
+    user = getattr(request, 'user', None)
+    if user is None:
+        return {}
+    return {'user_perms': PermissionSet(user)}
@@ -0,0 +1,30 @@
+from functools import wraps
+
+from django.contrib import messages
+from django.contrib.auth.decorators import login_required
+from django.shortcuts import redirect
+
+from .permissions import has_permission
+
+
+def permission_required(permission_attr, redirect_url='dashboard'):
+    """Decorator to check user permissions"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if has_permission(request.user, permission_attr):
+                return view_func(request, *args, **kwargs)
+            messages.error(request, 'You do not have permission to access this page.')
+            return redirect(redirect_url)
+        return login_required(wrapper)
+    return decorator
+
+
+def admin_required(view_func):
+    def wrapper(request, *args, **kwargs):
+        if not request.user.is_admin():
+            messages.error(request, 'You do not have permission to access this page.')
+            return redirect('dashboard')
+        return view_func(request, *args, **kwargs)
+    wrapper.__name__ = view_func.__name__
+    return login_required(wrapper)
@@ -1,6 +1,6 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm, AuthenticationForm
-from .models import CustomUser
+from .models import PERMISSION_FIELDS, CustomUser, PermissionProfile
 
 
 class CustomAuthenticationForm(AuthenticationForm):
@@ -40,3 +40,13 @@ class CustomUserUpdateForm(forms.ModelForm):
             'role': forms.Select(attrs={'class': 'form-select'}),
             'is_active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
+
+
+class PermissionProfileForm(forms.ModelForm):
+    class Meta:
+        model = PermissionProfile
+        fields = ['name', 'description'] + PERMISSION_FIELDS
+        widgets = {
+            'name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g. Cashier'}),
+            'description': forms.TextInput(attrs={'class': 'form-control'}),
+        }
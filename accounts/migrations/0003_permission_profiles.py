@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+DEFAULT_PROFILES = [
+    ('Cashier', 'Till operators: create invoices and look up customers', {
+        'can_view_inventory': True, 'can_view_billing': True,
+        'can_create_invoice': True, 'can_manage_customers': True,
+    }),
+    ('Stock Clerk', 'Receive and count stock, maintain the catalog', {
+        'can_view_inventory': True, 'can_add_product': True, 'can_edit_product': True,
+        'can_adjust_stock': True, 'can_view_billing': False, 'can_create_invoice': False,
+        'can_manage_customers': False,
+    }),
+    ('Store Manager', 'Everything except user management', {
+        'can_view_inventory': True, 'can_add_product': True, 'can_edit_product': True,
+        'can_delete_product': True, 'can_manage_categories': True, 'can_adjust_stock': True,
+        'can_view_billing': True, 'can_create_invoice': True, 'can_cancel_invoice': True,
+        'can_manage_customers': True,
+    }),
+]
+
+
+def create_default_profiles(apps, schema_editor):
+    PermissionProfile = apps.get_model('accounts', 'PermissionProfile')
+    for name, description, flags in DEFAULT_PROFILES:
+        PermissionProfile.objects.get_or_create(name=name, defaults={'description': description, **flags})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_customuser_can_add_product_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PermissionProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('description', models.CharField(blank=True, max_length=200)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('can_view_inventory', models.BooleanField(default=True, verbose_name='Can View Inventory')),
+                ('can_add_product', models.BooleanField(default=False, verbose_name='Can Add Product')),
+                ('can_edit_product', models.BooleanField(default=False, verbose_name='Can Edit Product')),
+                ('can_delete_product', models.BooleanField(default=False, verbose_name='Can Delete Product')),
+                ('can_manage_categories', models.BooleanField(default=False, verbose_name='Can Manage Categories')),
+                ('can_adjust_stock', models.BooleanField(default=False, verbose_name='Can Adjust Stock')),
+                ('can_view_billing', models.BooleanField(default=True, verbose_name='Can View Billing')),
+                ('can_create_invoice', models.BooleanField(default=True, verbose_name='Can Create Invoice')),
+                ('can_cancel_invoice', models.BooleanField(default=False, verbose_name='Can Cancel Invoice')),
+                ('can_manage_customers', models.BooleanField(default=True, verbose_name='Can Manage Customers')),
+                ('can_manage_users', models.BooleanField(default=False, verbose_name='Can Manage Users')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='permission_profile',
+            field=models.ForeignKey(blank=True, help_text='Blank means the permissions below were set individually', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='users', to='accounts.permissionprofile'),
+        ),
+        migrations.RunPython(create_default_profiles, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,82 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from audit import recorder as audit
+
+PERMISSION_FIELDS = [
+    'can_view_inventory',
+    'can_add_product',
+    'can_edit_product',
+    'can_delete_product',
+    'can_manage_categories',
+    'can_adjust_stock',
+    'can_view_billing',
+    'can_create_invoice',
+    'can_cancel_invoice',
+    'can_manage_customers',
+    'can_manage_users',
+]
+
+
+class PermissionProfile(models.Model):
+    """
+    A named set of permissions (e.g. Cashier, Store Manager). The flags are
+    copied onto every assigned user, so permission checks never need a join.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    description = models.CharField(max_length=200, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    # Inventory Permissions
+    can_view_inventory = models.BooleanField(default=True, verbose_name="Can View Inventory")
+    can_add_product = models.BooleanField(default=False, verbose_name="Can Add Product")
+    can_edit_product = models.BooleanField(default=False, verbose_name="Can Edit Product")
+    can_delete_product = models.BooleanField(default=False, verbose_name="Can Delete Product")
+    can_manage_categories = models.BooleanField(default=False, verbose_name="Can Manage Categories")
+    can_adjust_stock = models.BooleanField(default=False, verbose_name="Can Adjust Stock")
+
+    # Billing Permissions
+    can_view_billing = models.BooleanField(default=True, verbose_name="Can View Billing")
+    can_create_invoice = models.BooleanField(default=True, verbose_name="Can Create Invoice")
+    can_cancel_invoice = models.BooleanField(default=False, verbose_name="Can Cancel Invoice")
+    can_manage_customers = models.BooleanField(default=True, verbose_name="Can Manage Customers")
+
+    # User Management Permissions
+    can_manage_users = models.BooleanField(default=False, verbose_name="Can Manage Users")
+
+    class Meta:
+        ordering = ['name']
+
+    def __str__(self):
+        return self.name
+
+    def flags(self):
+        return {field: getattr(self, field) for field in PERMISSION_FIELDS}
+
+    def assign(self, users):
+        """
+        Give this profile to a queryset of users with a single UPDATE.
+        Returns the number of users updated.
+        """
+        from .permissions import invalidate_users
+
+        flags = self.flags()
+        before = {row.pop('pk'): row for row in users.values('pk', 'permission_profile_id', *PERMISSION_FIELDS)}
+        count = CustomUser.objects.filter(pk__in=before).update(permission_profile=self, **flags)
+        invalidate_users(list(before))
+
+        after = {'permission_profile_id': self.pk, **flags}
+        audit.record_many('bulk', CustomUser, {
+            user_id: {field: [old[field], after[field]] for field in after if old[field] != after[field]}
+            for user_id, old in before.items()
+        })
+        return count
+
+    def sync_users(self):
+        """Push the current flags to everyone holding this profile."""
+        return self.assign(self.users.all())
+
 
 class CustomUser(AbstractUser):
     ROLE_CHOICES = [
@@ -10,6 +86,14 @@ class CustomUser(AbstractUser):
 
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='staff')
     phone = models.CharField(max_length=15, blank=True)
+    permission_profile = models.ForeignKey(
+        PermissionProfile,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='users',
+        help_text='Blank means the permissions below were set individually'
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -0,0 +1,147 @@
+"""
+Cached user and permission resolution.
+
+The stock AuthenticationMiddleware loads the whole CustomUser row on every
+request. CachedAuthenticationMiddleware keeps the user, plus a compact bitset
+of its can_* flags, in the shared cache under a per-user version that is
+bumped whenever the user, their groups or their user_permissions change.
+Bulk profile assignments bump the versions directly via invalidate_users().
+"""
+import time
+
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.core.cache import cache
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils.crypto import constant_time_compare
+from django.utils.functional import SimpleLazyObject
+
+from .models import PERMISSION_FIELDS, CustomUser
+
+PERMISSION_BITS = {name: 1 << i for i, name in enumerate(PERMISSION_FIELDS)}
+ADMIN_BIT = 1 << len(PERMISSION_FIELDS)
+
+
+def permission_bits(user):
+    bits = ADMIN_BIT if user.is_admin() else 0
+    for name, bit in PERMISSION_BITS.items():
+        if getattr(user, name, False):
+            bits |= bit
+    return bits
+
+
+def user_permission_bits(user):
+    """The user's bitset, computed at most once per user object."""
+    if not user.is_authenticated:
+        return 0
+    bits = getattr(user, '_permission_bits', None)
+    if bits is None:
+        bits = user._permission_bits = permission_bits(user)
+    return bits
+
+
+def has_permission(user, permission_attr):
+    """Admins have all permissions; everyone else needs the flag set."""
+    if not user.is_authenticated:
+        return False
+    bits = user_permission_bits(user)
+    if bits & ADMIN_BIT:
+        return True
+    bit = PERMISSION_BITS.get(permission_attr)
+    if bit is None:
+        return bool(getattr(user, permission_attr, False))
+    return bool(bits & bit)
+
+
+def _version_key(user_id):
+    return f'accounts:user:{user_id}:version'
+
+
+def user_version(user_id):
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        # A fresh version never matches entries written before an eviction
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_user(user_id):
+    cache.set(_version_key(user_id), time.time_ns(), None)
+
+
+def invalidate_users(user_ids):
+    """Bump many users at once, e.g. after a queryset update()."""
+    version = time.time_ns()
+    cache.set_many({_version_key(user_id): version for user_id in user_ids}, None)
+
+
+class PermissionSet:
+    """Template-friendly view of a user's permission bitset: perms.can_add_product."""
+
+    def __init__(self, user):
+        self.user = user
+
+    def __getitem__(self, name):
+        if name == 'is_admin':
+            return bool(user_permission_bits(self.user) & ADMIN_BIT)
+        if name not in PERMISSION_BITS:
+            raise KeyError(name)
+        return has_permission(self.user, name)
+
+
+def get_cached_user(request):
+    timeout = settings.USER_CACHE_SECONDS
+    session = request.session
+    try:
+        user_id = CustomUser._meta.pk.to_python(session[SESSION_KEY])
+        backend_path = session[BACKEND_SESSION_KEY]
+    except KeyError:
+        return auth.get_user(request)
+    if not timeout or backend_path not in settings.AUTHENTICATION_BACKENDS:
+        return auth.get_user(request)
+
+    key = f'accounts:user:{user_id}:{user_version(user_id)}'
+    cached = cache.get(key)
+    if cached is None:
+        user = auth.get_user(request)
+        if user.is_authenticated:
+            cache.set(key, (user, permission_bits(user)), timeout)
+        return user
+
+    user, bits = cached
+    session_hash = session.get(HASH_SESSION_KEY)
+    if not user.is_active or not session_hash or not constant_time_compare(
+        session_hash, user.get_session_auth_hash()
+    ):
+        # Let Django handle password changes and deactivation (flushes the session)
+        return auth.get_user(request)
+    user._permission_bits = bits
+    return user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: get_cached_user(request))
+
+
+@receiver([post_save, post_delete], sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    invalidate_user(instance.pk)
+
+
+@receiver(m2m_changed, sender=CustomUser.groups.through)
+@receiver(m2m_changed, sender=CustomUser.user_permissions.through)
+def user_relations_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not action.startswith('post_'):
+        return
+    if reverse:
+        for user_id in pk_set or ():
+            invalidate_user(user_id)
+    else:
+        invalidate_user(instance.pk)
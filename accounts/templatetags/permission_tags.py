@@ -1,3 +1,5 @@
+import builtins
+
 from django import template
 
 register = template.Library()
@@ -5,4 +7,4 @@ register = template.Library()
 @register.filter
 def getattr(obj, attr):
     """Get attribute from object dynamically"""
-    return getattr(obj, attr, False)
+    return builtins.getattr(obj, attr, False)
@@ -9,4 +9,9 @@ urlpatterns = [
     path('users/<int:pk>/edit/', views.user_edit, name='user_edit'),
     path('users/<int:pk>/delete/', views.user_delete, name='user_delete'),
     path('users/<int:pk>/permissions/', views.user_permissions, name='user_permissions'),
+    path('users/assign-profile/', views.user_bulk_assign_profile, name='user_bulk_assign_profile'),
+    path('profiles/', views.permission_profile_list, name='permission_profile_list'),
+    path('profiles/create/', views.permission_profile_create, name='permission_profile_create'),
+    path('profiles/<int:pk>/edit/', views.permission_profile_edit, name='permission_profile_edit'),
+    path('profiles/<int:pk>/delete/', views.permission_profile_delete, name='permission_profile_delete'),
 ]
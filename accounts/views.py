@@ -3,8 +3,12 @@ from django.contrib.auth import login, logout
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.views.decorators.http import require_POST
-from .models import CustomUser
-from .forms import CustomAuthenticationForm, CustomUserCreationForm, CustomUserUpdateForm
+from django.db.models import Count
+from .decorators import admin_required
+from .models import PERMISSION_FIELDS, CustomUser, PermissionProfile
+from .forms import (
+    CustomAuthenticationForm, CustomUserCreationForm, CustomUserUpdateForm, PermissionProfileForm
+)
 
 
 def login_view(request):
@@ -31,20 +35,13 @@ def logout_view(request):
     return redirect('login')
 
 
-def admin_required(view_func):
-    def wrapper(request, *args, **kwargs):
-        if not request.user.is_admin():
-            messages.error(request, 'You do not have permission to access this page.')
-            return redirect('dashboard')
-        return view_func(request, *args, **kwargs)
-    wrapper.__name__ = view_func.__name__
-    return login_required(wrapper)
-
-
 @admin_required
 def user_list(request):
-    users = CustomUser.objects.all().order_by('-created_at')
-    return render(request, 'accounts/user_list.html', {'users': users})
+    users = CustomUser.objects.select_related('permission_profile').order_by('-created_at')
+    return render(request, 'accounts/user_list.html', {
+        'users': users,
+        'profiles': PermissionProfile.objects.all(),
+    })
 
 
 @admin_required
@@ -89,43 +86,48 @@ def user_delete(request, pk):
     return redirect('user_list')
 
 
+INVENTORY_PERMISSIONS = [
+    ('can_view_inventory', 'View Inventory', 'View products and categories'),
+    ('can_add_product', 'Add Product', 'Create new products'),
+    ('can_edit_product', 'Edit Product', 'Edit existing products'),
+    ('can_delete_product', 'Delete Product', 'Delete products'),
+    ('can_manage_categories', 'Manage Categories', 'Add, edit, delete categories'),
+    ('can_adjust_stock', 'Adjust Stock', 'Adjust product stock levels'),
+]
+
+BILLING_PERMISSIONS = [
+    ('can_view_billing', 'View Billing', 'View invoices and customers'),
+    ('can_create_invoice', 'Create Invoice', 'Create new invoices'),
+    ('can_cancel_invoice', 'Cancel Invoice', 'Cancel existing invoices'),
+    ('can_manage_customers', 'Manage Customers', 'Add, edit, delete customers'),
+]
+
+USER_PERMISSIONS = [
+    ('can_manage_users', 'Manage Users', 'Access user management'),
+]
+
+PERMISSION_CONTEXT = {
+    'inventory_permissions': INVENTORY_PERMISSIONS,
+    'billing_permissions': BILLING_PERMISSIONS,
+    'user_permissions_list': USER_PERMISSIONS,
+}
+
+
 @admin_required
 def user_permissions(request, pk):
     user = get_object_or_404(CustomUser, pk=pk)
 
-    # Define all permission fields
-    inventory_permissions = [
-        ('can_view_inventory', 'View Inventory', 'View products and categories'),
-        ('can_add_product', 'Add Product', 'Create new products'),
-        ('can_edit_product', 'Edit Product', 'Edit existing products'),
-        ('can_delete_product', 'Delete Product', 'Delete products'),
-        ('can_manage_categories', 'Manage Categories', 'Add, edit, delete categories'),
-        ('can_adjust_stock', 'Adjust Stock', 'Adjust product stock levels'),
-    ]
-
-    billing_permissions = [
-        ('can_view_billing', 'View Billing', 'View invoices and customers'),
-        ('can_create_invoice', 'Create Invoice', 'Create new invoices'),
-        ('can_cancel_invoice', 'Cancel Invoice', 'Cancel existing invoices'),
-        ('can_manage_customers', 'Manage Customers', 'Add, edit, delete customers'),
-    ]
-
-    user_permissions_list = [
-        ('can_manage_users', 'Manage Users', 'Access user management'),
-    ]
-
     if request.method == 'POST':
-        # Update inventory permissions
-        for field, _, _ in inventory_permissions:
-            setattr(user, field, field in request.POST)
+        if request.POST.get('profile'):
+            profile = get_object_or_404(PermissionProfile, pk=request.POST['profile'])
+            profile.assign(CustomUser.objects.filter(pk=user.pk))
+            messages.success(request, f'{profile.name} profile applied to {user.username}.')
+            return redirect('user_permissions', pk=pk)
 
-        # Update billing permissions
-        for field, _, _ in billing_permissions:
-            setattr(user, field, field in request.POST)
-
-        # Update user management permissions
-        for field, _, _ in user_permissions_list:
+        for field in PERMISSION_FIELDS:
             setattr(user, field, field in request.POST)
+        # Individually edited permissions no longer follow a profile
+        user.permission_profile = None
 
         user.save()
         messages.success(request, f'Permissions updated for {user.username}.')
@@ -133,8 +135,71 @@ def user_permissions(request, pk):
 
     context = {
         'edit_user': user,
-        'inventory_permissions': inventory_permissions,
-        'billing_permissions': billing_permissions,
-        'user_permissions_list': user_permissions_list,
+        'profiles': PermissionProfile.objects.all(),
+        **PERMISSION_CONTEXT,
     }
     return render(request, 'accounts/user_permissions.html', context)
+
+
+@admin_required
+@require_POST
+def user_bulk_assign_profile(request):
+    profile = get_object_or_404(PermissionProfile, pk=request.POST.get('profile'))
+    user_ids = request.POST.getlist('user_ids')
+    if not user_ids:
+        messages.error(request, 'Select at least one user.')
+    else:
+        count = profile.assign(CustomUser.objects.filter(pk__in=user_ids))
+        messages.success(request, f'{profile.name} profile assigned to {count} users.')
+    return redirect('user_list')
+
+
+@admin_required
+def permission_profile_list(request):
+    profiles = PermissionProfile.objects.annotate(user_count=Count('users'))
+    return render(request, 'accounts/permission_profile_list.html', {'profiles': profiles})
+
+
+@admin_required
+def permission_profile_create(request):
+    if request.method == 'POST':
+        form = PermissionProfileForm(request.POST)
+        if form.is_valid():
+            form.save()
+            messages.success(request, 'Permission profile created successfully.')
+            return redirect('permission_profile_list')
+    else:
+        form = PermissionProfileForm()
+
+    return render(request, 'accounts/permission_profile_form.html', {
+        'form': form, 'title': 'Create Permission Profile', **PERMISSION_CONTEXT
+    })
+
+
+@admin_required
+def permission_profile_edit(request, pk):
+    profile = get_object_or_404(PermissionProfile, pk=pk)
+
+    if request.method == 'POST':
+        form = PermissionProfileForm(request.POST, instance=profile)
+        if form.is_valid():
+            profile = form.save()
+            count = profile.sync_users()
+            messages.success(request, f'Profile updated and applied to {count} users.')
+            return redirect('permission_profile_list')
+    else:
+        form = PermissionProfileForm(instance=profile)
+
+    return render(request, 'accounts/permission_profile_form.html', {
+        'form': form, 'profile': profile, 'title': 'Edit Permission Profile', **PERMISSION_CONTEXT
+    })
+
+
+@admin_required
+@require_POST
+def permission_profile_delete(request, pk):
+    profile = get_object_or_404(PermissionProfile, pk=pk)
+    # Users keep their current flags and become individually managed
+    profile.delete()
+    messages.success(request, 'Permission profile deleted.')
+    return redirect('permission_profile_list')
@@ -0,0 +1,16 @@
+from django.contrib import admin
+from .models import AuditEntry
+
+
+@admin.register(AuditEntry)
+class AuditEntryAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'actor_name', 'action', 'model', 'object_id', 'object_repr']
+    list_filter = ['action', 'model', 'created_at']
+    search_fields = ['object_id', 'object_repr', 'actor_name']
+    date_hierarchy = 'created_at'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
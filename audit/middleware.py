@@ -0,0 +1,15 @@
+from .recorder import _current_request
+
+
+class AuditContextMiddleware:
+    """Make the current request (and so its user) visible to audit signals."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = _current_request.set(request)
+        try:
+            return self.get_response(request)
+        finally:
+            _current_request.reset(token)
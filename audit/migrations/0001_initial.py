@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:15
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField()),
+                ('actor_name', models.CharField(blank=True, max_length=150)),
+                ('action', models.CharField(choices=[('create', 'Created'), ('update', 'Updated'), ('delete', 'Deleted'), ('bulk', 'Bulk update')], max_length=10)),
+                ('model', models.CharField(help_text='app_label.model_name', max_length=100)),
+                ('object_id', models.CharField(blank=True, max_length=64)),
+                ('object_repr', models.CharField(blank=True, max_length=200)),
+                ('changes', models.JSONField(default=dict, help_text='{field: [old, new]}')),
+                ('path', models.CharField(blank=True, max_length=255)),
+                ('actor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name_plural': 'Audit entries',
+                'ordering': ['-created_at', '-id'],
+                'indexes': [models.Index(fields=['created_at'], name='audit_created_idx'), models.Index(fields=['model', 'object_id', 'created_at'], name='audit_object_idx'), models.Index(fields=['actor', 'created_at'], name='audit_actor_idx'), models.Index(fields=['action', 'created_at'], name='audit_action_idx')],
+            },
+        ),
+    ]
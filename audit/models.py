@@ -0,0 +1,41 @@
+from django.conf import settings
+from django.db import models
+
+
+class AuditEntry(models.Model):
+    """One change to a business record: who, when, what and the field diff."""
+    ACTION_CHOICES = [
+        ('create', 'Created'),
+        ('update', 'Updated'),
+        ('delete', 'Deleted'),
+        ('bulk', 'Bulk update'),
+    ]
+
+    created_at = models.DateTimeField()
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+    actor_name = models.CharField(max_length=150, blank=True)
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    model = models.CharField(max_length=100, help_text='app_label.model_name')
+    object_id = models.CharField(max_length=64, blank=True)
+    object_repr = models.CharField(max_length=200, blank=True)
+    changes = models.JSONField(default=dict, help_text='{field: [old, new]}')
+    path = models.CharField(max_length=255, blank=True)
+
+    class Meta:
+        ordering = ['-created_at', '-id']
+        verbose_name_plural = 'Audit entries'
+        indexes = [
+            models.Index(fields=['created_at'], name='audit_created_idx'),
+            models.Index(fields=['model', 'object_id', 'created_at'], name='audit_object_idx'),
+            models.Index(fields=['actor', 'created_at'], name='audit_actor_idx'),
+            models.Index(fields=['action', 'created_at'], name='audit_action_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_action_display()} {self.model} #{self.object_id} by {self.actor_name or 'system'}"
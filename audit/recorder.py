@@ -0,0 +1,223 @@
+"""
+Asynchronous, batched audit writer.
+
+Audit entries are built in the request thread but written by a background
+thread that drains a bounded in-process queue with bulk_create, so POS
+actions never wait on an extra INSERT. Entries are only queued once the
+surrounding transaction commits. When the queue is full the entry is
+written synchronously instead of being dropped, which bounds memory without
+losing history. Whatever is still queued at interpreter exit is flushed.
+
+A failed write (database restart, dropped pooled connection) is retried on
+a fresh connection with backoff. If the batch still fails, entries are
+written one by one, and any that cannot be written go to a JSON-lines
+dead-letter file (AUDIT_DEAD_LETTER_FILE) rather than being discarded.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_current_request = contextvars.ContextVar('audit_request', default=None)
+
+
+class AuditWriter:
+    WRITE_ATTEMPTS = 3
+    RETRY_DELAY = 0.5  # seconds, doubled after each failed attempt
+
+    def __init__(self, max_size=10000, batch_size=500, flush_interval=1.0, dead_letter_file=None):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.dead_letter_file = dead_letter_file
+        self._lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._stopping = None
+
+    def _ensure_started(self):
+        # A forked child inherits the queue object but not the thread
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            if self._pid is None:
+                atexit.register(self.stop)
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.max_size)
+            self._stopping = threading.Event()
+            self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+            self._thread.start()
+
+    def put(self, entry):
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(entry)
+        except queue.Full:
+            self._write([entry])
+
+    def _run(self):
+        while not self._stopping.is_set():
+            batch = self._take(timeout=self.flush_interval)
+            if batch:
+                self._write(batch)
+                close_old_connections()
+        close_old_connections()
+
+    def _take(self, timeout=None):
+        try:
+            batch = [self._queue.get(timeout=timeout)]
+        except queue.Empty:
+            return []
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _write(self, batch):
+        from .models import AuditEntry
+
+        delay = self.RETRY_DELAY
+        for attempt in range(self.WRITE_ATTEMPTS):
+            try:
+                AuditEntry.objects.bulk_create(batch)
+                return
+            except Exception:
+                logger.warning('Failed to write %d audit entries (attempt %d)', len(batch), attempt + 1, exc_info=True)
+                # Drops a connection that errored, so the retry reconnects
+                close_old_connections()
+                if attempt < self.WRITE_ATTEMPTS - 1:
+                    time.sleep(delay)
+                    delay *= 2
+
+        # One bad row (e.g. an actor deleted meanwhile) should not sink the rest
+        failed = []
+        for entry in batch:
+            try:
+                AuditEntry.objects.bulk_create([entry])
+            except Exception:
+                failed.append(entry)
+        if failed:
+            self._dead_letter(failed)
+
+    def _dead_letter(self, entries):
+        logger.error('Writing %d audit entries to the dead-letter file %s', len(entries), self.dead_letter_file)
+        try:
+            with open(self.dead_letter_file, 'a', encoding='utf-8') as f:
+                for entry in entries:
+                    row = {field.attname: getattr(entry, field.attname) for field in entry._meta.concrete_fields}
+                    f.write(json.dumps(row, cls=DjangoJSONEncoder) + '\n')
+        except Exception:
+            logger.exception('Failed to write %d audit entries to the dead-letter file', len(entries))
+
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def flush(self):
+        """Write everything queued so far from the calling thread."""
+        if self._queue is None or self._pid != os.getpid():
+            return
+        while True:
+            batch = self._take(timeout=0.01)
+            if not batch:
+                return
+            self._write(batch)
+
+    def stop(self):
+        if self._thread is not None and self._pid == os.getpid():
+            self._stopping.set()
+            self._thread.join(timeout=self.flush_interval + 5)
+        self.flush()
+
+
+writer = AuditWriter(
+    max_size=getattr(settings, 'AUDIT_QUEUE_SIZE', 10000),
+    batch_size=getattr(settings, 'AUDIT_BATCH_SIZE', 500),
+    flush_interval=getattr(settings, 'AUDIT_FLUSH_SECONDS', 1.0),
+    dead_letter_file=getattr(settings, 'AUDIT_DEAD_LETTER_FILE', 'audit_dead_letter.jsonl'),
+)
+
+
+def flush():
+    writer.flush()
+
+
+def current_actor():
+    """(user, path) of the request being handled, if any."""
+    request = _current_request.get()
+    if request is None:
+        return None, ''
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return None, request.path[:255]
+    return user, request.path[:255]
+
+
+def build_entry(action, model, object_id='', object_repr='', changes=None, actor=None):
+    from .models import AuditEntry
+
+    request_actor, path = current_actor()
+    actor = actor or request_actor
+    return AuditEntry(
+        created_at=timezone.now(),
+        actor=actor,
+        actor_name=actor.get_username() if actor else '',
+        action=action,
+        model=model,
+        object_id=str(object_id) if object_id is not None else '',
+        object_repr=str(object_repr)[:200],
+        changes=changes or {},
+        path=path,
+    )
+
+
+def enqueue(entries):
+    """Queue entries once the current transaction commits (immediately outside one)."""
+    entries = list(entries)
+    if not entries:
+        return
+    if not getattr(settings, 'AUDIT_ASYNC', True):
+        transaction.on_commit(lambda: writer._write(entries))
+        return
+    transaction.on_commit(lambda: [writer.put(entry) for entry in entries])
+
+
+def record(action, model, object_id='', object_repr='', changes=None, actor=None):
+    """
+    Record a change made outside Model.save(), e.g. a queryset update().
+    ``model`` is a model class or an 'app_label.model_name' string.
+    """
+    if not isinstance(model, str):
+        model = model._meta.label_lower
+    enqueue([build_entry(action, model, object_id, object_repr, changes, actor)])
+
+
+def record_many(action, model, changes_by_id, actor=None):
+    """
+    One entry per object for set-based updates: {object_id: {field: [old, new]}},
+    or (object_id, changes) pairs when an object changes more than once.
+    """
+    if not isinstance(model, str):
+        model = model._meta.label_lower
+    if hasattr(changes_by_id, 'items'):
+        changes_by_id = changes_by_id.items()
+    enqueue(
+        build_entry(action, model, object_id, '', changes, actor)
+        for object_id, changes in changes_by_id
+        if changes
+    )
@@ -0,0 +1,119 @@
+"""
+Field-level diffs for audited models, captured with model signals.
+
+post_init snapshots the loaded field values, post_save compares against the
+snapshot and post_delete records the final state. Queryset update() bypasses
+all of this; callers doing set-based updates use recorder.record_many().
+"""
+from decimal import Decimal
+
+from django.apps import apps
+from django.db.models.signals import post_delete, post_init, post_save
+
+from .recorder import build_entry, enqueue
+
+AUDITED_MODELS = [
+    'inventory.Product',
+    'billing.Invoice',
+    'billing.Customer',
+    'billing.Payment',
+    'accounts.CustomUser',
+]
+
+# Bookkeeping fields that change on every save or carry no business meaning
+IGNORED_FIELDS = {'created_at', 'updated_at', 'last_login', 'image_variants'}
+MASKED_FIELDS = {'password'}
+
+
+def _value(value):
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    if isinstance(value, Decimal):
+        return str(value)
+    if hasattr(value, 'name') and hasattr(value, 'storage'):
+        return value.name or ''
+    return str(value)
+
+
+def _tracked_fields(model):
+    return [
+        field.attname
+        for field in model._meta.concrete_fields
+        if field.attname not in IGNORED_FIELDS and not field.primary_key
+    ]
+
+
+def _snapshot(instance):
+    values = instance.__dict__
+    return {
+        attname: _value(values[attname])
+        for attname in instance._audit_fields
+        if attname in values
+    }
+
+
+def _diff(old, new):
+    changes = {}
+    for attname, value in new.items():
+        if attname in old and old[attname] == value:
+            continue
+        if attname in MASKED_FIELDS:
+            changes[attname] = ['***', '***']
+        else:
+            changes[attname] = [old.get(attname), value]
+    return changes
+
+
+def snapshot_instance(sender, instance, **kwargs):
+    instance._audit_fields = _TRACKED[sender]
+    instance._audit_state = _snapshot(instance)
+
+
+def _creation_changes(values):
+    return {
+        attname: [None, '***' if attname in MASKED_FIELDS else value]
+        for attname, value in values.items()
+        if value not in (None, '')
+    }
+
+
+def creation_changes(instance):
+    """The 'create' diff post_save would record, for rows inserted with bulk_create."""
+    return _creation_changes(_snapshot(instance))
+
+
+def record_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    new = _snapshot(instance)
+    if created:
+        changes = _creation_changes(new)
+        action = 'create'
+    else:
+        changes = _diff(getattr(instance, '_audit_state', {}), new)
+        action = 'update'
+    instance._audit_state = new
+    if changes:
+        enqueue([build_entry(action, sender._meta.label_lower, instance.pk, instance, changes)])
+
+
+def record_delete(sender, instance, **kwargs):
+    state = getattr(instance, '_audit_state', {})
+    changes = {
+        attname: [('***' if attname in MASKED_FIELDS else value), None]
+        for attname, value in state.items()
+        if value not in (None, '')
+    }
+    enqueue([build_entry('delete', sender._meta.label_lower, instance.pk, instance, changes)])
+
+
+_TRACKED = {}
+
+
+def connect_signals():
+    for label in AUDITED_MODELS:
+        model = apps.get_model(label)
+        _TRACKED[model] = _tracked_fields(model)
+        post_init.connect(snapshot_instance, sender=model, dispatch_uid=f'audit_init_{label}')
+        post_save.connect(record_save, sender=model, dispatch_uid=f'audit_save_{label}')
+        post_delete.connect(record_delete, sender=model, dispatch_uid=f'audit_delete_{label}')
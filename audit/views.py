@@ -0,0 +1,63 @@
+from datetime import datetime, time
+
+from django.core.paginator import Paginator
+from django.shortcuts import render
+from django.utils import timezone
+
+from accounts.decorators import admin_required
+from accounts.models import CustomUser
+from store_project.db_routers import use_replica
+from .models import AuditEntry
+from .tracking import AUDITED_MODELS
+
+
+def _parse_date(value, end=False):
+    try:
+        day = datetime.strptime(value, '%Y-%m-%d').date()
+    except (TypeError, ValueError):
+        return None
+    return timezone.make_aware(datetime.combine(day, time.max if end else time.min))
+
+
+@admin_required
+@use_replica
+def audit_log(request):
+    entries = AuditEntry.objects.all()
+
+    model = request.GET.get('model', '')
+    action = request.GET.get('action', '')
+    actor = request.GET.get('actor', '')
+    object_id = request.GET.get('object_id', '').strip()
+    date_from = _parse_date(request.GET.get('date_from'))
+    date_to = _parse_date(request.GET.get('date_to'), end=True)
+
+    if model:
+        entries = entries.filter(model=model)
+    if object_id:
+        entries = entries.filter(object_id=object_id)
+    if action:
+        entries = entries.filter(action=action)
+    if actor:
+        entries = entries.filter(actor_id=actor)
+    if date_from:
+        entries = entries.filter(created_at__gte=date_from)
+    if date_to:
+        entries = entries.filter(created_at__lte=date_to)
+
+    page = Paginator(entries, 50).get_page(request.GET.get('page'))
+    query = request.GET.copy()
+    query.pop('page', None)
+
+    return render(request, 'audit/audit_log.html', {
+        'page': page,
+        'models': [label.lower() for label in AUDITED_MODELS],
+        'actions': AuditEntry.ACTION_CHOICES,
+        'actors': CustomUser.objects.order_by('username').values_list('pk', 'username'),
+        'selected_model': model,
+        'selected_action': action,
+        'selected_actor': actor,
+        'object_id': object_id,
+        'date_from': request.GET.get('date_from', ''),
+        'date_to': request.GET.get('date_to', ''),
+        'query': query.urlencode(),
+    })
@@ -1,11 +1,12 @@
 from django.contrib import admin
-from .models import Customer, Invoice, InvoiceItem
+from .models import CreditNote, CreditNoteItem, Customer, DuplicateCustomer, Invoice, InvoiceItem, LoyaltyEntry, Payment, ZReport
 
 
 @admin.register(Customer)
 class CustomerAdmin(admin.ModelAdmin):
-    list_display = ['name', 'phone', 'email', 'created_at']
+    list_display = ['name', 'phone', 'email', 'loyalty_points', 'loyalty_tier', 'created_at']
     search_fields = ['name', 'phone', 'email']
+    readonly_fields = ['loyalty_points', 'loyalty_lifetime_points']
 
 
 class InvoiceItemInline(admin.TabularInline):
@@ -19,4 +20,85 @@ class InvoiceAdmin(admin.ModelAdmin):
     list_filter = ['status', 'payment_method', 'created_at']
     search_fields = ['invoice_number', 'customer__name', 'customer_name']
     inlines = [InvoiceItemInline]
-    readonly_fields = ['invoice_number', 'subtotal', 'total_amount']
+    readonly_fields = ['invoice_number', 'subtotal', 'total_amount', 'refunded_amount', 'points_earned', 'points_redeemed']
+
+
+class CreditNoteItemInline(admin.TabularInline):
+    model = CreditNoteItem
+    extra = 0
+    readonly_fields = ['invoice_item', 'product', 'product_name', 'quantity', 'unit_price', 'total']
+    can_delete = False
+
+
+@admin.register(CreditNote)
+class CreditNoteAdmin(admin.ModelAdmin):
+    list_display = ['credit_note_number', 'invoice', 'amount', 'restocked', 'created_by', 'created_at']
+    list_filter = ['restocked', 'created_at']
+    search_fields = ['credit_note_number', 'invoice__invoice_number']
+    readonly_fields = ['credit_note_number', 'invoice', 'amount', 'restocked', 'created_by', 'created_at']
+    inlines = [CreditNoteItemInline]
+
+    def has_add_permission(self, request):
+        # Credit notes are issued from the invoice page so stock and totals stay in step
+        return False
+
+
+@admin.register(DuplicateCustomer)
+class DuplicateCustomerAdmin(admin.ModelAdmin):
+    list_display = ['customer', 'duplicate', 'score', 'reasons', 'status', 'created_at']
+    list_filter = ['status', 'reasons']
+    search_fields = ['customer__name', 'duplicate__name']
+    raw_id_fields = ['customer', 'duplicate', 'resolved_by']
+
+
+@admin.register(LoyaltyEntry)
+class LoyaltyEntryAdmin(admin.ModelAdmin):
+    list_display = ['customer', 'kind', 'points', 'invoice', 'note', 'created_at']
+    list_filter = ['kind', 'created_at']
+    search_fields = ['customer__name', 'invoice__invoice_number']
+    raw_id_fields = ['customer', 'invoice', 'created_by']
+
+    # The ledger backs Customer.loyalty_points; edits here would drift from the balance
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(Payment)
+class PaymentAdmin(admin.ModelAdmin):
+    list_display = ['invoice', 'kind', 'method', 'amount', 'note', 'created_by', 'created_at']
+    list_filter = ['kind', 'method', 'created_at']
+    search_fields = ['invoice__invoice_number']
+    raw_id_fields = ['invoice', 'created_by']
+
+    # The ledger backs Invoice.amount_paid and the Z-report cash; edits here would drift from both
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ZReport)
+class ZReportAdmin(admin.ModelAdmin):
+    list_display = ['__str__', 'period_start', 'period_end', 'expected_cash', 'counted_cash', 'closed_by']
+    list_filter = ['period_end']
+    readonly_fields = [field.name for field in ZReport._meta.fields]
+
+    # Closed shifts are a record of what was counted; ZReport.save() refuses changes too
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,109 @@
+"""
+Accounts receivable aging: what each customer still owes, by invoice age.
+
+The whole report is one query. Pending invoices are read through the
+(status, created_at) index and grouped by customer, and each age bucket is
+a SUM ... FILTER (WHERE created_at ...) over the same rows, so the table is
+scanned once however many buckets there are. Age counts from the invoice
+date; invoices have no separate due date.
+"""
+import csv
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, F, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Invoice
+
+# (key, label, first day, last day); None means open-ended
+BUCKETS = [
+    ('current', '0-30 days', 0, 30),
+    ('days_31_60', '31-60 days', 31, 60),
+    ('days_61_90', '61-90 days', 61, 90),
+    ('over_90', '90+ days', 91, None),
+]
+BUCKET_KEYS = [key for key, *_ in BUCKETS]
+WALK_IN = 'walk-in'
+
+BALANCE = F('total_amount') - F('refunded_amount') - F('amount_paid')
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+def open_invoices():
+    return Invoice.objects.filter(status='pending')
+
+
+def bucket_filter(key, as_of):
+    """Q matching invoices whose age on ``as_of`` falls in bucket ``key``."""
+    _, _, first, last = next(bucket for bucket in BUCKETS if bucket[0] == key)
+    # Day boundaries in local time, so "30 days" means 30 calendar days
+    today = timezone.localtime(as_of).replace(hour=0, minute=0, second=0, microsecond=0)
+    q = Q(created_at__lt=today - timedelta(days=first - 1))
+    if last is not None:
+        q &= Q(created_at__gte=today - timedelta(days=last))
+    return q
+
+
+def _sums(as_of):
+    return {
+        'balance': Coalesce(Sum(BALANCE), Value(Decimal('0.00')), output_field=MONEY),
+        **{
+            key: Coalesce(Sum(BALANCE, filter=bucket_filter(key, as_of)), Value(Decimal('0.00')), output_field=MONEY)
+            for key in BUCKET_KEYS
+        },
+    }
+
+
+def aging_by_customer(as_of=None):
+    """
+    One row per customer with money outstanding: customer, customer__name,
+    invoice_count, oldest, balance and one amount per bucket. Walk-in
+    invoices share the row with customer None.
+    """
+    as_of = as_of or timezone.now()
+    return (
+        open_invoices()
+        .values('customer', 'customer__name')
+        .annotate(invoice_count=Count('id'), oldest=Min('created_at'), **_sums(as_of))
+        .filter(balance__gt=0)
+        .order_by('-balance', 'customer')
+    )
+
+
+def aging_totals(as_of=None):
+    as_of = as_of or timezone.now()
+    return open_invoices().aggregate(invoice_count=Count('id'), **_sums(as_of))
+
+
+def customer_invoices(customer, bucket=None, as_of=None):
+    """The open invoices behind one row of the report, oldest first."""
+    invoices = open_invoices()
+    if customer == WALK_IN:
+        invoices = invoices.filter(customer__isnull=True)
+    else:
+        invoices = invoices.filter(customer_id=customer)
+    if bucket:
+        invoices = invoices.filter(bucket_filter(bucket, as_of or timezone.now()))
+    return invoices.annotate(balance=BALANCE).filter(balance__gt=0).order_by('created_at')
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    """Yield the report as CSV lines, one row at a time."""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(['Customer ID', 'Customer', 'Invoices', 'Oldest', *[label for _, label, *_ in BUCKETS], 'Balance'])
+    for row in rows:
+        yield writer.writerow([
+            row['customer'] or '',
+            row['customer__name'] or 'Walk-in customers',
+            row['invoice_count'],
+            timezone.localtime(row['oldest']).date().isoformat(),
+            *[row[key] for key in BUCKET_KEYS],
+            row['balance'],
+        ])
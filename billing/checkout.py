@@ -0,0 +1,291 @@
+"""
+Invoice creation for the JSON checkout and offline POS sync APIs.
+
+A basket takes the same number of queries however many lines it has. One
+SELECT ... FOR UPDATE locks the sold products. One bulk UPDATE deducts the
+stock, and one bulk_create inserts the lines. Problems are collected per
+line, so a POS terminal can point at the exact row to fix.
+"""
+from decimal import Decimal
+
+from django import forms
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from audit import recorder as audit
+from audit.tracking import creation_changes
+from inventory.models import Product, record_stock_movements
+from inventory.pricing import current_prices
+
+from .forms import InvoiceForm
+from .loyalty import LoyaltyError, redeem
+from .models import Invoice, InvoiceItem, hold_shift
+
+CENTS = Decimal('0.01')
+
+
+class InvoiceLineForm(forms.Form):
+    product = forms.IntegerField(min_value=1)
+    quantity = forms.IntegerField(min_value=1)
+    unit_price = forms.DecimalField(max_digits=10, decimal_places=2, min_value=0, required=False)
+
+
+class CheckoutError(Exception):
+    """
+    Form-style errors for one invoice: header field errors, plus ``lines``,
+    which lines up with the submitted lines ({} for lines without problems).
+    """
+    def __init__(self, errors, status=400):
+        super().__init__(errors)
+        self.errors = errors
+        self.status = status
+
+
+def validate_invoice(data):
+    """Check the shape of one invoice payload and return (header_form, lines)."""
+    if not isinstance(data, dict):
+        raise CheckoutError({'__all__': ['Expected a JSON object.']})
+
+    header = InvoiceForm({
+        'payment_method': 'cash',
+        'discount': '0',
+        **{key: value for key, value in data.items() if key != 'lines'},
+    })
+    errors = {} if header.is_valid() else dict(header.errors)
+
+    lines = data.get('lines')
+    if not isinstance(lines, list) or not lines:
+        raise CheckoutError({**errors, 'lines': ['At least one line is required.']})
+
+    line_forms = [InvoiceLineForm(line if isinstance(line, dict) else {}) for line in lines]
+    line_errors = [{} if form.is_valid() else dict(form.errors) for form in line_forms]
+    if errors or any(line_errors):
+        raise CheckoutError({**errors, 'lines': line_errors})
+    return header, [form.cleaned_data for form in line_forms]
+
+
+def lock_products(product_ids):
+    """Lock the given products in pk order so concurrent baskets queue instead of deadlocking."""
+    return {
+        product.pk: product
+        for product in Product.objects.select_for_update().filter(pk__in=set(product_ids)).order_by('pk')
+    }
+
+
+def price_lines(lines, products, price_map):
+    """
+    Resolve each line against the locked products and reserve their stock in
+    memory. Returns unsaved InvoiceItems. If any line fails, raises
+    CheckoutError with per-line errors and leaves the products untouched.
+    """
+    items, line_errors, demand = [], [], {}
+    for line in lines:
+        product = products.get(line['product'])
+        if product is None or not product.is_active:
+            line_errors.append({'product': ['Unknown or inactive product.']})
+            continue
+        demand[product.pk] = demand.get(product.pk, 0) + line['quantity']
+        if product.quantity < demand[product.pk]:
+            line_errors.append({'quantity': [f'Only {product.quantity} of {product.sku} in stock.']})
+            continue
+
+        unit_price = line['unit_price']
+        if unit_price is None:
+            unit_price = price_map.get(product.pk) or product.price
+        unit_price = unit_price.quantize(CENTS)
+        items.append(InvoiceItem(
+            product=product,
+            product_name=product.name,
+            quantity=line['quantity'],
+            unit_price=unit_price,
+            total=line['quantity'] * unit_price,
+        ))
+        line_errors.append({})
+
+    if any(line_errors):
+        # 409: the basket is well formed but conflicts with current stock
+        status = 409 if all('product' not in errors for errors in line_errors) else 400
+        raise CheckoutError({'lines': line_errors}, status=status)
+
+    for pk, quantity in demand.items():
+        products[pk].quantity -= quantity
+    return items
+
+
+def deduct_stock(items):
+    """
+    Write the in-memory quantities of the sold products back with one UPDATE
+    and log one movement per invoice and product.
+    """
+    sold = {}
+    for item in items:
+        key = (item.product.pk, item.invoice.invoice_number)
+        sold[key] = sold.get(key, 0) + item.quantity
+    products = {item.product.pk: item.product for item in items}.values()
+
+    now = timezone.now()
+    for product in products:
+        product.updated_at = now
+    Product.objects.bulk_update(products, ['quantity', 'updated_at'], batch_size=500)
+    record_stock_movements(
+        (pk, -quantity, f'Invoice #{number}') for (pk, number), quantity in sold.items()
+    )
+
+
+def build_invoice(header, items, user, idempotency_key=None):
+    invoice = header.save(commit=False)
+    invoice.created_by = user
+    invoice.idempotency_key = idempotency_key
+    invoice.subtotal = sum(item.total for item in items)
+    invoice.total_amount = invoice.subtotal - invoice.discount + invoice.tax_amount
+    for item in items:
+        item.invoice = invoice
+    return invoice
+
+
+@transaction.atomic
+def create_invoice(header, lines, user, idempotency_key=None):
+    """Create one invoice from a validated payload. Everything rolls back on a conflict."""
+    products = lock_products(line['product'] for line in lines)
+    items = price_lines(lines, products, current_prices(list(products)))
+
+    invoice = build_invoice(header, items, user, idempotency_key)
+    invoice.save()
+    InvoiceItem.objects.bulk_create(items)
+    deduct_stock(items)
+    try:
+        redeem(invoice, header.cleaned_data.get('redeem_points'), user)
+    except LoyaltyError as e:
+        raise CheckoutError({'redeem_points': [str(e)]}, status=409)
+    return invoice
+
+
+def sync_invoices(payloads, user):
+    """
+    Record invoices a POS terminal queued while it was offline. Returns
+    one report entry per payload, in order. Each entry has a status of
+    created, duplicate (the key was synced before), invalid or conflict
+    (stock ran out). Payloads are processed in chunks of POS_SYNC_CHUNK_SIZE,
+    one transaction each.
+    """
+    report = []
+    size = settings.POS_SYNC_CHUNK_SIZE
+    for start in range(0, len(payloads), size):
+        chunk = payloads[start:start + size]
+        for attempt in range(Invoice.NUMBER_ATTEMPTS):
+            try:
+                report.extend(_sync_chunk(chunk, user))
+                break
+            except IntegrityError:
+                # Another terminal took part of the number block, or synced
+                # one of these keys at the same time; the retry sees both
+                if attempt == Invoice.NUMBER_ATTEMPTS - 1:
+                    raise
+    return report
+
+
+@transaction.atomic
+def _sync_chunk(chunk, user):
+    keys = [payload.get('idempotency_key') if isinstance(payload, dict) else None for payload in chunk]
+    synced = dict(
+        Invoice.objects.filter(idempotency_key__in=[key for key in keys if key])
+        .values_list('idempotency_key', 'invoice_number')
+    )
+
+    entries, accepted = [], []
+    for payload, key in zip(chunk, keys):
+        entry = {'idempotency_key': key}
+        entries.append(entry)
+        if not key or not isinstance(key, str) or len(key) > 64:
+            entry.update(status='invalid', errors={'idempotency_key': ['A key of up to 64 characters is required.']})
+        elif key in synced:
+            entry.update(status='duplicate', invoice_number=synced[key])
+        else:
+            try:
+                header, lines = validate_invoice(payload)
+            except CheckoutError as e:
+                entry.update(status='invalid', errors=e.errors)
+                continue
+            if header.cleaned_data.get('redeem_points'):
+                # The balance was not checked when the sale was rung up offline
+                entry.update(status='invalid', errors={'redeem_points': ['Points cannot be redeemed offline.']})
+                continue
+            # A key repeated within one upload is only sold once
+            synced[key] = None
+            accepted.append((entry, header, lines, payload.get('created_at')))
+
+    product_ids = {line['product'] for _, _, lines, _ in accepted for line in lines}
+    products = lock_products(product_ids)
+    price_map = current_prices(list(products))
+
+    invoices, items = [], []
+    for entry, header, lines, created_at in accepted:
+        try:
+            invoice_items = price_lines(lines, products, price_map)
+        except CheckoutError as e:
+            entry.update(status='conflict', errors=e.errors)
+            continue
+        invoice = build_invoice(header, invoice_items, user, entry['idempotency_key'])
+        invoice.created_at = _sold_at(created_at)
+        invoices.append((entry, invoice))
+        items.extend(invoice_items)
+
+    numbers = Invoice.allocate_numbers(len(invoices))
+    for (entry, invoice), number in zip(invoices, numbers):
+        invoice.invoice_number = number
+    hold_shift()
+    Invoice.objects.bulk_create([invoice for _, invoice in invoices], batch_size=500)
+    InvoiceItem.objects.bulk_create(items, batch_size=1000)
+    if items:
+        deduct_stock(items)
+    # bulk_create skips the post_save audit hook the form and API paths go through
+    audit.record_many('create', Invoice, {
+        invoice.pk: creation_changes(invoice) for _, invoice in invoices
+    }, actor=user)
+
+    for entry, invoice in invoices:
+        entry.update(status='created', id=invoice.pk, invoice_number=invoice.invoice_number)
+        synced[invoice.idempotency_key] = invoice.invoice_number
+    for entry in entries:
+        if entry.get('status') == 'duplicate' and entry['invoice_number'] is None:
+            entry['invoice_number'] = synced[entry['idempotency_key']]
+    return entries
+
+
+def _sold_at(value):
+    """The terminal's sale time, if it sent a sane one; otherwise now."""
+    now = timezone.now()
+    moment = parse_datetime(value) if isinstance(value, str) else None
+    if moment is None:
+        return now
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return min(moment, now)
+
+
+def invoice_payload(invoice, items=None):
+    items = invoice.items.all() if items is None else items
+    return {
+        'id': invoice.pk,
+        'invoice_number': invoice.invoice_number,
+        'idempotency_key': invoice.idempotency_key,
+        'status': invoice.status,
+        'customer': invoice.customer_id,
+        'subtotal': str(invoice.subtotal),
+        'discount': str(invoice.discount),
+        'total_amount': str(invoice.total_amount),
+        'points_redeemed': invoice.points_redeemed,
+        'created_at': invoice.created_at.isoformat(),
+        'lines': [
+            {
+                'product': item.product_id,
+                'product_name': item.product_name,
+                'quantity': item.quantity,
+                'unit_price': str(item.unit_price),
+                'total': str(item.total),
+            }
+            for item in items
+        ],
+    }
@@ -0,0 +1,192 @@
+"""
+End-of-shift Z-reports.
+
+A shift is everything recorded since the last close, so its rows are a
+primary-key range. Ids are handed out at insert, not commit, so closing
+takes the lock those inserts hold (models.hold_shift) before reading the
+range's upper end. Its figures come from one GROUP BY over those invoices
+(payment method x status x cashier, a few dozen rows however busy the day)
+folded in Python, plus one over the shift's credit notes and one over its
+payments. Closing freezes the figures and the counted cash in a ZReport;
+past reports are read back from that snapshot, never re-aggregated.
+
+Sales belong to the shift the invoice was raised in, but the drawer moves
+with the Payment rows: a pending invoice settled later counts towards the
+shift that took the money, and a return only counts as a refund for what
+was actually handed back.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from audit import recorder as audit
+
+from .models import CreditNote, Invoice, Payment, ZReport, hold_shift
+
+ZERO = Decimal('0.00')
+METHOD_LABELS = dict(Invoice.PAYMENT_METHOD_CHOICES)
+
+
+class ShiftClosed(Exception):
+    """Another close froze the shift while this one waited for the lock."""
+
+
+def _previous():
+    return ZReport.objects.order_by('-number').first()
+
+
+def _period_start(previous):
+    if previous:
+        return previous.period_end
+    # The first shift ever closed covers today
+    return timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _bucket(buckets, key, **initial):
+    if key not in buckets:
+        buckets[key] = {**initial, 'count': 0, 'total': ZERO}
+    return buckets[key]
+
+
+def _method(methods, key):
+    return _bucket(methods, key, method=key, label=METHOD_LABELS.get(key, key), collected=ZERO, refunded=ZERO)
+
+
+def shift_totals(after_invoice_id, upto_invoice_id, after_credit_note_id, upto_credit_note_id,
+                 after_payment_id, upto_payment_id):
+    """The figures for invoices, credit notes and payments in the given id ranges (after, upto]."""
+    rows = (
+        Invoice.objects.filter(pk__gt=after_invoice_id, pk__lte=upto_invoice_id)
+        .values('payment_method', 'status', 'created_by', 'created_by__username')
+        .annotate(
+            count=Count('id'),
+            total=Sum('total_amount'),
+            discount=Sum('discount'),
+            paid=Sum('amount_paid'),
+        )
+        .order_by()
+    )
+
+    methods, cashiers = {}, {}
+    sales = {'count': 0, 'total': ZERO, 'discounts': ZERO}
+    cancelled = {'count': 0, 'total': ZERO}
+    pending = {'count': 0, 'total': ZERO}
+    for row in rows:
+        if row['status'] == 'cancelled':
+            cancelled['count'] += row['count']
+            cancelled['total'] += row['total']
+            continue
+        if row['status'] == 'pending':
+            pending['count'] += row['count']
+            pending['total'] += row['total'] - row['paid']
+
+        sales['count'] += row['count']
+        sales['total'] += row['total']
+        sales['discounts'] += row['discount']
+
+        method = _method(methods, row['payment_method'])
+        method['count'] += row['count']
+        method['total'] += row['total']
+
+        cashier = _bucket(cashiers, row['created_by'], name=row['created_by__username'] or 'Unknown')
+        cashier['count'] += row['count']
+        cashier['total'] += row['total']
+
+    credit_notes = CreditNote.objects.filter(
+        pk__gt=after_credit_note_id, pk__lte=upto_credit_note_id
+    ).aggregate(count=Count('id'), total=Sum('amount'))
+    refunds = {'count': credit_notes['count'], 'total': credit_notes['total'] or ZERO}
+
+    payments = (
+        Payment.objects.filter(pk__gt=after_payment_id, pk__lte=upto_payment_id)
+        .values('method', 'kind')
+        .annotate(total=Sum('amount'))
+        .order_by()
+    )
+    for row in payments:
+        method = _method(methods, row['method'])
+        if row['kind'] == 'refund':
+            method['refunded'] -= row['total']
+        else:
+            method['collected'] += row['total']
+
+    return {
+        'sales': sales,
+        'net_sales': sales['total'] - refunds['total'],
+        'refunds': refunds,
+        'cancelled': cancelled,
+        'pending': pending,
+        'payment_methods': sorted(methods.values(), key=lambda m: m['method']),
+        'cashiers': sorted(cashiers.values(), key=lambda c: -c['total']),
+    }
+
+
+def current_shift():
+    """The open shift: (period_start, last ids, totals), computed live."""
+    previous = _previous()
+    start = _period_start(previous)
+    if previous:
+        after_invoice, after_credit_note = previous.last_invoice_id, previous.last_credit_note_id
+        after_payment = previous.last_payment_id
+    else:
+        # Before the first close there is no id to start from; take today's rows
+        after_invoice = Invoice.objects.filter(created_at__lt=start).aggregate(last=Max('id'))['last'] or 0
+        after_credit_note = CreditNote.objects.filter(created_at__lt=start).aggregate(last=Max('id'))['last'] or 0
+        after_payment = Payment.objects.filter(created_at__lt=start).aggregate(last=Max('id'))['last'] or 0
+    upto_invoice = Invoice.objects.aggregate(last=Max('id'))['last'] or 0
+    upto_credit_note = CreditNote.objects.aggregate(last=Max('id'))['last'] or 0
+    upto_payment = Payment.objects.aggregate(last=Max('id'))['last'] or 0
+    return {
+        'previous': previous,
+        'period_start': start,
+        'last_invoice_id': upto_invoice,
+        'last_credit_note_id': upto_credit_note,
+        'last_payment_id': upto_payment,
+        'totals': shift_totals(after_invoice, upto_invoice, after_credit_note, upto_credit_note,
+                               after_payment, upto_payment),
+    }
+
+
+def expected_cash(totals, opening_float):
+    cash = next((m for m in totals['payment_methods'] if m['method'] == 'cash'), None)
+    if cash is None:
+        return opening_float
+    return opening_float + cash['collected'] - cash['refunded']
+
+
+@transaction.atomic
+def close_shift(user, opening_float, counted_cash, notes=''):
+    """
+    Freeze the open shift as the next Z-report. The exclusive shift lock
+    waits for open invoice, credit-note and payment inserts to commit, so
+    none with an id below the boundary turns up after it. A close that
+    waited on another one raises ShiftClosed rather than closing an empty
+    shift; where there is no lock they fail on the unique number instead.
+    """
+    before = _previous()
+    hold_shift(exclusive=True)
+    shift = current_shift()
+    previous = shift['previous']
+    if previous != before:
+        raise ShiftClosed(previous)
+    report = ZReport.objects.create(
+        number=previous.number + 1 if previous else 1,
+        period_start=shift['period_start'],
+        period_end=timezone.now(),
+        last_invoice_id=shift['last_invoice_id'],
+        last_credit_note_id=shift['last_credit_note_id'],
+        last_payment_id=shift['last_payment_id'],
+        opening_float=opening_float,
+        expected_cash=expected_cash(shift['totals'], opening_float),
+        counted_cash=counted_cash,
+        totals=shift['totals'],
+        notes=notes,
+        closed_by=user,
+    )
+    audit.record('create', ZReport, report.pk, str(report), {
+        'expected_cash': [None, str(report.expected_cash)],
+        'counted_cash': [None, str(report.counted_cash)],
+    }, actor=user)
+    return report
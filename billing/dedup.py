@@ -0,0 +1,139 @@
+"""
+Finding and merging duplicate customers.
+
+Comparing every customer with every other is O(n²), so candidates are
+blocked first. Only customers that share a normalized phone or a
+lower-cased email are compared, and the blocks are found with GROUP BY
+... HAVING COUNT(*) > 1 in the database. Within a block, names are scored
+with difflib. Merging relinks invoices with one UPDATE per merge.
+"""
+import re
+from difflib import SequenceMatcher
+from itertools import combinations
+
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from audit import recorder as audit
+
+from .models import Customer, DuplicateCustomer, Invoice, LoyaltyEntry, normalize_phone
+
+# A shared phone with a name this different is usually family sharing a number
+MIN_NAME_SCORE = 0.6
+# Blocks bigger than this are placeholders like 0000000000, not people
+MAX_BLOCK_SIZE = 25
+MERGE_FIELDS = ['phone', 'email', 'address']
+
+
+def normalize_name(name):
+    return ' '.join(sorted(re.sub(r'[^a-z0-9 ]', ' ', (name or '').lower()).split()))
+
+
+def name_score(a, b):
+    return SequenceMatcher(None, normalize_name(a), normalize_name(b)).ratio()
+
+
+def _blocks(field, customers):
+    keys = (
+        customers.exclude(**{field: ''})
+        .values(field).annotate(n=Count('id')).filter(n__gt=1, n__lte=MAX_BLOCK_SIZE)
+        .values_list(field, flat=True)
+    )
+    members = {}
+    for pk, key in customers.filter(**{f'{field}__in': keys}).values_list('pk', field):
+        members.setdefault(key, []).append(pk)
+    return members.values()
+
+
+def find_candidates(min_score=MIN_NAME_SCORE):
+    """Return {(older_id, newer_id): (score, reasons)} for likely duplicate pairs."""
+    customers = Customer.objects.annotate(email_key=Lower('email'))
+    shared = {}
+    for reason, field in (('phone', 'phone_normalized'), ('email', 'email_key')):
+        for block in _blocks(field, customers):
+            for pair in combinations(sorted(block), 2):
+                shared.setdefault(pair, set()).add(reason)
+
+    names = dict(Customer.objects.filter(pk__in={pk for pair in shared for pk in pair}).values_list('pk', 'name'))
+    candidates = {}
+    for (a, b), reasons in shared.items():
+        score = name_score(names[a], names[b])
+        # Matching on both phone and email is strong enough on its own
+        if score >= min_score or len(reasons) > 1:
+            candidates[(a, b)] = (round(score, 3), ','.join(sorted(reasons)))
+    return candidates
+
+
+def record_candidates(candidates):
+    """Store new pairs for review; pairs already dismissed stay dismissed."""
+    created = DuplicateCustomer.objects.bulk_create(
+        [
+            DuplicateCustomer(customer_id=a, duplicate_id=b, score=score, reasons=reasons)
+            for (a, b), (score, reasons) in candidates.items()
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+    return len(created)
+
+
+@transaction.atomic
+def merge_customers(keep, duplicates, user=None):
+    """Fold ``duplicates`` into ``keep``: relink their invoices, fill blanks, delete them."""
+    duplicates = [customer for customer in duplicates if customer.pk != keep.pk]
+    duplicate_ids = [customer.pk for customer in duplicates]
+    if not duplicate_ids:
+        return 0
+
+    moved = Invoice.objects.filter(customer_id__in=duplicate_ids).update(
+        customer=keep, updated_at=timezone.now()
+    )
+    for field in MERGE_FIELDS:
+        if not getattr(keep, field):
+            setattr(keep, field, next((getattr(c, field) for c in duplicates if getattr(c, field)), ''))
+    keep.save(update_fields=[*MERGE_FIELDS, 'updated_at'])
+
+    # Loyalty balances add up; the ledger rows follow so the history stays complete
+    points = Customer.objects.filter(pk__in=duplicate_ids).aggregate(
+        points=Sum('loyalty_points'), lifetime=Sum('loyalty_lifetime_points'),
+    )
+    if points['points'] or points['lifetime']:
+        Customer.objects.filter(pk=keep.pk).update(
+            loyalty_points=F('loyalty_points') + (points['points'] or 0),
+            loyalty_lifetime_points=F('loyalty_lifetime_points') + (points['lifetime'] or 0),
+        )
+    LoyaltyEntry.objects.filter(customer_id__in=duplicate_ids).update(customer=keep)
+
+    # Deleting the duplicates also drops their candidate pairs; the audit entry keeps the history
+    audit.record('update', Customer, keep.pk, str(keep), {
+        'merged': [None, {customer.pk: customer.name for customer in duplicates}],
+        'invoices_moved': [None, moved],
+    }, actor=user)
+    Customer.objects.filter(pk__in=duplicate_ids).delete()
+    return moved
+
+
+def link_walk_in_invoices():
+    """
+    Attach invoices sold to a walk-in (no customer, phone typed in) to the
+    customer with that phone. Phones that match several customers are
+    skipped until those are merged.
+    """
+    owners = {}
+    for pk, phone in Customer.objects.exclude(phone_normalized='').values_list('pk', 'phone_normalized'):
+        owners[phone] = None if phone in owners else pk
+
+    links = []
+    walk_ins = Invoice.objects.filter(customer__isnull=True).exclude(customer_phone='')
+    for pk, phone in walk_ins.values_list('pk', 'customer_phone').iterator(chunk_size=2000):
+        customer_id = owners.get(normalize_phone(phone))
+        if customer_id:
+            links.append(Invoice(pk=pk, customer_id=customer_id))
+
+    now = timezone.now()
+    for invoice in links:
+        invoice.updated_at = now
+    Invoice.objects.bulk_update(links, ['customer', 'updated_at'], batch_size=1000)
+    return len(links)
@@ -0,0 +1,352 @@
+"""
+Printable invoice documents: A4 PDF invoices, 80mm thermal receipts (PDF)
+and raw ESC/POS bytes for receipt printers.
+
+Rendered files are cached on disk under INVOICE_DOCUMENT_ROOT, one directory
+per invoice with the file name keyed by the invoice's updated_at. Recording a
+payment or cancelling saves the invoice, which changes the key, so a stale
+document is never served; invalidate() also removes the old files and queues
+a fresh render. Rendering runs off the request path on the thumbnail-style
+thread pool or in run_workers processes (INVOICE_DOCUMENT_QUEUE = 'jobs').
+"""
+import logging
+import os
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from django.utils.html import escape
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from .models import Invoice
+
+logger = logging.getLogger(__name__)
+
+STORE_NAME = 'GRINKRAWEAR'
+STORE_TAGLINE = 'Wear Your Confidence'
+
+# kind -> (file extension, content type)
+DOCUMENT_KINDS = {
+    'pdf': ('pdf', 'application/pdf'),
+    'receipt': ('receipt.pdf', 'application/pdf'),
+    'escpos': ('escpos.bin', 'application/octet-stream'),
+}
+
+RECEIPT_COLUMNS = 48  # Font A on 80mm paper
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'INVOICE_DOCUMENT_WORKERS', 2),
+            thread_name_prefix='documents',
+        )
+    return _executor
+
+
+def document_path(invoice_id, updated_at, kind):
+    extension = DOCUMENT_KINDS[kind][0]
+    version = int(updated_at.timestamp() * 1_000_000)
+    return Path(settings.INVOICE_DOCUMENT_ROOT) / str(invoice_id) / f'{version}.{extension}'
+
+
+def document_filename(invoice_number, kind):
+    return f'{invoice_number}.{DOCUMENT_KINDS[kind][0]}'
+
+
+def get_document(invoice, kind):
+    """Path of the cached document, rendering it now if the cache has no current copy."""
+    path = document_path(invoice.pk, invoice.updated_at, kind)
+    if not path.exists():
+        _write(path, RENDERERS[kind](invoice))
+    return path
+
+
+def render_documents(invoice_ids, kinds=None):
+    """Render every missing document for the given invoices (worker entry point)."""
+    kinds = kinds or list(DOCUMENT_KINDS)
+    invoices = Invoice.objects.filter(pk__in=invoice_ids).select_related('customer', 'created_by')
+    rendered = 0
+    for invoice in invoices.prefetch_related('items'):
+        for kind in kinds:
+            path = document_path(invoice.pk, invoice.updated_at, kind)
+            if not path.exists():
+                _write(path, RENDERERS[kind](invoice))
+                rendered += 1
+    return rendered
+
+
+def _render_in_thread(invoice_ids):
+    close_old_connections()
+    try:
+        render_documents(invoice_ids)
+    except Exception:
+        logger.exception('Document rendering failed for invoices %s', invoice_ids)
+    finally:
+        close_old_connections()
+
+
+def enqueue_documents(invoice_ids):
+    """Pre-render the documents of these invoices once the current transaction commits."""
+    invoice_ids = list(invoice_ids)
+    if not invoice_ids:
+        return
+    if getattr(settings, 'INVOICE_DOCUMENT_QUEUE', 'threads') == 'jobs':
+        from jobs.queue import enqueue
+        enqueue('billing.render_invoice_documents', invoice_ids=invoice_ids)
+        return
+    transaction.on_commit(lambda: get_executor().submit(_render_in_thread, invoice_ids))
+
+
+def invalidate(invoice):
+    """Drop cached documents of an invoice that changed, and queue fresh ones."""
+    directory = Path(settings.INVOICE_DOCUMENT_ROOT) / str(invoice.pk)
+    current = {document_path(invoice.pk, invoice.updated_at, kind).name for kind in DOCUMENT_KINDS}
+    if directory.exists():
+        for path in directory.iterdir():
+            # Dot files are renders still being written
+            if path.name not in current and not path.name.startswith('.'):
+                path.unlink(missing_ok=True)
+    enqueue_documents([invoice.pk])
+
+
+def _write(path, content):
+    # Write then rename, so a concurrent reader never sees half a file
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # A unique temp name per write: the pool and request threads can render the same file at once
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f'.{path.name}.', suffix='.tmp', delete=False) as tmp:
+        tmp.write(content)
+    try:
+        os.replace(tmp.name, path)
+    except OSError:
+        os.unlink(tmp.name)
+        raise
+
+
+def _money(value):
+    return f'Rs. {value:,.2f}'
+
+
+def _customer_lines(invoice):
+    lines = [invoice.get_customer_display()]
+    phone = invoice.customer_phone or (invoice.customer.phone if invoice.customer else '')
+    if phone:
+        lines.append(phone)
+    return lines
+
+
+def _totals(invoice):
+    rows = [('Subtotal', invoice.subtotal)]
+    if invoice.discount:
+        rows.append(('Discount', -invoice.discount))
+    if invoice.tax_amount:
+        rows.append(('Tax', invoice.tax_amount))
+    rows.append(('Total', invoice.total_amount))
+    if invoice.refunded_amount:
+        rows.append(('Refunded', -invoice.refunded_amount))
+    if invoice.amount_paid:
+        rows.append(('Paid', invoice.amount_paid))
+        rows.append(('Balance due', invoice.balance_due))
+    return rows
+
+
+def render_pdf(invoice):
+    """A4 invoice."""
+    styles = getSampleStyleSheet()
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(
+        buffer, pagesize=A4, title=f'Invoice {invoice.invoice_number}',
+        leftMargin=18 * mm, rightMargin=18 * mm, topMargin=18 * mm, bottomMargin=18 * mm,
+    )
+
+    header = Table([[
+        Paragraph(f'<b>{STORE_NAME}</b><br/><font size=8>{STORE_TAGLINE.upper()}</font>', styles['Title']),
+        Paragraph(
+            f'<b>Invoice {invoice.invoice_number}</b><br/>'
+            f'{timezone.localtime(invoice.created_at):%d %b %Y %H:%M}<br/>'
+            f'{invoice.get_status_display()} &middot; {invoice.get_payment_method_display()}',
+            styles['Normal'],
+        ),
+    ]], colWidths=['55%', '45%'])
+    header.setStyle(TableStyle([('VALIGN', (0, 0), (-1, -1), 'TOP')]))
+
+    rows = [['Product', 'Qty', 'Unit price', 'Amount']]
+    rows += [
+        [Paragraph(escape(item.product_name), styles['Normal']), item.quantity, _money(item.unit_price), _money(item.total)]
+        for item in invoice.items.all()
+    ]
+    lines = Table(rows, colWidths=['55%', '10%', '17%', '18%'], repeatRows=1)
+    lines.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.black),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+        ('ALIGN', (1, 0), (-1, -1), 'RIGHT'),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('LINEBELOW', (0, 1), (-1, -1), 0.25, colors.lightgrey),
+    ]))
+
+    total_rows = _totals(invoice)
+    total_index = [label for label, _ in total_rows].index('Total')
+    totals = Table(
+        [[label, _money(value)] for label, value in total_rows],
+        colWidths=['82%', '18%'],
+    )
+    totals.setStyle(TableStyle([
+        ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+        ('FONTNAME', (0, total_index), (-1, total_index), 'Helvetica-Bold'),
+    ]))
+
+    story = [
+        header,
+        Spacer(1, 8 * mm),
+        Paragraph('<b>Bill to</b><br/>' + '<br/>'.join(escape(line) for line in _customer_lines(invoice)), styles['Normal']),
+        Spacer(1, 6 * mm),
+        lines,
+        Spacer(1, 4 * mm),
+        totals,
+    ]
+    if invoice.notes:
+        story += [Spacer(1, 6 * mm), Paragraph(escape(invoice.notes), styles['Italic'])]
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def receipt_lines(invoice, width=RECEIPT_COLUMNS):
+    """The receipt as fixed-width text lines, shared by the PDF and ESC/POS output."""
+    def pair(left, right):
+        return left[:width - len(right) - 1].ljust(width - len(right)) + right
+
+    lines = [
+        '-' * width,
+        pair(invoice.invoice_number, f'{timezone.localtime(invoice.created_at):%d-%m-%Y %H:%M}'),
+        *_customer_lines(invoice),
+        '-' * width,
+    ]
+    for item in invoice.items.all():
+        lines.append(item.product_name[:width])
+        lines.append(pair(f'  {item.quantity} x {item.unit_price:,.2f}', f'{item.total:,.2f}'))
+    lines.append('-' * width)
+    lines += [pair(label, f'{value:,.2f}') for label, value in _totals(invoice)]
+    lines.append(pair('Payment', invoice.get_payment_method_display()))
+    if invoice.status == 'cancelled':
+        lines.append('*** CANCELLED ***'.center(width))
+    return lines
+
+
+def render_receipt(invoice):
+    """80mm thermal receipt as a PDF, as tall as its content."""
+    lines = receipt_lines(invoice)
+    width, margin, leading = 80 * mm, 3 * mm, 9
+    height = margin * 2 + leading * (len(lines) + 4)
+
+    buffer = BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=(width, height))
+    pdf.setTitle(f'Receipt {invoice.invoice_number}')
+    y = height - margin - leading
+    pdf.setFont('Helvetica-Bold', 11)
+    pdf.drawCentredString(width / 2, y, STORE_NAME)
+    y -= leading
+    pdf.setFont('Helvetica', 6)
+    pdf.drawCentredString(width / 2, y, STORE_TAGLINE.upper())
+    y -= leading * 1.5
+
+    # 48 columns of Courier 6.9pt fill the 74mm printable width
+    pdf.setFont('Courier', 6.9)
+    for line in lines:
+        pdf.drawString(margin, y, line)
+        y -= leading
+    pdf.setFont('Helvetica', 6)
+    pdf.drawCentredString(width / 2, y - leading / 2, 'Thank you for shopping with us')
+    pdf.showPage()
+    pdf.save()
+    return buffer.getvalue()
+
+
+ESC, GS = b'\x1b', b'\x1d'
+
+
+def render_escpos(invoice):
+    """Raw bytes for an ESC/POS receipt printer (cp437, partial cut)."""
+    def text(value):
+        return value.encode('cp437', errors='replace') + b'\n'
+
+    out = [
+        ESC + b'@',                       # initialise
+        ESC + b'a\x01',                   # centre
+        ESC + b'E\x01' + GS + b'!\x11',   # bold, double size
+        text(STORE_NAME),
+        GS + b'!\x00' + ESC + b'E\x00',
+        text(STORE_TAGLINE.upper()),
+        ESC + b'a\x00',                   # left
+    ]
+    out += [text(line) for line in receipt_lines(invoice)]
+    out += [
+        ESC + b'a\x01',
+        text('Thank you for shopping with us'),
+        ESC + b'd\x03',                   # feed 3 lines
+        GS + b'V\x42\x00',                # feed and partial cut
+    ]
+    return b''.join(out)
+
+
+RENDERERS = {
+    'pdf': render_pdf,
+    'receipt': render_receipt,
+    'escpos': render_escpos,
+}
+
+
+class _ZipStream:
+    """Write-only file object whose output is drained by stream_zip()."""
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        chunks, self.chunks = self.chunks, []
+        return b''.join(chunks)
+
+
+def stream_zip(invoices, kind='pdf'):
+    """
+    Yield a ZIP of one document per invoice, file by file, reading each from
+    the cache (rendering the few that are missing). PDFs are already
+    compressed, so entries are stored rather than deflated.
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_STORED) as archive:
+        for invoice in invoices:
+            path = get_document(invoice, kind)
+            info = zipfile.ZipInfo(
+                document_filename(invoice.invoice_number, kind),
+                date_time=timezone.localtime(invoice.created_at).timetuple()[:6],
+            )
+            with archive.open(info, 'w') as entry, path.open('rb') as source:
+                while chunk := source.read(64 * 1024):
+                    entry.write(chunk)
+                    yield stream.drain()
+            yield stream.drain()
+    yield stream.drain()
@@ -1,5 +1,5 @@
 from django import forms
-from .models import Customer, Invoice, InvoiceItem
+from .models import Customer, Invoice, InvoiceItem, ZReport
 from inventory.models import Product
 
 
@@ -20,7 +20,8 @@ class InvoiceForm(forms.ModelForm):
         model = Invoice
         fields = ['customer', 'customer_name', 'customer_phone', 'payment_method', 'discount', 'notes']
         widgets = {
-            'customer': forms.Select(attrs={'class': 'form-select'}),
+            # Chosen with the typeahead; a <select> would render every customer
+            'customer': forms.HiddenInput(),
             'customer_name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Walk-in customer name'}),
             'customer_phone': forms.TextInput(attrs={'class': 'form-control'}),
             'payment_method': forms.Select(attrs={'class': 'form-select'}),
@@ -28,6 +29,13 @@ class InvoiceForm(forms.ModelForm):
             'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
         }
 
+    redeem_points = forms.IntegerField(
+        min_value=0,
+        required=False,
+        help_text='Loyalty points to spend as a discount',
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'min': 0}),
+    )
+
 
 class InvoiceItemForm(forms.ModelForm):
     class Meta:
@@ -50,3 +58,14 @@ class InvoicePaymentForm(forms.Form):
         choices=Invoice.PAYMENT_METHOD_CHOICES,
         widget=forms.Select(attrs={'class': 'form-select'})
     )
+
+
+class ShiftCloseForm(forms.ModelForm):
+    class Meta:
+        model = ZReport
+        fields = ['opening_float', 'counted_cash', 'notes']
+        widgets = {
+            'opening_float': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': 0}),
+            'counted_cash': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01', 'min': 0}),
+            'notes': forms.Textarea(attrs={'class': 'form-control', 'rows': 2}),
+        }
@@ -0,0 +1,130 @@
+"""
+Loyalty points: earned when an invoice is paid, spent as a discount at
+checkout, and taken back when the sale is returned or cancelled.
+
+Every movement is a LoyaltyEntry row. The balance is not summed from the
+ledger, though. Customer.loyalty_points is moved with an F() update in the
+same transaction, so a balance check is one primary-key read. Redemption is
+one conditional UPDATE that only matches while the balance covers it, so two
+tills cannot spend the same points.
+"""
+from decimal import ROUND_FLOOR, Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Customer, Invoice, LoyaltyEntry
+
+
+class LoyaltyError(Exception):
+    pass
+
+
+def point_value():
+    return Decimal(settings.LOYALTY_POINT_VALUE)
+
+
+def tier_multiplier(lifetime_points):
+    for name, threshold, multiplier in settings.LOYALTY_TIERS:
+        if lifetime_points >= threshold:
+            return Decimal(multiplier)
+    return Decimal('1')
+
+
+def points_for(amount, lifetime_points=0):
+    points = amount / settings.LOYALTY_SPEND_PER_POINT * tier_multiplier(lifetime_points)
+    return max(int(points.to_integral_value(ROUND_FLOOR)), 0)
+
+
+def balance(customer_id):
+    """(points, lifetime points) for one customer, or None if there is no such customer."""
+    return Customer.objects.filter(pk=customer_id).values_list(
+        'loyalty_points', 'loyalty_lifetime_points'
+    ).first()
+
+
+def _post(customer_id, kind, points, invoice=None, note='', user=None, lifetime=0):
+    LoyaltyEntry.objects.create(
+        customer_id=customer_id, invoice=invoice, kind=kind, points=points, note=note, created_by=user,
+    )
+    Customer.objects.filter(pk=customer_id).update(
+        loyalty_points=F('loyalty_points') + points,
+        loyalty_lifetime_points=F('loyalty_lifetime_points') + lifetime,
+    )
+
+
+@transaction.atomic
+def redeem(invoice, points, user=None):
+    """
+    Spend ``points`` of the invoice customer's balance as a discount on a
+    saved invoice whose totals are already calculated. Raises LoyaltyError
+    if the customer cannot cover it.
+    """
+    if not points:
+        return
+    if not invoice.customer_id:
+        raise LoyaltyError('Points can only be redeemed by a registered customer.')
+    value = points * point_value()
+    if value > invoice.total_amount:
+        raise LoyaltyError(f'{points} points are worth ₹{value}, more than the invoice total.')
+
+    spent = Customer.objects.filter(pk=invoice.customer_id, loyalty_points__gte=points).update(
+        loyalty_points=F('loyalty_points') - points,
+    )
+    if not spent:
+        available = (balance(invoice.customer_id) or (0, 0))[0]
+        raise LoyaltyError(f'Only {available} points available.')
+    LoyaltyEntry.objects.create(
+        customer_id=invoice.customer_id, invoice=invoice, kind='redeem', points=-points,
+        note=f'Invoice #{invoice.invoice_number}', created_by=user,
+    )
+
+    invoice.discount += value
+    invoice.total_amount -= value
+    invoice.points_redeemed += points
+    invoice.save(update_fields=['discount', 'total_amount', 'points_redeemed', 'updated_at'])
+
+
+def earn(invoice, user=None):
+    """Credit the points for a paid invoice once; returns the points credited."""
+    if not invoice.customer_id or invoice.status != 'paid':
+        return 0
+    current = balance(invoice.customer_id)
+    points = points_for(invoice.net_total, current[1] if current else 0)
+    if not points:
+        return 0
+    try:
+        with transaction.atomic():
+            _post(invoice.customer_id, 'earn', points, invoice, f'Invoice #{invoice.invoice_number}', user, points)
+            Invoice.objects.filter(pk=invoice.pk).update(points_earned=points, updated_at=timezone.now())
+    except IntegrityError:
+        # Already credited for this invoice
+        return 0
+    invoice.points_earned = points
+    return points
+
+
+def reverse(invoice, fraction, note, user=None):
+    """
+    Take back ``fraction`` (0-1) of the points an invoice still carries:
+    earned points leave the balance, redeemed points return to it. Call
+    with the invoice locked, before its refunded amount moves.
+    """
+    if not invoice.customer_id:
+        return
+    fraction = min(Decimal(fraction), Decimal('1'))
+    earned = int((invoice.points_earned * fraction).to_integral_value())
+    refunded = int((invoice.points_redeemed * fraction).to_integral_value())
+    if earned:
+        _post(invoice.customer_id, 'reverse', -earned, invoice, note, user, -earned)
+    if refunded:
+        _post(invoice.customer_id, 'refund', refunded, invoice, note, user)
+    if earned or refunded:
+        Invoice.objects.filter(pk=invoice.pk).update(
+            points_earned=F('points_earned') - earned,
+            points_redeemed=F('points_redeemed') - refunded,
+        )
+        invoice.points_earned -= earned
+        invoice.points_redeemed -= refunded
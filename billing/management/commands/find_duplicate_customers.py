@@ -0,0 +1,91 @@
+from django.core.management.base import BaseCommand
+
+from billing.dedup import MIN_NAME_SCORE, find_candidates, link_walk_in_invoices, merge_customers, record_candidates
+from billing.models import Customer
+
+
+class Command(BaseCommand):
+    help = (
+        'Find customers that share a phone or email and have similar names, '
+        'and queue them for review on the duplicates page. Run nightly.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--min-score', type=float, default=MIN_NAME_SCORE,
+            help='Minimum name similarity (0-1) for pairs sharing only one of phone/email'
+        )
+        parser.add_argument(
+            '--auto-merge', type=float, metavar='SCORE',
+            help='Merge pairs sharing phone and email with at least this name similarity, without review'
+        )
+        parser.add_argument(
+            '--link-walk-ins', action='store_true',
+            help='Attach walk-in invoices to the customer with the same phone'
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Report candidates without saving')
+
+    def handle(self, *args, **options):
+        candidates = find_candidates(options['min_score'])
+        self.stdout.write(f'Found {len(candidates)} candidate pairs.')
+        if options['dry_run']:
+            names = dict(Customer.objects.filter(
+                pk__in={pk for pair in candidates for pk in pair}
+            ).values_list('pk', 'name'))
+            for (a, b), (score, reasons) in sorted(candidates.items(), key=lambda c: -c[1][0]):
+                self.stdout.write(f'  {score:.2f} [{reasons}] #{a} {names[a]} ~ #{b} {names[b]}')
+            return
+
+        if options['auto_merge'] is not None:
+            merged = self.auto_merge(candidates, options['auto_merge'])
+            self.stdout.write(f'Auto-merged {merged} customers.')
+
+        created = record_candidates(candidates)
+        self.stdout.write(f'Queued {created} new pairs for review.')
+
+        if options['link_walk_ins']:
+            self.stdout.write(f'Linked {link_walk_in_invoices()} walk-in invoices to customers.')
+
+        self.stdout.write(self.style.SUCCESS('Done.'))
+
+    def auto_merge(self, candidates, threshold):
+        # Union-find over the qualifying pairs so chains (a~b, b~c, a~c in any
+        # order) collapse into one group kept as its oldest customer
+        parent = {}
+
+        def find(pk):
+            parent.setdefault(pk, pk)
+            while parent[pk] != pk:
+                parent[pk] = parent[parent[pk]]
+                pk = parent[pk]
+            return pk
+
+        for (a, b), (score, reasons) in candidates.items():
+            if score >= threshold and reasons == 'email,phone':
+                root_a, root_b = find(a), find(b)
+                if root_a != root_b:
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        groups = {}
+        for pk in parent:
+            groups.setdefault(find(pk), []).append(pk)
+        customers = Customer.objects.in_bulk(parent)
+
+        merged = 0
+        for keep, members in groups.items():
+            if keep in customers:
+                merge_customers(customers[keep], [customers[pk] for pk in members if pk in customers])
+                merged += len(members) - 1
+
+        # Pairs now inside one customer are done; the rest still need review,
+        # pointed at the customer their merged side was folded into
+        for (a, b), (score, reasons) in list(candidates.items()):
+            root_a, root_b = find(a), find(b)
+            if (root_a, root_b) == (a, b):
+                continue
+            del candidates[(a, b)]
+            if root_a != root_b:
+                pair = (min(root_a, root_b), max(root_a, root_b))
+                if pair not in candidates or candidates[pair][0] < score:
+                    candidates[pair] = (score, reasons)
+        return merged
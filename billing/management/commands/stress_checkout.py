@@ -0,0 +1,209 @@
+import logging
+import multiprocessing
+import random
+import statistics
+import time
+import uuid
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, IntegrityError, OperationalError, connections
+from django.db.models import Sum
+from django.test import Client
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from audit import recorder as audit
+from billing.models import Invoice, InvoiceItem
+from inventory.models import COLOR_CHOICES, SIZE_CHOICES, Category, Product
+from store_project.db_pool import release_for_fork
+
+LOCAL_HOSTS = {'', 'localhost', '127.0.0.1', '::1'}
+
+
+def classify_error(exc):
+    message = str(exc).lower()
+    if isinstance(exc, OperationalError) and 'deadlock' in message:
+        return 'deadlock'
+    if isinstance(exc, IntegrityError) and 'invoice_number' in message:
+        return 'invoice_number_conflict'
+    if isinstance(exc, IntegrityError):
+        return 'integrity_error'
+    if isinstance(exc, OperationalError) and 'could not serialize' in message:
+        return 'serialization_failure'
+    return 'error'
+
+
+def worker(args):
+    """One terminal: create invoices on the hot products, cancelling some."""
+    worker_id, user_id, product_ids, ops, cancel_ratio, max_lines, run_tag, seed = args
+    connections.close_all()
+    # Failures are tallied below; keep the request logger from dumping tracebacks
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    rng = random.Random(seed)
+    client = Client(SERVER_NAME='localhost', raise_request_exception=True)
+    client.force_login(CustomUser.objects.get(pk=user_id))
+
+    results = []
+    created = []
+    for _ in range(ops):
+        if created and rng.random() < cancel_ratio:
+            action = 'cancel'
+            invoice_id = created.pop(rng.randrange(len(created)))
+            request = lambda: client.post(reverse('invoice_cancel', args=[invoice_id]))
+        else:
+            action = 'create'
+            lines = rng.sample(product_ids, min(len(product_ids), rng.randint(1, max_lines)))
+            data = {
+                'payment_method': 'cash',
+                'discount': '0',
+                'customer_name': f'Stress {worker_id}',
+                'notes': run_tag,
+                'product_id': lines,
+                'quantity': [str(rng.randint(1, 3)) for _ in lines],
+                'unit_price': ['' for _ in lines],
+            }
+            request = lambda: client.post(reverse('invoice_create'), data)
+
+        start = time.perf_counter()
+        try:
+            response = request()
+            location = response.get('Location', '')
+            if action == 'create' and response.status_code == 302 and location.rstrip('/').endswith('create'):
+                outcome = 'insufficient_stock'
+            elif response.status_code == 302:
+                outcome = 'ok'
+                if action == 'create':
+                    created.append(int(location.rstrip('/').rsplit('/', 1)[-1]))
+            else:
+                outcome = f'http_{response.status_code}'
+        except DatabaseError as exc:
+            outcome = classify_error(exc)
+            connections.close_all()
+        results.append((action, outcome, (time.perf_counter() - start) * 1000))
+
+    # Pool workers exit without running atexit handlers
+    audit.flush()
+    connections.close_all()
+    return results
+
+
+class Command(BaseCommand):
+    help = (
+        'Fire parallel invoice creations/cancellations at the checkout views and check '
+        'for overselling, deadlocks and invoice number conflicts. Exits non-zero on failure.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=8)
+        parser.add_argument('--ops', type=int, default=50, help='Operations per process per level')
+        parser.add_argument('--contention', default='1,5,50',
+                            help='Comma separated numbers of hot products to spread sales over')
+        parser.add_argument('--stock', type=int, default=200, help='Starting stock per hot product')
+        parser.add_argument('--cancel-ratio', type=float, default=0.2)
+        parser.add_argument('--max-lines', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--keep', action='store_true', help='Keep the stress invoices and products')
+        parser.add_argument('--allow-remote', action='store_true',
+                            help='Allow running against a non-local database host')
+
+    def handle(self, *args, **options):
+        db = settings.DATABASES['default']
+        if db.get('HOST', '') not in LOCAL_HOSTS and not options['allow_remote']:
+            raise CommandError(f"Refusing to stress a remote database ({db['HOST']}); pass --allow-remote to override.")
+
+        user = self.stress_user()
+        levels = [int(level) for level in options['contention'].split(',')]
+        failed = False
+
+        self.stdout.write(
+            f"{'hot SKUs':>8}{'ops/s':>9}{'p50 ms':>9}{'p99 ms':>9}{'ok':>6}{'no stock':>9}"
+            f"{'deadlock':>9}{'inv no.':>8}{'errors':>7}{'stock':>8}"
+        )
+        for level in levels:
+            summary = self.run_level(level, user, options)
+            failed |= summary['failed']
+
+        if failed:
+            raise CommandError('Checkout stress test failed: stock mismatch or database errors.')
+        self.stdout.write(self.style.SUCCESS('No overselling detected.'))
+
+    def stress_user(self):
+        user, created = CustomUser.objects.get_or_create(
+            username='stress_cashier',
+            defaults={'role': 'staff', 'can_create_invoice': True, 'can_cancel_invoice': True},
+        )
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=['password'])
+        return user
+
+    def create_hot_products(self, count, stock):
+        category, _ = Category.objects.get_or_create(name='Stress Test', defaults={'code': 'ZZ'})
+        sizes = [size for size, _ in SIZE_CHOICES][:count]
+        colors = [color for color, _ in COLOR_CHOICES][:-(-count // len(sizes))]
+        run = uuid.uuid4().hex[:6].upper()
+        variants = Product.create_variants(
+            sizes=sizes,
+            colors=colors,
+            style_code=f'STRESS-{run}',
+            name=f'Stress {run}',
+            category=category,
+            price=Decimal('100.00'),
+            quantity=stock,
+        )
+        Product.objects.filter(pk__in=[p.pk for p in variants[count:]]).delete()
+        return variants[:count]
+
+    def run_level(self, level, user, options):
+        products = self.create_hot_products(level, options['stock'])
+        product_ids = [p.pk for p in products]
+        run_tag = f'stress-{uuid.uuid4().hex}'
+
+        release_for_fork()
+        tasks = [
+            (i, user.pk, product_ids, options['ops'], options['cancel_ratio'],
+             options['max_lines'], run_tag, options['seed'] * 1000 + i)
+            for i in range(options['processes'])
+        ]
+        start = time.perf_counter()
+        with multiprocessing.get_context('fork').Pool(options['processes']) as pool:
+            results = [r for worker_results in pool.map(worker, tasks) for r in worker_results]
+        elapsed = time.perf_counter() - start
+
+        # Every unit sold on a still-valid invoice must have left stock exactly once
+        sold = dict(
+            InvoiceItem.objects.filter(invoice__notes=run_tag, product_id__in=product_ids)
+            .exclude(invoice__status='cancelled')
+            .values('product_id').annotate(qty=Sum('quantity')).values_list('product_id', 'qty')
+        )
+        final = dict(Product.objects.filter(pk__in=product_ids).values_list('pk', 'quantity'))
+        mismatches = {
+            pk: (final[pk], options['stock'] - sold.get(pk, 0))
+            for pk in product_ids
+            if final[pk] != options['stock'] - sold.get(pk, 0)
+        }
+
+        latencies = sorted(r[2] for r in results)
+        outcomes = [r[1] for r in results]
+        count = outcomes.count
+        p99 = statistics.quantiles(latencies, n=100)[98] if len(latencies) > 1 else latencies[0]
+        errors = len(outcomes) - count('ok') - count('insufficient_stock') - count('deadlock') - count('invoice_number_conflict')
+
+        stock_status = 'OK' if not mismatches else f'{len(mismatches)} BAD'
+        line = (
+            f"{level:>8}{len(results) / elapsed:>9.1f}{statistics.median(latencies):>9.1f}{p99:>9.1f}"
+            f"{count('ok'):>6}{count('insufficient_stock'):>9}{count('deadlock'):>9}"
+            f"{count('invoice_number_conflict'):>8}{errors:>7}{stock_status:>8}"
+        )
+        failed = bool(mismatches) or count('deadlock') or count('invoice_number_conflict') or errors
+        self.stdout.write(self.style.ERROR(line) if failed else line)
+        for pk, (actual, expected) in list(mismatches.items())[:5]:
+            self.stdout.write(f'    product {pk}: stock {actual}, expected {expected}')
+
+        if not options['keep']:
+            Invoice.objects.filter(notes=run_tag).delete()
+            Product.objects.filter(pk__in=product_ids).delete()
+
+        return {'failed': bool(failed)}
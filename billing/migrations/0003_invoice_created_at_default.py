@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:24
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0002_invoice_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='invoice',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:29
+
+import re
+
+from django.db import migrations, models
+
+
+def normalize_phone(phone):
+    # Frozen copy of billing.models.normalize_phone
+    digits = re.sub(r'\D', '', phone or '')
+    if len(digits) > 10 and digits.startswith(('91', '0')):
+        digits = digits[-10:]
+    return digits
+
+
+def backfill_phones(apps, schema_editor):
+    Customer = apps.get_model('billing', 'Customer')
+    customers = list(Customer.objects.exclude(phone='').only('pk', 'phone'))
+    for customer in customers:
+        customer.phone_normalized = normalize_phone(customer.phone)
+        customer.phone_reversed = customer.phone_normalized[::-1]
+    Customer.objects.bulk_update(customers, ['phone_normalized', 'phone_reversed'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0004_credit_notes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='phone_normalized',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=15),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='phone_reversed',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=15),
+        ),
+        migrations.RunPython(backfill_phones, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:29
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0005_customer_phone_search'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name='customer',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['name'], name='billing_customer_name_trgm', opclasses=['gin_trgm_ops']),
+        ),
+    ]
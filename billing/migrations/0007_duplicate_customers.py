@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:31
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0006_customer_name_trigram'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DuplicateCustomer',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('score', models.FloatField(help_text='Name similarity, 0-1')),
+                ('reasons', models.CharField(help_text='Shared keys, e.g. "phone,email"', max_length=50)),
+                ('status', models.CharField(choices=[('open', 'Open'), ('dismissed', 'Not a duplicate')], default='open', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('resolved_at', models.DateTimeField(blank=True, null=True)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='duplicate_candidates', to='billing.customer')),
+                ('duplicate', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='billing.customer')),
+                ('resolved_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-score'],
+                'indexes': [models.Index(fields=['status', '-score'], name='billing_dup_status_idx')],
+                'constraints': [models.UniqueConstraint(fields=('customer', 'duplicate'), name='billing_dup_pair_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0007_duplicate_customers'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='loyalty_lifetime_points',
+            field=models.IntegerField(default=0, editable=False, help_text='Points earned, net of reversals; sets the tier'),
+        ),
+        migrations.AddField(
+            model_name='customer',
+            name='loyalty_points',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='points_earned',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='points_redeemed',
+            field=models.IntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='LoyaltyEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('earn', 'Earned'), ('redeem', 'Redeemed'), ('reverse', 'Earn reversed'), ('refund', 'Redemption refunded'), ('adjust', 'Adjustment')], max_length=10)),
+                ('points', models.IntegerField(help_text='Positive adds to the balance, negative takes away')),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='loyalty_entries', to='billing.customer')),
+                ('invoice', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='loyalty_entries', to='billing.invoice')),
+            ],
+            options={
+                'verbose_name_plural': 'loyalty entries',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['customer', '-created_at'], name='billing_loyalty_cust_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('kind', 'earn')), fields=('invoice',), name='billing_loyalty_earn_once')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:36
+
+import django.core.serializers.json
+import django.db.models.deletion
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0008_loyalty'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ZReport',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveIntegerField(editable=False, unique=True)),
+                ('period_start', models.DateTimeField()),
+                ('period_end', models.DateTimeField()),
+                ('last_invoice_id', models.IntegerField(default=0)),
+                ('last_credit_note_id', models.IntegerField(default=0)),
+                ('opening_float', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('expected_cash', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('counted_cash', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('totals', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, help_text='Snapshot of the shift figures')),
+                ('notes', models.TextField(blank=True)),
+                ('closed_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='z_reports', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-number'],
+            },
+        ),
+    ]
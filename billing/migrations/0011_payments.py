@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def seed_payments(apps, schema_editor):
+    """
+    One payment per invoice already paid, stamped with its last update, and
+    each closed shift marked as covering the ones from before it closed.
+    """
+    Invoice = apps.get_model('billing', 'Invoice')
+    Payment = apps.get_model('billing', 'Payment')
+    ZReport = apps.get_model('billing', 'ZReport')
+
+    paid = (
+        Invoice.objects.filter(amount_paid__gt=0).exclude(status='cancelled')
+        .order_by('updated_at', 'pk')
+        .values_list('pk', 'payment_method', 'amount_paid', 'created_by_id', 'updated_at')
+    )
+    Payment.objects.bulk_create(
+        (
+            Payment(invoice_id=pk, kind='payment', method=method, amount=amount,
+                    created_by_id=user_id, created_at=updated_at)
+            for pk, method, amount, user_id, updated_at in paid.iterator()
+        ),
+        batch_size=1000,
+    )
+    for report in ZReport.objects.all():
+        last = Payment.objects.filter(created_at__lte=report.period_end).aggregate(last=Max('id'))['last']
+        ZReport.objects.filter(pk=report.pk).update(last_payment_id=last or 0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('billing', '0010_invoice_status_created_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='zreport',
+            name='last_payment_id',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='Payment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('payment', 'Payment'), ('refund', 'Refund')], max_length=10)),
+                ('method', models.CharField(choices=[('cash', 'Cash'), ('card', 'Card'), ('upi', 'UPI'), ('other', 'Other')], max_length=10)),
+                ('amount', models.DecimalField(decimal_places=2, help_text='Positive is money taken, negative is money handed back', max_digits=12)),
+                ('note', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, editable=False)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='payments', to='billing.invoice')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.RunPython(seed_payments, migrations.RunPython.noop),
+    ]
@@ -1,27 +1,85 @@
-from django.db import models
+import re
+
+from django.contrib.postgres.indexes import GinIndex
+from django.db import IntegrityError, connection, models, transaction
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
 from inventory.models import Product
 
 
+def normalize_phone(phone):
+    """Digits only, without the +91/0 trunk prefix: '+91 98450-12345' -> '9845012345'."""
+    digits = re.sub(r'\D', '', phone or '')
+    if len(digits) > 10 and digits.startswith(('91', '0')):
+        digits = digits[-10:]
+    return digits
+
+
+# Any fixed bigint; names the advisory lock below among the database's others
+SHIFT_LOCK_KEY = 7304211049
+
+
+def hold_shift(exclusive=False):
+    """
+    The Z-report boundary lock, held until the transaction ends. Inserts of
+    invoices, credit notes and payments take it shared; closing a shift takes
+    it exclusively, so it waits out in-flight writers and every id at or
+    below the boundary it reads has committed. SQLite has one writer anyway.
+    """
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT pg_advisory_xact_lock{'' if exclusive else '_shared'}(%s)", [SHIFT_LOCK_KEY]
+        )
+
+
 class Customer(models.Model):
     name = models.CharField(max_length=200)
     phone = models.CharField(max_length=15, blank=True)
+    # Derived from phone on save. The reversed copy turns "last digits"
+    # lookups into prefix LIKEs that its (varchar_pattern_ops) index can serve.
+    phone_normalized = models.CharField(max_length=15, blank=True, db_index=True, editable=False)
+    phone_reversed = models.CharField(max_length=15, blank=True, db_index=True, editable=False)
     email = models.EmailField(blank=True)
     address = models.TextField(blank=True)
+    # Denormalized from LoyaltyEntry so checkout reads the balance with the customer row
+    loyalty_points = models.IntegerField(default=0, editable=False)
+    loyalty_lifetime_points = models.IntegerField(default=0, editable=False, help_text='Points earned, net of reversals; sets the tier')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Typeahead by name: pg_trgm word similarity (see migration 0006)
+            GinIndex(fields=['name'], opclasses=['gin_trgm_ops'], name='billing_customer_name_trgm'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        self.phone_normalized = normalize_phone(self.phone)
+        self.phone_reversed = self.phone_normalized[::-1]
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'phone' in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'phone_normalized', 'phone_reversed'}
+        super().save(*args, **kwargs)
+
+    @property
+    def loyalty_tier(self):
+        for name, threshold, multiplier in settings.LOYALTY_TIERS:
+            if self.loyalty_lifetime_points >= threshold:
+                return name
+        return ''
+
     def total_purchases(self):
         return self.invoices.filter(status='paid').aggregate(
-            total=models.Sum('total_amount')
+            total=models.Sum(models.F('total_amount') - models.F('refunded_amount'))
         )['total'] or Decimal('0.00')
 
 
@@ -61,41 +119,85 @@ class Invoice(models.Model):
     tax_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
     total_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
     amount_paid = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    # Running total of credit notes, kept with F() updates as returns are booked
+    refunded_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'), editable=False)
+    # Loyalty points still standing for this invoice; reversals on returns and cancels take them down
+    points_earned = models.IntegerField(default=0, editable=False)
+    points_redeemed = models.IntegerField(default=0, editable=False)
     notes = models.TextField(blank=True)
+    # Client-generated key for API checkouts; a retried request returns this invoice
+    idempotency_key = models.CharField(max_length=64, unique=True, null=True, blank=True, editable=False)
     created_by = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.SET_NULL,
         null=True,
         related_name='invoices'
     )
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Not auto_now_add: invoices synced from offline terminals keep their sale time
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Open invoices by age: the receivables aging report and the pending totals
+            models.Index(fields=['status', 'created_at'], name='billing_inv_status_created_idx'),
+        ]
 
     def __str__(self):
         return f"Invoice #{self.invoice_number}"
 
+    NUMBER_ATTEMPTS = 5
+
     def save(self, *args, **kwargs):
-        if not self.invoice_number:
-            # Generate invoice number
-            last_invoice = Invoice.objects.order_by('-id').first()
-            if last_invoice:
-                last_num = int(last_invoice.invoice_number.replace('INV-', ''))
-                self.invoice_number = f'INV-{last_num + 1:06d}'
-            else:
-                self.invoice_number = 'INV-000001'
-        super().save(*args, **kwargs)
+        if self.invoice_number:
+            return super().save(*args, **kwargs)
+
+        # Two terminals can read the same last number; the unique index
+        # rejects the loser, which re-reads and takes the next one.
+        for attempt in range(self.NUMBER_ATTEMPTS):
+            self.invoice_number = self._next_invoice_number()
+            try:
+                with transaction.atomic():
+                    hold_shift()
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                self.invoice_number = ''
+                if attempt == self.NUMBER_ATTEMPTS - 1 or self._idempotency_key_taken():
+                    raise
+
+    def _idempotency_key_taken(self):
+        return bool(self.idempotency_key) and Invoice.objects.filter(
+            idempotency_key=self.idempotency_key
+        ).exists()
+
+    @staticmethod
+    def _next_invoice_number():
+        return Invoice.allocate_numbers(1)[0]
+
+    @staticmethod
+    def allocate_numbers(count):
+        """
+        The next ``count`` invoice numbers, from one query. The numbers are
+        not reserved; the unique index rejects a block that overlaps with
+        another terminal's, and the caller retries.
+        """
+        last_invoice = Invoice.objects.order_by('-id').first()
+        last_num = int(last_invoice.invoice_number.replace('INV-', '')) if last_invoice else 0
+        return [f'INV-{number:06d}' for number in range(last_num + 1, last_num + 1 + count)]
 
     def calculate_totals(self):
         self.subtotal = sum(item.total for item in self.items.all())
         self.total_amount = self.subtotal - self.discount + self.tax_amount
         self.save()
 
+    @property
+    def net_total(self):
+        return self.total_amount - self.refunded_amount
+
     @property
     def balance_due(self):
-        return self.total_amount - self.amount_paid
+        return self.net_total - self.amount_paid
 
     def get_customer_display(self):
         if self.customer:
@@ -110,6 +212,11 @@ class InvoiceItem(models.Model):
     quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
     unit_price = models.DecimalField(max_digits=10, decimal_places=2)
     total = models.DecimalField(max_digits=12, decimal_places=2)
+    returned_quantity = models.PositiveIntegerField(default=0, editable=False)
+
+    @property
+    def returnable_quantity(self):
+        return self.quantity - self.returned_quantity
 
     def save(self, *args, **kwargs):
         if self.product and not self.product_name:
@@ -121,3 +228,223 @@ class InvoiceItem(models.Model):
 
     def __str__(self):
         return f"{self.product_name} x {self.quantity}"
+
+
+class CreditNote(models.Model):
+    """Items taken back from an invoice, with the amount refunded for them."""
+    credit_note_number = models.CharField(max_length=20, unique=True, editable=False)
+    invoice = models.ForeignKey(Invoice, on_delete=models.PROTECT, related_name='credit_notes')
+    amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    restocked = models.BooleanField(default=True, help_text='Returned items went back into stock')
+    reason = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='credit_notes'
+    )
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['created_at'], name='billing_cn_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"Credit note #{self.credit_note_number}"
+
+    def save(self, *args, **kwargs):
+        if self.credit_note_number:
+            return super().save(*args, **kwargs)
+
+        # Same scheme as invoice numbers: retry if another return took the number
+        for attempt in range(Invoice.NUMBER_ATTEMPTS):
+            last = CreditNote.objects.order_by('-id').values_list('credit_note_number', flat=True).first()
+            self.credit_note_number = f"CN-{int(last.replace('CN-', '')) + 1 if last else 1:06d}"
+            try:
+                with transaction.atomic():
+                    hold_shift()
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                self.credit_note_number = ''
+                if attempt == Invoice.NUMBER_ATTEMPTS - 1:
+                    raise
+
+
+class CreditNoteItem(models.Model):
+    credit_note = models.ForeignKey(CreditNote, on_delete=models.CASCADE, related_name='items')
+    invoice_item = models.ForeignKey(InvoiceItem, on_delete=models.PROTECT, related_name='returns')
+    product = models.ForeignKey(Product, on_delete=models.SET_NULL, null=True)
+    product_name = models.CharField(max_length=200)
+    quantity = models.PositiveIntegerField(validators=[MinValueValidator(1)])
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.product_name} x {self.quantity} returned"
+
+
+class Payment(models.Model):
+    """
+    Money taken for an invoice or handed back on a return or cancel.
+    Invoice.amount_paid is their running sum; Z-reports count these rows,
+    so each lands in the shift the drawer actually moved in.
+    """
+    KIND_CHOICES = [
+        ('payment', 'Payment'),
+        ('refund', 'Refund'),
+    ]
+
+    invoice = models.ForeignKey(Invoice, on_delete=models.PROTECT, related_name='payments')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    method = models.CharField(max_length=10, choices=Invoice.PAYMENT_METHOD_CHOICES)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, help_text='Positive is money taken, negative is money handed back')
+    note = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.invoice_id} {self.amount:+} ({self.method})"
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            if self._state.adding:
+                hold_shift()
+            super().save(*args, **kwargs)
+
+
+class DuplicateCustomer(models.Model):
+    """A pair of customers that look like the same person, found by find_duplicate_customers."""
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('dismissed', 'Not a duplicate'),
+    ]
+
+    # Merging deletes the duplicate customer, and with it the pair
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='duplicate_candidates')
+    duplicate = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='+')
+    score = models.FloatField(help_text='Name similarity, 0-1')
+    reasons = models.CharField(max_length=50, help_text='Shared keys, e.g. "phone,email"')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
+    resolved_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    resolved_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-score']
+        constraints = [
+            models.UniqueConstraint(fields=['customer', 'duplicate'], name='billing_dup_pair_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['status', '-score'], name='billing_dup_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer_id} ~ {self.duplicate_id} ({self.score:.2f})"
+
+
+class LoyaltyEntry(models.Model):
+    """One movement of a customer's loyalty points; Customer.loyalty_points is their running sum."""
+    KIND_CHOICES = [
+        ('earn', 'Earned'),
+        ('redeem', 'Redeemed'),
+        ('reverse', 'Earn reversed'),
+        ('refund', 'Redemption refunded'),
+        ('adjust', 'Adjustment'),
+    ]
+
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name='loyalty_entries')
+    invoice = models.ForeignKey(
+        Invoice,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='loyalty_entries'
+    )
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    points = models.IntegerField(help_text='Positive adds to the balance, negative takes away')
+    note = models.CharField(max_length=255, blank=True)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        verbose_name_plural = 'loyalty entries'
+        constraints = [
+            # Paying an invoice twice (double submit, retry) must not earn twice
+            models.UniqueConstraint(
+                fields=['invoice'], condition=models.Q(kind='earn'), name='billing_loyalty_earn_once',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['customer', '-created_at'], name='billing_loyalty_cust_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.customer_id} {self.points:+d} ({self.kind})"
+
+
+class ZReport(models.Model):
+    """
+    A closed shift: its sales figures frozen when the drawer was counted.
+    The shift is every invoice, credit note and payment recorded after the
+    previous report's, so invoices synced late from offline tills and pending
+    invoices settled later land in the next one.
+    """
+    number = models.PositiveIntegerField(unique=True, editable=False)
+    period_start = models.DateTimeField()
+    period_end = models.DateTimeField()
+    last_invoice_id = models.IntegerField(default=0)
+    last_credit_note_id = models.IntegerField(default=0)
+    last_payment_id = models.IntegerField(default=0)
+    opening_float = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal('0.00'))
+    expected_cash = models.DecimalField(max_digits=12, decimal_places=2)
+    counted_cash = models.DecimalField(max_digits=12, decimal_places=2)
+    totals = models.JSONField(encoder=DjangoJSONEncoder, help_text='Snapshot of the shift figures')
+    notes = models.TextField(blank=True)
+    closed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='z_reports'
+    )
+
+    class Meta:
+        ordering = ['-number']
+
+    def __str__(self):
+        return f"Z-{self.number:04d}"
+
+    @property
+    def cash_difference(self):
+        return self.counted_cash - self.expected_cash
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError('Z-reports cannot be changed once closed.')
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError('Z-reports cannot be deleted.')
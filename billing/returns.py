@@ -0,0 +1,146 @@
+"""
+Returns: credit notes for part of an invoice, and whole-invoice cancels.
+
+A return touches a fixed number of rows however many lines it has. Stock
+goes back with one CASE UPDATE. The invoice's refunded_amount and the
+items' returned_quantity move by F() increments, so neither the invoice
+totals nor the customer and sales figures built from them are recomputed.
+Money only goes back for what was paid beyond the reduced total; that is
+booked as a refund Payment, so an unpaid invoice's return moves no cash.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from audit import recorder as audit
+from inventory.models import Product, record_stock_movements
+
+from . import loyalty
+from .models import CreditNote, CreditNoteItem, Invoice, InvoiceItem, Payment
+
+CENTS = Decimal('0.01')
+
+
+class ReturnError(Exception):
+    """Per-item problems with a return: {invoice_item_id: [messages]} or {'__all__': [...]}."""
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+def restock(quantities, reason):
+    """Put {product_id: quantity} back on the shelf with one UPDATE."""
+    quantities = {pk: quantity for pk, quantity in quantities.items() if pk and quantity}
+    if not quantities:
+        return
+    Product.objects.filter(pk__in=quantities).update(
+        quantity=F('quantity') + Case(
+            *[When(pk=pk, then=Value(quantity)) for pk, quantity in quantities.items()],
+            default=Value(0),
+        ),
+        updated_at=timezone.now(),
+    )
+    record_stock_movements(quantities.items(), reason)
+
+
+@transaction.atomic
+def issue_credit_note(invoice_id, quantities, user, reason='', restocked=True):
+    """
+    Return {invoice_item_id: quantity} from an invoice. Raises ReturnError
+    when a quantity exceeds what is still returnable.
+    """
+    invoice = Invoice.objects.select_for_update().get(pk=invoice_id)
+    if invoice.status == 'cancelled':
+        raise ReturnError({'__all__': ['Cancelled invoices cannot take returns.']})
+
+    quantities = {int(pk): int(quantity) for pk, quantity in quantities.items() if int(quantity) > 0}
+    if not quantities:
+        raise ReturnError({'__all__': ['Choose at least one item to return.']})
+
+    items = list(InvoiceItem.objects.select_for_update().filter(invoice=invoice, pk__in=quantities))
+    errors = {pk: ['Not an item of this invoice.'] for pk in quantities.keys() - {item.pk for item in items}}
+    for item in items:
+        if quantities[item.pk] > item.returnable_quantity:
+            errors[item.pk] = [f'Only {item.returnable_quantity} of {item.product_name} can be returned.']
+    if errors:
+        raise ReturnError(errors)
+
+    # The invoice discount is shared across lines in proportion to their value
+    share = (invoice.total_amount / invoice.subtotal) if invoice.subtotal else Decimal('1')
+    lines = [
+        CreditNoteItem(
+            invoice_item=item,
+            product_id=item.product_id,
+            product_name=item.product_name,
+            quantity=quantities[item.pk],
+            unit_price=item.unit_price,
+            total=quantities[item.pk] * item.unit_price,
+        )
+        for item in items
+    ]
+    amount = sum(line.total for line in lines) * share
+    fully_returned = not InvoiceItem.objects.filter(invoice=invoice).exclude(pk__in=quantities).filter(
+        returned_quantity__lt=F('quantity')
+    ).exists() and all(quantities[item.pk] == item.returnable_quantity for item in items)
+    if fully_returned:
+        # The last return takes whatever is left, so rounding never leaves cents behind
+        amount = invoice.net_total
+    amount = min(amount.quantize(CENTS), invoice.net_total)
+    # Only what was paid beyond the reduced total is handed back over the counter
+    handed_back = max(min(amount, invoice.amount_paid - (invoice.net_total - amount)), Decimal('0.00'))
+    # Points go back in the same proportion as the money
+    fraction = Decimal('1') if fully_returned or not invoice.net_total else amount / invoice.net_total
+
+    credit_note = CreditNote.objects.create(
+        invoice=invoice, amount=amount, restocked=restocked, reason=reason, created_by=user,
+    )
+    for line in lines:
+        line.credit_note = credit_note
+    CreditNoteItem.objects.bulk_create(lines)
+    loyalty.reverse(invoice, fraction, f'Credit note #{credit_note.credit_note_number}', user)
+
+    for item in items:
+        item.returned_quantity += quantities[item.pk]
+    InvoiceItem.objects.bulk_update(items, ['returned_quantity'])
+    Invoice.objects.filter(pk=invoice.pk).update(
+        refunded_amount=F('refunded_amount') + amount,
+        amount_paid=F('amount_paid') - handed_back,
+        updated_at=timezone.now(),
+    )
+    if handed_back:
+        Payment.objects.create(
+            invoice=invoice, kind='refund', method=invoice.payment_method, amount=-handed_back,
+            note=f'Credit note #{credit_note.credit_note_number}', created_by=user,
+        )
+
+    if restocked:
+        sold_back = {}
+        for line in lines:
+            sold_back[line.product_id] = sold_back.get(line.product_id, 0) + line.quantity
+        restock(sold_back, f'Credit note #{credit_note.credit_note_number}')
+
+    audit.record('create', CreditNote, credit_note.pk, str(credit_note), {
+        'invoice': [None, invoice.invoice_number],
+        'amount': [None, str(amount)],
+        'items': [None, {line.product_name: line.quantity for line in lines}],
+    })
+    return credit_note
+
+
+def cancel_invoice(invoice, user=None):
+    """Void a locked invoice, restock whatever was not already returned, hand back what was paid and undo its points."""
+    remaining = {}
+    for product_id, quantity, returned in invoice.items.values_list('product_id', 'quantity', 'returned_quantity'):
+        remaining[product_id] = remaining.get(product_id, 0) + quantity - returned
+    restock(remaining, f'Invoice #{invoice.invoice_number} cancelled')
+    loyalty.reverse(invoice, 1, f'Invoice #{invoice.invoice_number} cancelled', user)
+    if invoice.amount_paid:
+        Payment.objects.create(
+            invoice=invoice, kind='refund', method=invoice.payment_method, amount=-invoice.amount_paid,
+            note=f'Invoice #{invoice.invoice_number} cancelled', created_by=user,
+        )
+        invoice.amount_paid = Decimal('0.00')
+    invoice.status = 'cancelled'
+    invoice.save()
@@ -0,0 +1,40 @@
+"""
+Customer lookup for the invoice typeahead and the customer list.
+
+Digits search by the end of the phone number: the reversed, normalized
+phone is indexed, so "last 4 digits" is an index range scan rather than a
+table scan. Anything else is treated as a name and matched by pg_trgm word
+similarity on the GIN-indexed name (icontains on other databases).
+"""
+import re
+
+from django.db import connection
+
+from .models import Customer, normalize_phone
+
+PHONE_QUERY = re.compile(r'^[\d\s()+-]+$')
+MIN_PHONE_DIGITS = 3
+TYPEAHEAD_LIMIT = 10
+
+
+def search_customers(query, customers=None):
+    customers = Customer.objects.all() if customers is None else customers
+    query = query.strip()
+
+    if PHONE_QUERY.match(query):
+        digits = re.sub(r'\D', '', query)
+        if len(digits) < MIN_PHONE_DIGITS:
+            return customers.none()
+        # Full numbers with a +91/0 prefix still match their stored suffix
+        digits = normalize_phone(digits) if len(digits) > 10 else digits
+        return customers.filter(phone_reversed__startswith=digits[::-1])
+
+    if '@' in query:
+        return customers.filter(email__istartswith=query)
+
+    if connection.vendor == 'postgresql':
+        from django.contrib.postgres.search import TrigramWordSimilarity
+        return customers.filter(name__trigram_word_similar=query).annotate(
+            similarity=TrigramWordSimilarity(query, 'name'),
+        ).order_by('-similarity', 'name')
+    return customers.filter(name__icontains=query)
@@ -0,0 +1,14 @@
+from django.core.management import call_command
+
+from jobs.queue import task
+from .documents import render_documents
+
+
+@task('billing.render_invoice_documents')
+def render_invoice_documents(invoice_ids):
+    return render_documents(invoice_ids)
+
+
+@task('billing.find_duplicate_customers')
+def find_duplicate_customers():
+    call_command('find_duplicate_customers', link_walk_ins=True)
@@ -0,0 +1,98 @@
+import threading
+from decimal import Decimal
+from unittest import skipUnless
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+
+from accounts.models import CustomUser
+
+from . import closing
+from .models import Invoice, InvoiceItem, Payment
+from .returns import issue_credit_note
+
+
+def make_invoice(user, total='100.00'):
+    invoice = Invoice.objects.create(subtotal=Decimal(total), total_amount=Decimal(total), created_by=user)
+    InvoiceItem.objects.create(invoice=invoice, product_name='Tee', quantity=1, unit_price=Decimal(total))
+    return invoice
+
+
+class ShiftCloseTests(TestCase):
+    def setUp(self):
+        self.user = CustomUser.objects.create_user('cashier', password='x')
+        self.client.force_login(self.user)
+
+    def pay(self, invoice, amount, method='cash'):
+        self.client.post(f'/billing/invoices/{invoice.pk}/', {
+            'mark_paid': '1', 'amount_paid': amount, 'payment_method': method,
+        }, SERVER_NAME='localhost')
+
+    def test_rows_after_close_go_to_next_shift(self):
+        first = make_invoice(self.user)
+        report = closing.close_shift(self.user, Decimal('0.00'), Decimal('0.00'))
+        self.assertEqual(report.last_invoice_id, first.pk)
+        self.assertEqual(report.totals['sales']['count'], 1)
+
+        second = make_invoice(self.user)
+        shift = closing.current_shift()
+        self.assertEqual(shift['last_invoice_id'], second.pk)
+        self.assertEqual(shift['totals']['sales']['count'], 1)
+
+    def test_payment_counts_in_the_shift_it_was_taken(self):
+        invoice = make_invoice(self.user)
+        raised = closing.close_shift(self.user, Decimal('50.00'), Decimal('50.00'))
+        self.assertEqual(raised.expected_cash, Decimal('50.00'))
+
+        self.pay(invoice, '100.00')
+        settled = closing.close_shift(self.user, Decimal('50.00'), Decimal('150.00'))
+        self.assertEqual(settled.expected_cash, Decimal('150.00'))
+        self.assertEqual(settled.totals['sales']['count'], 0)
+
+    def test_return_on_unpaid_invoice_moves_no_cash(self):
+        unpaid, paid = make_invoice(self.user), make_invoice(self.user)
+        self.pay(paid, '100.00')
+        for invoice in (unpaid, paid):
+            issue_credit_note(invoice.pk, {invoice.items.get().pk: 1}, self.user, restocked=False)
+
+        self.assertEqual(Payment.objects.filter(kind='refund').get().invoice_id, paid.pk)
+        totals = closing.current_shift()['totals']
+        self.assertEqual(totals['refunds']['total'], Decimal('200.00'))
+        self.assertEqual(closing.expected_cash(totals, Decimal('0.00')), Decimal('0.00'))
+
+
+@skipUnless(connection.vendor == 'postgresql', 'The shift lock is a PostgreSQL advisory lock')
+class ShiftBoundaryLockTests(TransactionTestCase):
+    def test_close_waits_for_uncommitted_invoice(self):
+        user = CustomUser.objects.create_user('cashier', password='x')
+        inserted, release = threading.Event(), threading.Event()
+        result = {}
+
+        def sell():
+            try:
+                with transaction.atomic():
+                    result['invoice'] = make_invoice(user)
+                    inserted.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        def close():
+            try:
+                result['report'] = closing.close_shift(user, Decimal('0.00'), Decimal('0.00'))
+            finally:
+                connection.close()
+
+        seller = threading.Thread(target=sell)
+        seller.start()
+        self.assertTrue(inserted.wait(10))
+        closer = threading.Thread(target=close)
+        closer.start()
+        closer.join(0.5)
+        self.assertTrue(closer.is_alive(), 'close_shift read the boundary past an uncommitted invoice')
+
+        release.set()
+        seller.join(10)
+        closer.join(10)
+        self.assertEqual(result['report'].last_invoice_id, result['invoice'].pk)
+        self.assertEqual(result['report'].totals['sales']['count'], 1)
@@ -7,13 +7,30 @@ urlpatterns = [
     path('invoices/create/', views.invoice_create, name='invoice_create'),
     path('invoices/<int:pk>/', views.invoice_detail, name='invoice_detail'),
     path('invoices/<int:pk>/cancel/', views.invoice_cancel, name='invoice_cancel'),
+    path('invoices/<int:pk>/return/', views.invoice_return, name='invoice_return'),
+    path('invoices/<int:pk>/<str:kind>/', views.invoice_document, name='invoice_document'),
+    path('invoices/archive/', views.invoice_archive, name='invoice_archive'),
+
+    # Reports
+    path('receivables/', views.receivables_aging, name='receivables_aging'),
+    path('receivables/<str:customer>/', views.receivables_customer, name='receivables_customer'),
+
+    # Shift close
+    path('z-reports/', views.zreport_list, name='zreport_list'),
+    path('z-reports/close/', views.zreport_close, name='zreport_close'),
+    path('z-reports/<int:pk>/', views.zreport_detail, name='zreport_detail'),
 
     # Customers
     path('customers/', views.customer_list, name='customer_list'),
     path('customers/create/', views.customer_create, name='customer_create'),
+    path('customers/duplicates/', views.customer_duplicates, name='customer_duplicates'),
     path('customers/<int:pk>/edit/', views.customer_edit, name='customer_edit'),
     path('customers/<int:pk>/delete/', views.customer_delete, name='customer_delete'),
 
     # API
     path('api/product/<int:pk>/price/', views.get_product_price, name='get_product_price'),
+    path('api/customers/search/', views.api_customer_search, name='api_customer_search'),
+    path('api/customers/<int:pk>/loyalty/', views.api_customer_loyalty, name='api_customer_loyalty'),
+    path('api/invoices/', views.api_invoice_create, name='api_invoice_create'),
+    path('api/invoices/sync/', views.api_invoice_sync, name='api_invoice_sync'),
 ]
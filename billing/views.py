@@ -1,36 +1,31 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.views.decorators.http import require_POST
-from django.http import JsonResponse
-from django.db.models import Q, Sum
-from django.db import transaction
+from django.conf import settings
+from django.views.decorators.http import require_GET, require_POST
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.db.models import Count, F, Q, Sum
+from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from datetime import datetime
 from decimal import Decimal
-from functools import wraps
-from .models import Customer, Invoice, InvoiceItem
-from .forms import CustomerForm, InvoiceForm, InvoiceItemForm, InvoicePaymentForm
+import json
+from accounts.decorators import permission_required
+from store_project.db_routers import read_alias, use_replica
+from . import aging, closing, documents, loyalty
+from .checkout import CheckoutError, create_invoice, invoice_payload, sync_invoices, validate_invoice
+from .dedup import merge_customers
+from .models import Customer, DuplicateCustomer, Invoice, InvoiceItem, Payment, ZReport
+from .returns import ReturnError, cancel_invoice, issue_credit_note
+from .search import TYPEAHEAD_LIMIT, search_customers
+from .forms import CustomerForm, InvoiceForm, InvoiceItemForm, InvoicePaymentForm, ShiftCloseForm
 from inventory.models import Product
-
-
-def permission_required(permission_attr, redirect_url='dashboard'):
-    """Decorator to check user permissions"""
-    def decorator(view_func):
-        @wraps(view_func)
-        def wrapper(request, *args, **kwargs):
-            user = request.user
-            # Admins have all permissions
-            if user.is_admin():
-                return view_func(request, *args, **kwargs)
-            # Check specific permission
-            if getattr(user, permission_attr, False):
-                return view_func(request, *args, **kwargs)
-            messages.error(request, 'You do not have permission to access this page.')
-            return redirect(redirect_url)
-        return login_required(wrapper)
-    return decorator
+from inventory.pricing import current_price, current_prices
 
 
 @login_required
+@use_replica
 def invoice_list(request):
     invoices = Invoice.objects.select_related('customer', 'created_by').all()
 
@@ -58,8 +53,7 @@ def invoice_list(request):
 
 @permission_required('can_create_invoice')
 def invoice_create(request):
-    products = Product.objects.filter(is_active=True, quantity__gt=0)
-    customers = Customer.objects.all()
+    products = list(Product.objects.filter(is_active=True, quantity__gt=0))
 
     if request.method == 'POST':
         form = InvoiceForm(request.POST)
@@ -73,17 +67,31 @@ def invoice_create(request):
                 product_ids = request.POST.getlist('product_id')
                 quantities = request.POST.getlist('quantity')
                 prices = request.POST.getlist('unit_price')
+                price_map = current_prices([int(pk) for pk in product_ids if pk])
+                # Lock the sold rows in pk order so concurrent checkouts of the
+                # same SKUs queue up instead of overselling or deadlocking
+                locked = {
+                    product.pk: product
+                    for product in Product.objects.select_for_update()
+                    .filter(pk__in=[pk for pk in product_ids if pk]).order_by('pk')
+                }
 
                 for i, product_id in enumerate(product_ids):
                     if product_id and quantities[i]:
-                        product = Product.objects.get(pk=product_id)
+                        product = locked.get(int(product_id))
+                        if product is None:
+                            raise Product.DoesNotExist
                         quantity = int(quantities[i])
-                        price = Decimal(prices[i]) if prices[i] else product.price
+                        if prices[i]:
+                            price = Decimal(prices[i])
+                        else:
+                            price = price_map.get(product.pk) or product.price
 
                         # Deduct stock
                         if product.quantity < quantity:
                             messages.error(request, f'Insufficient stock for {product.name}')
-                            invoice.delete()
+                            # Undo the invoice and any lines already deducted
+                            transaction.set_rollback(True)
                             return redirect('invoice_create')
 
                         product.adjust_stock(-quantity, f'Invoice #{invoice.invoice_number}')
@@ -97,22 +105,39 @@ def invoice_create(request):
                         )
 
                 invoice.calculate_totals()
+                try:
+                    loyalty.redeem(invoice, form.cleaned_data.get('redeem_points'), request.user)
+                except loyalty.LoyaltyError as e:
+                    messages.error(request, str(e))
+                    transaction.set_rollback(True)
+                    return redirect('invoice_create')
+                documents.enqueue_documents([invoice.pk])
                 messages.success(request, f'Invoice {invoice.invoice_number} created successfully.')
                 return redirect('invoice_detail', pk=invoice.pk)
     else:
         form = InvoiceForm()
 
+    # Show the price in effect now, including scheduled changes
+    price_map = current_prices([product.pk for product in products])
+    for product in products:
+        product.price = price_map.get(product.pk) or product.price
+
+    # The customer is picked by typeahead; only the chosen one is loaded back
+    customer_id = form['customer'].value()
+    selected_customer = Customer.objects.filter(pk=customer_id).first() if str(customer_id or '').isdigit() else None
+
     return render(request, 'billing/invoice_form.html', {
         'form': form,
         'products': products,
-        'customers': customers,
+        'selected_customer': selected_customer,
+        'point_value': loyalty.point_value(),
         'title': 'Create Invoice'
     })
 
 
 @login_required
 def invoice_detail(request, pk):
-    invoice = get_object_or_404(Invoice.objects.prefetch_related('items'), pk=pk)
+    invoice = get_object_or_404(Invoice.objects.prefetch_related('items', 'credit_notes__items'), pk=pk)
     payment_form = InvoicePaymentForm(initial={
         'amount_paid': invoice.balance_due,
         'payment_method': invoice.payment_method
@@ -121,12 +146,24 @@ def invoice_detail(request, pk):
     if request.method == 'POST' and 'mark_paid' in request.POST:
         payment_form = InvoicePaymentForm(request.POST)
         if payment_form.is_valid():
-            invoice.amount_paid += payment_form.cleaned_data['amount_paid']
-            invoice.payment_method = payment_form.cleaned_data['payment_method']
-            if invoice.amount_paid >= invoice.total_amount:
-                invoice.status = 'paid'
-            invoice.save()
+            amount = payment_form.cleaned_data['amount_paid']
+            method = payment_form.cleaned_data['payment_method']
+            with transaction.atomic():
+                # The ledger row is what the Z-report counts, in the shift it is taken
+                invoice = Invoice.objects.select_for_update().select_related('customer').get(pk=pk)
+                invoice.amount_paid += amount
+                invoice.payment_method = method
+                if invoice.amount_paid >= invoice.net_total:
+                    invoice.status = 'paid'
+                invoice.save()
+                Payment.objects.create(
+                    invoice=invoice, kind='payment', method=method, amount=amount, created_by=request.user,
+                )
+            points = loyalty.earn(invoice, request.user)
+            documents.invalidate(invoice)
             messages.success(request, 'Payment recorded successfully.')
+            if points:
+                messages.info(request, f'{invoice.customer.name} earned {points} loyalty points.')
             return redirect('invoice_detail', pk=pk)
 
     return render(request, 'billing/invoice_detail.html', {
@@ -135,37 +172,226 @@ def invoice_detail(request, pk):
     })
 
 
+@login_required
+def invoice_document(request, pk, kind):
+    """Stream the PDF invoice, receipt PDF or ESC/POS bytes from the document cache."""
+    if kind not in documents.DOCUMENT_KINDS:
+        raise Http404
+    invoice = get_object_or_404(Invoice.objects.select_related('customer'), pk=pk)
+    path = documents.get_document(invoice, kind)
+    return FileResponse(
+        path.open('rb'),
+        content_type=documents.DOCUMENT_KINDS[kind][1],
+        as_attachment=kind == 'escpos' or 'download' in request.GET,
+        filename=documents.document_filename(invoice.invoice_number, kind),
+    )
+
+
+@permission_required('can_view_billing')
+def invoice_archive(request):
+    """Download a month's invoices (?month=YYYY-MM) as one ZIP of PDFs."""
+    try:
+        year, month = (int(part) for part in request.GET.get('month', '').split('-'))
+        start = timezone.make_aware(datetime(year, month, 1))
+    except ValueError:
+        messages.error(request, 'Choose a month to download.')
+        return redirect('invoice_list')
+    end = timezone.make_aware(datetime(year + month // 12, month % 12 + 1, 1))
+
+    invoices = Invoice.objects.filter(created_at__gte=start, created_at__lt=end).select_related('customer')
+    if not invoices.exists():
+        messages.info(request, f'No invoices in {start:%B %Y}.')
+        return redirect('invoice_list')
+
+    response = StreamingHttpResponse(
+        documents.stream_zip(invoices.order_by('created_at', 'id').iterator(chunk_size=200)),
+        content_type='application/zip',
+    )
+    response['Content-Disposition'] = f'attachment; filename="invoices-{start:%Y-%m}.zip"'
+    return response
+
+
+@permission_required('can_cancel_invoice')
+def invoice_return(request, pk):
+    """Take back selected quantities of an invoice's items with a credit note."""
+    invoice = get_object_or_404(Invoice.objects.prefetch_related('items'), pk=pk)
+    if invoice.status == 'cancelled':
+        messages.error(request, 'Cancelled invoices cannot take returns.')
+        return redirect('invoice_detail', pk=pk)
+
+    errors = {}
+    if request.method == 'POST':
+        quantities = {}
+        for item in invoice.items.all():
+            value = request.POST.get(f'return_{item.pk}', '').strip() or '0'
+            if not value.isdigit():
+                errors[item.pk] = ['Enter a whole number.']
+            else:
+                quantities[item.pk] = int(value)
+
+        if not errors:
+            try:
+                credit_note = issue_credit_note(
+                    invoice.pk, quantities, request.user,
+                    reason=request.POST.get('reason', '').strip()[:255],
+                    restocked='restock' in request.POST,
+                )
+            except ReturnError as e:
+                errors = e.errors
+            else:
+                documents.invalidate(Invoice.objects.get(pk=pk))
+                messages.success(
+                    request,
+                    f'Credit note {credit_note.credit_note_number} issued for ₹{credit_note.amount}.'
+                )
+                return redirect('invoice_detail', pk=pk)
+
+        for message in errors.get('__all__', []):
+            messages.error(request, message)
+
+    items = list(invoice.items.all())
+    for item in items:
+        item.errors = errors.get(item.pk, [])
+        item.requested = request.POST.get(f'return_{item.pk}', '') if request.method == 'POST' else ''
+    return render(request, 'billing/invoice_return.html', {
+        'invoice': invoice,
+        'items': items,
+        'reason': request.POST.get('reason', ''),
+        'restock': request.method != 'POST' or 'restock' in request.POST,
+    })
+
+
 @permission_required('can_cancel_invoice')
 @require_POST
 def invoice_cancel(request, pk):
-    invoice = get_object_or_404(Invoice, pk=pk)
-
-    if invoice.status == 'cancelled':
-        messages.error(request, 'Invoice is already cancelled.')
-    else:
-        with transaction.atomic():
-            # Restore stock
-            for item in invoice.items.all():
-                if item.product:
-                    item.product.adjust_stock(item.quantity, f'Invoice #{invoice.invoice_number} cancelled')
-
-            invoice.status = 'cancelled'
-            invoice.save()
+    with transaction.atomic():
+        # Locking the invoice stops two cancels from restoring stock twice
+        invoice = get_object_or_404(Invoice.objects.select_for_update(), pk=pk)
+
+        if invoice.status == 'cancelled':
+            messages.error(request, 'Invoice is already cancelled.')
+        else:
+            cancel_invoice(invoice, request.user)
+            documents.invalidate(invoice)
             messages.success(request, 'Invoice cancelled and stock restored.')
 
     return redirect('invoice_detail', pk=pk)
 
 
+@permission_required('can_view_billing')
+@use_replica
+def receivables_aging(request):
+    """Outstanding balances per customer by invoice age; ?format=csv streams the full report."""
+    rows = aging.aging_by_customer()
+    if request.GET.get('format') == 'csv':
+        response = StreamingHttpResponse(
+            # Streamed after the view returns; keep the rows on this request's replica
+            aging.stream_csv(rows.using(read_alias()).iterator(chunk_size=2000)),
+            content_type='text/csv',
+        )
+        response['Content-Disposition'] = f'attachment; filename="receivables-{timezone.localdate():%Y-%m-%d}.csv"'
+        return response
+
+    page = Paginator(rows, 50).get_page(request.GET.get('page'))
+    for row in page:
+        row['buckets'] = [row[key] for key in aging.BUCKET_KEYS]
+    totals = aging.aging_totals()
+    totals['buckets'] = [totals[key] for key in aging.BUCKET_KEYS]
+    return render(request, 'billing/receivables_aging.html', {
+        'page': page,
+        'totals': totals,
+        'buckets': aging.BUCKETS,
+        'walk_in': aging.WALK_IN,
+    })
+
+
+@permission_required('can_view_billing')
+@use_replica
+def receivables_customer(request, customer):
+    """The open invoices behind one customer's aging row, optionally one bucket."""
+    if customer == aging.WALK_IN:
+        name = 'Walk-in customers'
+    elif customer.isdigit():
+        name = get_object_or_404(Customer, pk=customer).name
+    else:
+        raise Http404
+    bucket = request.GET.get('bucket')
+    if bucket not in aging.BUCKET_KEYS:
+        bucket = None
+
+    invoices = aging.customer_invoices(customer, bucket).select_related('customer')
+    page = Paginator(invoices, 50).get_page(request.GET.get('page'))
+    today = timezone.localdate()
+    for invoice in page:
+        invoice.age = (today - timezone.localtime(invoice.created_at).date()).days
+    return render(request, 'billing/receivables_customer.html', {
+        'page': page,
+        'name': name,
+        'customer': customer,
+        'bucket': bucket,
+        'buckets': aging.BUCKETS,
+    })
+
+
+@permission_required('can_view_billing')
+def zreport_list(request):
+    page = Paginator(ZReport.objects.select_related('closed_by'), 25).get_page(request.GET.get('page'))
+    return render(request, 'billing/zreport_list.html', {'page': page})
+
+
+@permission_required('can_cancel_invoice')
+def zreport_close(request):
+    """Show the open shift's figures and freeze them with the counted cash."""
+    previous = ZReport.objects.order_by('-number').first()
+    form = ShiftCloseForm(request.POST or None, initial={
+        'opening_float': previous.opening_float if previous else Decimal('0.00'),
+    })
+    if request.method == 'POST' and form.is_valid():
+        try:
+            report = closing.close_shift(
+                request.user,
+                form.cleaned_data['opening_float'],
+                form.cleaned_data['counted_cash'],
+                form.cleaned_data['notes'],
+            )
+        except (IntegrityError, closing.ShiftClosed):
+            messages.error(request, 'The shift was just closed by someone else.')
+            return redirect('zreport_list')
+        messages.success(request, f'Shift closed as {report}.')
+        return redirect('zreport_detail', pk=report.pk)
+
+    shift = closing.current_shift()
+    return render(request, 'billing/zreport_close.html', {
+        'form': form,
+        'shift': shift,
+        'totals': shift['totals'],
+        'cash_movement': closing.expected_cash(shift['totals'], Decimal('0.00')),
+    })
+
+
+@permission_required('can_view_billing')
+def zreport_detail(request, pk):
+    """A closed shift, straight from its snapshot."""
+    report = get_object_or_404(ZReport.objects.select_related('closed_by'), pk=pk)
+    return render(request, 'billing/zreport_detail.html', {
+        'report': report,
+        'totals': report.totals,
+    })
+
+
 @login_required
+@use_replica
 def customer_list(request):
-    customers = Customer.objects.all()
+    # Paid totals in the same query instead of one aggregate per row
+    customers = Customer.objects.annotate(
+        paid_total=Sum(
+            F('invoices__total_amount') - F('invoices__refunded_amount'),
+            filter=Q(invoices__status='paid'),
+        )
+    )
     search_query = request.GET.get('search', '')
     if search_query:
-        customers = customers.filter(
-            Q(name__icontains=search_query) |
-            Q(phone__icontains=search_query) |
-            Q(email__icontains=search_query)
-        )
+        customers = search_customers(search_query, customers)
     return render(request, 'billing/customer_list.html', {
         'customers': customers,
         'search_query': search_query
@@ -202,6 +428,43 @@ def customer_edit(request, pk):
     return render(request, 'billing/customer_form.html', {'form': form, 'title': 'Edit Customer'})
 
 
+@permission_required('can_manage_customers')
+def customer_duplicates(request):
+    """Review pairs queued by find_duplicate_customers: merge either way round, or dismiss."""
+    if request.method == 'POST':
+        pair = get_object_or_404(
+            DuplicateCustomer.objects.select_related('customer', 'duplicate'),
+            pk=request.POST.get('pair'), status='open',
+        )
+        action = request.POST.get('action')
+        if action == 'dismiss':
+            pair.status = 'dismissed'
+            pair.resolved_by = request.user
+            pair.resolved_at = timezone.now()
+            pair.save()
+            messages.info(request, f'Kept {pair.customer.name} and {pair.duplicate.name} apart.')
+        elif action in ('keep_customer', 'keep_duplicate'):
+            keep, other = pair.customer, pair.duplicate
+            if action == 'keep_duplicate':
+                keep, other = other, keep
+            moved = merge_customers(keep, [other], request.user)
+            messages.success(request, f'Merged {other.name} into {keep.name}; {moved} invoices moved.')
+        return redirect('customer_duplicates')
+
+    pairs = DuplicateCustomer.objects.filter(status='open').select_related('customer', 'duplicate')
+    page = Paginator(pairs, 25).get_page(request.GET.get('page'))
+    # Invoice counts for the customers on this page, in one query
+    ids = {pk for pair in page for pk in (pair.customer_id, pair.duplicate_id)}
+    counts = dict(
+        Invoice.objects.filter(customer_id__in=ids).values('customer_id')
+        .annotate(n=Count('id')).values_list('customer_id', 'n')
+    )
+    for pair in page:
+        pair.customer.invoice_count = counts.get(pair.customer_id, 0)
+        pair.duplicate.invoice_count = counts.get(pair.duplicate_id, 0)
+    return render(request, 'billing/customer_duplicates.html', {'page': page})
+
+
 @permission_required('can_manage_customers')
 @require_POST
 def customer_delete(request, pk):
@@ -214,11 +477,114 @@ def customer_delete(request, pk):
     return redirect('customer_list')
 
 
+@login_required
+@require_GET
+def api_customer_search(request):
+    """Typeahead: customers by last phone digits, email or name (?q=)."""
+    query = request.GET.get('q', '')
+    if not query.strip():
+        return JsonResponse({'customers': []})
+    customers = search_customers(query).values('id', 'name', 'phone', 'email', 'loyalty_points')[:TYPEAHEAD_LIMIT]
+    return JsonResponse({'customers': list(customers)})
+
+
+@login_required
+@require_GET
+def api_customer_loyalty(request, pk):
+    """A customer's points balance and tier, for the till to check before redeeming."""
+    current = loyalty.balance(pk)
+    if current is None:
+        raise Http404
+    points, lifetime = current
+    return JsonResponse({
+        'customer': pk,
+        'points': points,
+        'lifetime_points': lifetime,
+        'tier': Customer(loyalty_lifetime_points=lifetime).loyalty_tier,
+        'point_value': str(loyalty.point_value()),
+    })
+
+
 @login_required
 def get_product_price(request, pk):
     """API endpoint to get product price for invoice form."""
     product = get_object_or_404(Product, pk=pk)
     return JsonResponse({
-        'price': str(product.price),
+        'price': str(current_price(product)),
         'stock': product.quantity
     })
+
+
+def _replayed(invoice):
+    response = JsonResponse(invoice_payload(invoice))
+    response['Idempotent-Replayed'] = 'true'
+    return response
+
+
+@permission_required('can_create_invoice')
+@require_POST
+def api_invoice_create(request):
+    """
+    Create an invoice from JSON: header fields as in the invoice form plus
+    ``lines`` of {product, quantity, unit_price?}. The Idempotency-Key header
+    (or ``idempotency_key`` field) makes retries safe: a repeated key returns
+    the invoice it created instead of selling again.
+    """
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'errors': {'__all__': ['Invalid JSON body.']}}, status=400)
+
+    key = request.headers.get('Idempotency-Key') or (isinstance(data, dict) and data.get('idempotency_key'))
+    if not key or len(str(key)) > 64:
+        return JsonResponse({'errors': {'idempotency_key': ['A key of up to 64 characters is required.']}}, status=400)
+    key = str(key)
+
+    existing = Invoice.objects.filter(idempotency_key=key).first()
+    if existing:
+        return _replayed(existing)
+
+    try:
+        header, lines = validate_invoice(data)
+        invoice = create_invoice(header, lines, request.user, idempotency_key=key)
+        documents.enqueue_documents([invoice.pk])
+    except CheckoutError as e:
+        return JsonResponse({'errors': e.errors}, status=e.status)
+    except IntegrityError:
+        # A concurrent retry with the same key won the race
+        existing = Invoice.objects.filter(idempotency_key=key).first()
+        if existing is None:
+            raise
+        return _replayed(existing)
+
+    return JsonResponse(invoice_payload(invoice), status=201)
+
+
+@permission_required('can_create_invoice')
+@require_POST
+def api_invoice_sync(request):
+    """
+    Upload invoices a POS terminal queued while offline: {"invoices": [...]},
+    each shaped like an api_invoice_create body plus its ``idempotency_key``
+    and optional ``created_at`` (sale time). Re-uploading the same queue is
+    safe; already-synced keys are reported as duplicates.
+    """
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'errors': {'__all__': ['Invalid JSON body.']}}, status=400)
+
+    payloads = data.get('invoices') if isinstance(data, dict) else None
+    if not isinstance(payloads, list) or not payloads:
+        return JsonResponse({'errors': {'invoices': ['Expected a non-empty list.']}}, status=400)
+    if len(payloads) > settings.POS_SYNC_MAX_INVOICES:
+        return JsonResponse({'errors': {'invoices': [
+            f'Upload at most {settings.POS_SYNC_MAX_INVOICES} invoices per request.'
+        ]}}, status=400)
+
+    report = sync_invoices(payloads, request.user)
+    documents.enqueue_documents(entry['id'] for entry in report if entry['status'] == 'created')
+    summary = {}
+    for entry in report:
+        summary[entry['status']] = summary.get(entry['status'], 0) + 1
+    return JsonResponse({'summary': summary, 'invoices': report})
@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+
+from store_project.db_routers import replica_aliases, replica_lag
+
+
+class Command(BaseCommand):
+    help = 'Show each configured read replica and its replication lag.'
+
+    def handle(self, *args, **options):
+        aliases = replica_aliases()
+        if not aliases:
+            self.stdout.write('No replicas configured (set DB_REPLICA_HOSTS); all reads use the primary.')
+            return
+
+        unhealthy = 0
+        for alias in aliases:
+            db = settings.DATABASES[alias]
+            target = f"{db['HOST']}:{db['PORT']}/{db['NAME']}"
+            try:
+                lag = replica_lag(alias)
+            except DatabaseError as exc:
+                unhealthy += 1
+                self.stdout.write(self.style.ERROR(f'{alias:<12} {target:<40} unreachable: {exc}'))
+                continue
+            line = f'{alias:<12} {target:<40} lag {lag:.2f}s'
+            if lag > settings.REPLICA_MAX_LAG_SECONDS:
+                unhealthy += 1
+                self.stdout.write(self.style.WARNING(f'{line} (over {settings.REPLICA_MAX_LAG_SECONDS}s, skipped)'))
+            else:
+                self.stdout.write(self.style.SUCCESS(line))
+
+        if unhealthy:
+            raise CommandError(f'{unhealthy} replica(s) unavailable; affected reads fall back to the primary.')
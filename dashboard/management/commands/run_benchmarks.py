@@ -0,0 +1,192 @@
+import json
+import statistics
+import subprocess
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from accounts.models import CustomUser
+from billing.models import Invoice
+from inventory.models import Product
+
+# Upper bounds on queries per request; a benchmark over budget, or without
+# one, fails the run
+QUERY_BUDGETS = {
+    'product_list_search': 8,
+    'invoice_create': 20,
+    'dashboard': 25,
+    'customer_list': 6,
+    'invoice_cancel': 20,
+}
+# Added per invoice line (--lines): row lock, stock update, movement, item insert
+QUERY_BUDGETS_PER_LINE = {
+    'invoice_create': 4,
+}
+
+
+LOCAL_HOSTS = {'', 'localhost', '127.0.0.1', '::1'}
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = 'Time hot request paths, check their query counts and store results for comparison across commits.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=5)
+        parser.add_argument('--lines', type=int, default=10, help='Lines per benchmarked invoice')
+        parser.add_argument('--output-dir', default=str(settings.BASE_DIR / 'benchmark_results'))
+        parser.add_argument('--compare', help='Earlier results file to compare against (default: latest in output dir)')
+        parser.add_argument('--no-save', action='store_true')
+        parser.add_argument('--allow-remote', action='store_true',
+                            help='Allow running against a non-local database host')
+
+    def handle(self, *args, **options):
+        db = settings.DATABASES['default']
+        if db.get('HOST', '') not in LOCAL_HOSTS and not options['allow_remote']:
+            raise CommandError(f"Refusing to benchmark a remote database ({db['HOST']}); pass --allow-remote to override.")
+
+        # The admin exists only for the run, so it never lingers as a login
+        user = self.benchmark_user()
+        try:
+            self.benchmark(user, options)
+        finally:
+            user.delete()
+
+    def benchmark(self, user, options):
+        self.iterations = options['iterations']
+        self.client = Client(SERVER_NAME='localhost')
+        self.client.force_login(user)
+
+        lines = options['lines']
+        products = list(
+            Product.objects.filter(is_active=True, quantity__gte=self.iterations * 3)
+            .values_list('pk', 'price')[:lines]
+        )
+        if len(products) < lines:
+            raise CommandError('Not enough stocked products; run seed_benchmark_data first.')
+        invoice = Invoice.objects.filter(status='paid').order_by('-id').first()
+        if invoice is None:
+            raise CommandError('No paid invoices; run seed_benchmark_data first.')
+
+        invoice_post = {
+            'payment_method': 'cash',
+            'discount': '0',
+            'customer_name': 'Benchmark',
+            'product_id': [pk for pk, _ in products],
+            'quantity': ['1'] * lines,
+            'unit_price': [str(price) for _, price in products],
+        }
+
+        scenarios = {
+            'product_list_search': lambda: self.client.get(reverse('product_list'), {'search': 'Classic'}),
+            'invoice_create': lambda: self.client.post(reverse('invoice_create'), invoice_post),
+            'dashboard': lambda: self.client.get(reverse('dashboard')),
+            'customer_list': lambda: self.client.get(reverse('customer_list')),
+            'invoice_cancel': lambda: self.client.post(reverse('invoice_cancel', args=[invoice.pk])),
+        }
+
+        results = {
+            'commit': self.git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'lines': lines,
+            'benchmarks': {name: self.run(fn) for name, fn in scenarios.items()},
+        }
+        previous = self.load_previous(options)
+        failures = self.report(results['benchmarks'], previous, lines)
+
+        if not options['no_save']:
+            output_dir = Path(options['output_dir'])
+            output_dir.mkdir(parents=True, exist_ok=True)
+            path = output_dir / f"{results['timestamp'].replace(':', '')}-{results['commit']}.json"
+            path.write_text(json.dumps(results, indent=2))
+            self.stdout.write(f'Results saved to {path}')
+
+        if failures:
+            raise CommandError(f'Over query budget or without one: {", ".join(failures)}')
+
+    def benchmark_user(self):
+        user, created = CustomUser.objects.get_or_create(
+            username='bench_admin', defaults={'role': 'admin', 'is_staff': True}
+        )
+        if created:
+            user.set_unusable_password()
+            user.save(update_fields=['password'])
+        return user
+
+    def run(self, request):
+        """Time a request several times; writes are rolled back after each run."""
+        timings, query_counts, status = [], [], None
+        for _ in range(self.iterations):
+            try:
+                with transaction.atomic(), ExitStack() as stack:
+                    # Reporting views read from replicas (use_replica); count those queries too
+                    captures = [stack.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+                    start = time.perf_counter()
+                    response = request()
+                    timings.append((time.perf_counter() - start) * 1000)
+                    stack.close()
+                    query_counts.append(sum(len(queries) for queries in captures))
+                    status = response.status_code
+                    raise Rollback
+            except Rollback:
+                pass
+        return {
+            'status': status,
+            'min_ms': round(min(timings), 2),
+            'median_ms': round(statistics.median(timings), 2),
+            'max_ms': round(max(timings), 2),
+            'queries': max(query_counts),
+        }
+
+    def git_commit(self):
+        try:
+            return subprocess.check_output(
+                ['git', 'rev-parse', '--short', 'HEAD'], cwd=settings.BASE_DIR, text=True, stderr=subprocess.DEVNULL
+            ).strip()
+        except (OSError, subprocess.CalledProcessError):
+            return 'unknown'
+
+    def load_previous(self, options):
+        if options['compare']:
+            path = Path(options['compare'])
+        else:
+            files = sorted(Path(options['output_dir']).glob('*.json'))
+            path = files[-1] if files else None
+        if path is None or not path.exists():
+            return None
+        return json.loads(path.read_text())
+
+    def report(self, benchmarks, previous, lines):
+        failures = []
+        previous_benchmarks = previous['benchmarks'] if previous else {}
+        same_lines = previous is not None and previous.get('lines') == lines
+        if previous:
+            self.stdout.write(f"Comparing with {previous['commit']} ({previous['timestamp']})")
+
+        self.stdout.write(f"{'benchmark':<28}{'median ms':>12}{'change':>10}{'queries':>10}{'budget':>8}")
+        for name, result in benchmarks.items():
+            budget = QUERY_BUDGETS.get(name)
+            if budget is not None and name in QUERY_BUDGETS_PER_LINE:
+                budget += QUERY_BUDGETS_PER_LINE[name] * lines
+            change = ''
+            # Timings for a different line count are not comparable
+            if name in previous_benchmarks and (same_lines or name not in QUERY_BUDGETS_PER_LINE):
+                before = previous_benchmarks[name]['median_ms']
+                change = f'{(result["median_ms"] - before) / before * 100:+.0f}%' if before else ''
+            line = f"{name:<28}{result['median_ms']:>12.1f}{change:>10}{result['queries']:>10}{budget or '-':>8}"
+            if budget is None or result['queries'] > budget:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(line))
+            else:
+                self.stdout.write(line)
+        return failures
@@ -0,0 +1,199 @@
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from accounts.models import CustomUser
+from billing.models import Customer, Invoice, InvoiceItem, Payment
+from inventory.models import (
+    BRAND_CODE, CATEGORY_CODES, COLOR_CHOICES, GENDER_CHOICES, SEASON_CHOICES, SIZE_CHOICES,
+    Category, Product, ProductPrice, StockSnapshot, build_sku_prefix,
+)
+
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Diya', 'Ananya', 'Ishaan', 'Kavya', 'Riya', 'Arjun', 'Meera',
+               'Rohan', 'Saanvi', 'Kabir', 'Priya', 'Neha', 'Rahul', 'Simran', 'Karan', 'Pooja', 'Aman']
+LAST_NAMES = ['Sharma', 'Verma', 'Singh', 'Gupta', 'Kumar', 'Mehta', 'Kaur', 'Patel', 'Reddy', 'Nair',
+              'Joshi', 'Malhotra', 'Chopra', 'Bansal', 'Gill', 'Sandhu', 'Arora', 'Kapoor', 'Sethi', 'Bhatia']
+STYLE_WORDS = ['Classic', 'Slim Fit', 'Oversized', 'Essential', 'Vintage', 'Urban', 'Relaxed', 'Premium',
+               'Graphic', 'Striped', 'Basic', 'Athletic', 'Linen', 'Denim', 'Cotton', 'Fleece']
+
+
+class Command(BaseCommand):
+    help = 'Generate realistic benchmark volumes of products, customers and invoices with bulk inserts.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100_000)
+        parser.add_argument('--customers', type=int, default=50_000)
+        parser.add_argument('--invoices', type=int, default=1_000_000)
+        parser.add_argument('--max-items', type=int, default=5, help='Maximum lines per invoice')
+        parser.add_argument('--days', type=int, default=365, help='Spread invoices over this many past days')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+
+        categories = self.seed_categories()
+        users = self.seed_users()
+        products = self.seed_products(options['products'], categories)
+        customer_ids = self.seed_customers(options['customers'])
+        self.seed_invoices(options['invoices'], options['max_items'], options['days'], products, customer_ids, users)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark data ready.'))
+
+    def batches(self, total):
+        for start in range(0, total, self.batch_size):
+            yield start, min(self.batch_size, total - start)
+
+    def seed_categories(self):
+        for name, code in CATEGORY_CODES.items():
+            Category.objects.get_or_create(name=name, defaults={'code': code})
+        return list(Category.objects.all())
+
+    def seed_users(self):
+        users = []
+        for i in range(1, 6):
+            user, created = CustomUser.objects.get_or_create(
+                username=f'bench_cashier{i}',
+                defaults={'role': 'staff', 'can_create_invoice': True},
+            )
+            if created:
+                user.set_unusable_password()
+                user.save(update_fields=['password'])
+            users.append(user.pk)
+        return users
+
+    def seed_products(self, count, categories):
+        """Bulk-insert products with valid, non-colliding GRK SKUs. Returns [(id, price, name)]."""
+        # Highest serial already used per SKU prefix, from one scan of existing SKUs
+        serials = {}
+        for sku in Product.objects.filter(sku__startswith=f'{BRAND_CODE}-').values_list('sku', flat=True).iterator():
+            prefix, _, serial = sku.rpartition('-')
+            if serial.isdigit():
+                serials[prefix + '-'] = max(serials.get(prefix + '-', 0), int(serial))
+
+        seasons = [c[0] for c in SEASON_CHOICES]
+        genders = [c[0] for c in GENDER_CHOICES]
+        colors = [c[0] for c in COLOR_CHOICES]
+        sizes = [c[0] for c in SIZE_CHOICES]
+        rng = self.rng
+
+        for start, size in self.batches(count):
+            products = []
+            for _ in range(size):
+                category = rng.choice(categories)
+                season, gender, color, product_size = (
+                    rng.choice(seasons), rng.choice(genders), rng.choice(colors), rng.choice(sizes)
+                )
+                prefix = build_sku_prefix(season, category.code, gender, color, product_size)
+                serials[prefix] = serials.get(prefix, 0) + 1
+                price = Decimal(rng.randrange(299, 4999)) - Decimal('0.01')
+                products.append(Product(
+                    name=f'{rng.choice(STYLE_WORDS)} {category.name}',
+                    sku=f'{prefix}{serials[prefix]:03d}',
+                    category=category,
+                    season=season,
+                    gender=gender,
+                    color=color,
+                    size=product_size,
+                    price=price,
+                    cost_price=(price * Decimal('0.45')).quantize(Decimal('0.01')),
+                    quantity=rng.randrange(0, 200),
+                    low_stock_threshold=10,
+                ))
+            with transaction.atomic():
+                products = Product.objects.bulk_create(products)
+                ProductPrice.objects.bulk_create(
+                    ProductPrice(product=p, price=p.price, effective_from=self.now - timedelta(days=400))
+                    for p in products
+                )
+                StockSnapshot.objects.bulk_create(
+                    StockSnapshot(product=p, quantity=p.quantity,
+                                  snapshot_date=timezone.localdate(self.now), taken_at=self.now)
+                    for p in products
+                )
+            self.stdout.write(f'  products: {start + size}/{count}')
+
+        return list(Product.objects.values_list('pk', 'price', 'name'))
+
+    def seed_customers(self, count):
+        rng = self.rng
+        for start, size in self.batches(count):
+            Customer.objects.bulk_create(
+                Customer(
+                    name=f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}',
+                    phone=f'9{rng.randrange(10**8, 10**9)}',
+                    email=f'customer{start + i}@example.com' if rng.random() < 0.6 else '',
+                )
+                for i in range(size)
+            )
+            self.stdout.write(f'  customers: {start + size}/{count}')
+        return list(Customer.objects.values_list('pk', flat=True))
+
+    def seed_invoices(self, count, max_items, days, products, customer_ids, users):
+        rng = self.rng
+        last = Invoice.objects.order_by('-id').values_list('invoice_number', flat=True).first()
+        number = int(last.replace('INV-', '')) if last else 0
+        statuses = ['paid'] * 17 + ['pending'] * 2 + ['cancelled']
+        methods = [c[0] for c in Invoice.PAYMENT_METHOD_CHOICES]
+
+        for start, size in self.batches(count):
+            invoices, lines = [], []
+            for _ in range(size):
+                number += 1
+                created_at = self.now - timedelta(seconds=rng.randrange(days * 86400))
+                items = [
+                    (rng.choice(products), rng.randrange(1, 4))
+                    for _ in range(rng.randrange(1, max_items + 1))
+                ]
+                subtotal = sum(product[1] * qty for product, qty in items)
+                discount = Decimal(rng.choice([0, 0, 0, 50, 100]))
+                status = rng.choice(statuses)
+                total = max(subtotal - discount, Decimal('0.00'))
+                customer_id = rng.choice(customer_ids) if customer_ids and rng.random() < 0.6 else None
+                invoices.append(Invoice(
+                    invoice_number=f'INV-{number:06d}',
+                    customer_id=customer_id,
+                    customer_name='' if customer_id else rng.choice(FIRST_NAMES),
+                    status=status,
+                    payment_method=rng.choice(methods),
+                    subtotal=subtotal,
+                    discount=discount,
+                    total_amount=total,
+                    amount_paid=total if status == 'paid' else Decimal('0.00'),
+                    created_by_id=rng.choice(users),
+                    created_at=created_at,
+                ))
+                lines.append(items)
+
+            with transaction.atomic():
+                invoices = Invoice.objects.bulk_create(invoices)
+                InvoiceItem.objects.bulk_create(
+                    InvoiceItem(
+                        invoice=invoice,
+                        product_id=product_id,
+                        product_name=name,
+                        quantity=qty,
+                        unit_price=price,
+                        total=price * qty,
+                    )
+                    for invoice, items in zip(invoices, lines)
+                    for (product_id, price, name), qty in items
+                )
+                Payment.objects.bulk_create(
+                    Payment(
+                        invoice=invoice,
+                        kind='payment',
+                        method=invoice.payment_method,
+                        amount=invoice.amount_paid,
+                        created_by_id=invoice.created_by_id,
+                        created_at=invoice.created_at,
+                    )
+                    for invoice in invoices if invoice.amount_paid
+                )
+            self.stdout.write(f'  invoices: {start + size}/{count}')
@@ -3,4 +3,8 @@ from . import views
 
 urlpatterns = [
     path('', views.dashboard, name='dashboard'),
+    path('performance/', views.performance, name='performance'),
+    path('performance/profiles/', views.profile_list, name='profile_list'),
+    path('performance/profiles/<str:name>/', views.profile_detail, name='profile_detail'),
+    path('performance/profiles/<str:name>/download/', views.profile_download, name='profile_download'),
 ]
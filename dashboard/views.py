@@ -1,14 +1,21 @@
 from django.shortcuts import render
+from django.http import FileResponse, Http404
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count, F
+from django.db.models import Sum, Count, DecimalField, F
 from django.db.models.functions import TruncDate, TruncWeek, TruncMonth
 from django.utils import timezone
 from datetime import timedelta
 from decimal import Decimal
 import json
+from accounts.views import admin_required
+from store_project.db_pool import connection_stats
+from store_project.instrumentation import endpoint_report
+from store_project.db_routers import use_replica
+from store_project import profiling
 
 
 @login_required
+@use_replica
 def dashboard(request):
     # Import here to avoid circular imports
     from inventory.models import Product, Category
@@ -29,23 +36,24 @@ def dashboard(request):
     )
     out_of_stock_products = Product.objects.filter(is_active=True, quantity=0)
 
-    # Invoice stats
+    # Invoice stats, net of returns (credit notes keep refunded_amount up to date)
+    net_total = F('total_amount') - F('refunded_amount')
     today_invoices = Invoice.objects.filter(
         created_at__date=today,
         status__in=['pending', 'paid']
     )
-    today_sales = today_invoices.aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
+    today_sales = today_invoices.aggregate(total=Sum(net_total))['total'] or Decimal('0.00')
     today_invoice_count = today_invoices.count()
 
     month_invoices = Invoice.objects.filter(
         created_at__date__gte=month_start,
         status__in=['pending', 'paid']
     )
-    month_sales = month_invoices.aggregate(total=Sum('total_amount'))['total'] or Decimal('0.00')
+    month_sales = month_invoices.aggregate(total=Sum(net_total))['total'] or Decimal('0.00')
 
     pending_invoices = Invoice.objects.filter(status='pending')
     pending_amount = pending_invoices.aggregate(
-        total=Sum(F('total_amount') - F('amount_paid'))
+        total=Sum(net_total - F('amount_paid'))
     )['total'] or Decimal('0.00')
 
     # Customer stats
@@ -64,7 +72,7 @@ def dashboard(request):
     ).annotate(
         date=TruncDate('created_at')
     ).values('date').annotate(
-        total=Sum('total_amount')
+        total=Sum(net_total)
     ).order_by('date')
 
     # Fill in missing days with zero
@@ -84,7 +92,7 @@ def dashboard(request):
     ).annotate(
         week=TruncWeek('created_at')
     ).values('week').annotate(
-        total=Sum('total_amount')
+        total=Sum(net_total)
     ).order_by('week')
 
     weekly_labels = []
@@ -101,7 +109,7 @@ def dashboard(request):
     ).annotate(
         month=TruncMonth('created_at')
     ).values('month').annotate(
-        total=Sum('total_amount')
+        total=Sum(net_total)
     ).order_by('month')
 
     monthly_labels = []
@@ -118,8 +126,11 @@ def dashboard(request):
     ).values(
         'product_name'
     ).annotate(
-        total_qty=Sum('quantity'),
-        total_revenue=Sum('total')
+        total_qty=Sum(F('quantity') - F('returned_quantity')),
+        total_revenue=Sum(
+            (F('quantity') - F('returned_quantity')) * F('unit_price'),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
     ).order_by('-total_qty')[:10]
 
     moving_labels = [item['product_name'][:20] for item in moving_products]
@@ -174,3 +185,46 @@ def dashboard(request):
         'moving_count': len(moving_labels),
     }
     return render(request, 'dashboard/dashboard.html', context)
+
+
+@admin_required
+def performance(request):
+    """Endpoints ranked by p95 latency, from this worker's recent requests."""
+    sort = request.GET.get('sort', 'p95')
+    report = endpoint_report()
+    if sort == 'queries':
+        report.sort(key=lambda r: r['max_queries'], reverse=True)
+    return render(request, 'dashboard/performance.html', {
+        'report': report,
+        'sort': sort,
+        'connections': connection_stats(),
+    })
+
+
+@admin_required
+def profile_list(request):
+    return render(request, 'dashboard/profile_list.html', {
+        'profiles': profiling.list_profiles(),
+        'token': profiling.make_profile_token(request.user),
+    })
+
+
+@admin_required
+def profile_detail(request, name):
+    loaded = profiling.load_profile(name)
+    if loaded is None:
+        raise Http404('Profile not found')
+    meta, stats = loaded
+    return render(request, 'dashboard/profile_detail.html', {
+        'meta': meta,
+        'functions': profiling.top_functions(stats),
+        'tree': profiling.call_tree(stats),
+    })
+
+
+@admin_required
+def profile_download(request, name):
+    if profiling.load_profile(name) is None:
+        raise Http404('Profile not found')
+    path = profiling.profile_dir() / f'{name}.prof'
+    return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{name}.prof')
@@ -1,5 +1,6 @@
 from django.contrib import admin
-from .models import Category, Product
+from .models import Category, Product, PriceRule, ProductPrice, StockMovement, StockSnapshot
+from .thumbnails import enqueue_thumbnails
 
 
 @admin.register(Category)
@@ -16,13 +17,13 @@ class ProductAdmin(admin.ModelAdmin):
         'color', 'size', 'price', 'quantity', 'stock_status_display', 'is_active'
     ]
     list_filter = ['category', 'season', 'gender', 'color', 'size', 'is_active']
-    search_fields = ['name', 'sku', 'description']
+    search_fields = ['name', 'sku', 'style_code', 'description']
     list_editable = ['price', 'quantity', 'is_active']
     readonly_fields = ['sku', 'created_at', 'updated_at']
 
     fieldsets = (
         ('Product Info', {
-            'fields': ('name', 'sku', 'category', 'description', 'image')
+            'fields': ('name', 'sku', 'style_code', 'category', 'description', 'image')
         }),
         ('Clothing Attributes (Used for SKU)', {
             'fields': ('season', 'gender', 'color', 'size'),
@@ -46,3 +47,43 @@ class ProductAdmin(admin.ModelAdmin):
             return self.readonly_fields
         # For new objects, SKU is not shown (auto-generated on save)
         return ['created_at', 'updated_at']
+
+    def save_model(self, request, obj, form, change):
+        if 'image' in form.changed_data:
+            obj.image_variants = {}
+        super().save_model(request, obj, form, change)
+        if 'image' in form.changed_data:
+            enqueue_thumbnails(obj)
+
+
+@admin.register(PriceRule)
+class PriceRuleAdmin(admin.ModelAdmin):
+    list_display = ['name', 'category', 'season', 'gender', 'adjustment_type', 'value', 'affected_count', 'applied_at']
+    list_filter = ['adjustment_type', 'season', 'gender']
+    search_fields = ['name']
+    readonly_fields = ['created_by', 'created_at', 'applied_at', 'affected_count']
+
+
+@admin.register(ProductPrice)
+class ProductPriceAdmin(admin.ModelAdmin):
+    list_display = ['product', 'previous_price', 'price', 'effective_from', 'source', 'rule', 'created_by']
+    list_filter = ['source']
+    search_fields = ['product__name', 'product__sku']
+    raw_id_fields = ['product']
+    readonly_fields = ['created_at']
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ['product', 'quantity_change', 'quantity_after', 'reason', 'created_at']
+    search_fields = ['product__name', 'product__sku', 'reason']
+    raw_id_fields = ['product']
+    date_hierarchy = 'created_at'
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['product', 'snapshot_date', 'quantity', 'taken_at']
+    search_fields = ['product__name', 'product__sku']
+    raw_id_fields = ['product']
+    date_hierarchy = 'snapshot_date'
@@ -1,5 +1,6 @@
 from django import forms
-from .models import Category, Product
+from django.utils import timezone
+from .models import Category, Product, PriceRule, SIZE_CHOICES, COLOR_CHOICES
 
 
 class CategoryForm(forms.ModelForm):
@@ -26,7 +27,7 @@ class ProductForm(forms.ModelForm):
         fields = [
             'name', 'category', 'season', 'gender', 'color', 'size',
             'description', 'price', 'cost_price', 'quantity',
-            'low_stock_threshold', 'image', 'is_active'
+            'low_stock_threshold', 'image', 'style_code', 'is_active'
         ]
         widgets = {
             'name': forms.TextInput(attrs={'class': 'form-control'}),
@@ -41,9 +42,102 @@ class ProductForm(forms.ModelForm):
             'quantity': forms.NumberInput(attrs={'class': 'form-control'}),
             'low_stock_threshold': forms.NumberInput(attrs={'class': 'form-control'}),
             'image': forms.FileInput(attrs={'class': 'form-control'}),
+            'style_code': forms.TextInput(attrs={'class': 'form-control'}),
             'is_active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
         }
 
+    def save(self, commit=True):
+        # Old thumbnails belong to the previous upload
+        if 'image' in self.changed_data:
+            self.instance.image_variants = {}
+        return super().save(commit)
+
+
+class VariantMatrixForm(forms.ModelForm):
+    """One style definition expanded into a product per size/color."""
+    sizes = forms.MultipleChoiceField(
+        choices=SIZE_CHOICES,
+        widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'})
+    )
+    colors = forms.MultipleChoiceField(
+        choices=COLOR_CHOICES,
+        widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'})
+    )
+
+    class Meta:
+        model = Product
+        fields = [
+            'name', 'category', 'season', 'gender', 'style_code',
+            'description', 'price', 'cost_price', 'quantity',
+            'low_stock_threshold', 'is_active'
+        ]
+        widgets = {
+            'name': forms.TextInput(attrs={'class': 'form-control'}),
+            'category': forms.Select(attrs={'class': 'form-select'}),
+            'season': forms.Select(attrs={'class': 'form-select'}),
+            'gender': forms.Select(attrs={'class': 'form-select'}),
+            'style_code': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Auto-generated if blank'}),
+            'description': forms.Textarea(attrs={'class': 'form-control', 'rows': 3}),
+            'price': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
+            'cost_price': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
+            'quantity': forms.NumberInput(attrs={'class': 'form-control'}),
+            'low_stock_threshold': forms.NumberInput(attrs={'class': 'form-control'}),
+            'is_active': forms.CheckboxInput(attrs={'class': 'form-check-input'}),
+        }
+        labels = {
+            'quantity': 'Quantity per variant',
+        }
+
+    def save(self, commit=True):
+        """Create every variant; returns the list of new products."""
+        data = {field: self.cleaned_data[field] for field in self.Meta.fields}
+        return Product.create_variants(
+            sizes=self.cleaned_data['sizes'],
+            colors=self.cleaned_data['colors'],
+            **data
+        )
+
+
+class PriceRuleForm(forms.ModelForm):
+    class Meta:
+        model = PriceRule
+        fields = ['name', 'category', 'season', 'gender', 'color', 'size', 'adjustment_type', 'value', 'effective_from']
+        widgets = {
+            'name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'e.g., End of season SU markdown'}),
+            'category': forms.Select(attrs={'class': 'form-select'}),
+            'season': forms.Select(attrs={'class': 'form-select'}),
+            'gender': forms.Select(attrs={'class': 'form-select'}),
+            'color': forms.Select(attrs={'class': 'form-select'}),
+            'size': forms.Select(attrs={'class': 'form-select'}),
+            'adjustment_type': forms.Select(attrs={'class': 'form-select'}),
+            'value': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
+            'effective_from': forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'}),
+        }
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('adjustment_type') == 'markdown' and cleaned_data.get('value', 0) >= 100:
+            self.add_error('value', 'A markdown must be less than 100%.')
+        return cleaned_data
+
+
+class ScheduledPriceForm(forms.Form):
+    price = forms.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        min_value=0.01,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'})
+    )
+    effective_from = forms.DateTimeField(
+        widget=forms.DateTimeInput(attrs={'class': 'form-control', 'type': 'datetime-local'})
+    )
+
+    def clean_effective_from(self):
+        effective_from = self.cleaned_data['effective_from']
+        if effective_from <= timezone.now():
+            raise forms.ValidationError('Scheduled price changes must be in the future.')
+        return effective_from
+
 
 class StockAdjustmentForm(forms.Form):
     ADJUSTMENT_TYPE = [
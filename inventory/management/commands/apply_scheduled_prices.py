@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from inventory.models import Product, ProductPrice
+from inventory.pricing import invalidate_prices
+
+
+class Command(BaseCommand):
+    help = 'Copy scheduled prices that have come into effect onto Product.price. Run from cron.'
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+
+        with transaction.atomic():
+            due_ids = list(
+                ProductPrice.objects.select_for_update()
+                .filter(is_applied=False, effective_from__lte=now)
+                .values_list('pk', flat=True)
+            )
+            if not due_ids:
+                self.stdout.write('No scheduled prices due.')
+                return
+
+            latest = ProductPrice.objects.filter(
+                product=OuterRef('pk'),
+                effective_from__lte=now,
+            ).order_by('-effective_from').values('price')[:1]
+
+            product_ids = ProductPrice.objects.filter(pk__in=due_ids).values('product_id')
+            count = Product.objects.filter(pk__in=product_ids).update(price=Subquery(latest), updated_at=now)
+            ProductPrice.objects.filter(pk__in=due_ids).update(is_applied=True)
+
+        invalidate_prices()
+        self.stdout.write(self.style.SUCCESS(f'Applied scheduled prices to {count} products.'))
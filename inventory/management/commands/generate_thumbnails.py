@@ -0,0 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from inventory.models import Product
+from inventory.thumbnails import process_product_image
+
+
+class Command(BaseCommand):
+    help = 'Generate thumbnails and WebP variants for existing product images in parallel.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Number of parallel workers')
+        parser.add_argument('--force', action='store_true', help='Regenerate even if thumbnails exist')
+
+    def handle(self, *args, **options):
+        products = Product.objects.exclude(image='').exclude(image__isnull=True)
+        if not options['force']:
+            products = products.filter(image_variants={})
+
+        jobs = products.values_list('pk', 'image').iterator()
+        done = failed = 0
+
+        with ThreadPoolExecutor(max_workers=options['workers']) as executor:
+            futures = [executor.submit(process_product_image, pk, image) for pk, image in jobs]
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                    done += 1
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f'Generated thumbnails for {done} products ({failed} failed).'))
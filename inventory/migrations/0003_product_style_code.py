@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0002_add_sku_clothing_fields'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='style_code',
+            field=models.CharField(blank=True, db_index=True, help_text='Groups the size/color variants of one style', max_length=30),
+        ),
+    ]
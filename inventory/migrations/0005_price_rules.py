@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:01
+
+import django.core.validators
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0004_product_image_variants'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100)),
+                ('season', models.CharField(blank=True, choices=[('SU', 'Summer'), ('WI', 'Winter'), ('SP', 'Spring'), ('FA', 'Fall'), ('AY', 'All Year')], max_length=2)),
+                ('gender', models.CharField(blank=True, choices=[('M', 'Men'), ('W', 'Women'), ('U', 'Unisex')], max_length=1)),
+                ('color', models.CharField(blank=True, choices=[('BK', 'Black'), ('WH', 'White'), ('RD', 'Red'), ('BL', 'Blue'), ('GR', 'Green'), ('GY', 'Grey'), ('NV', 'Navy'), ('PN', 'Pink'), ('YL', 'Yellow'), ('OR', 'Orange'), ('PR', 'Purple'), ('BR', 'Brown'), ('BG', 'Beige'), ('MR', 'Maroon'), ('TL', 'Teal')], max_length=2)),
+                ('size', models.CharField(blank=True, choices=[('XS', 'Extra Small'), ('S', 'Small'), ('M', 'Medium'), ('L', 'Large'), ('XL', 'Extra Large'), ('XXL', 'Double XL'), ('XXXL', 'Triple XL'), ('FS', 'Free Size')], max_length=4)),
+                ('adjustment_type', models.CharField(choices=[('increase', 'Increase by %'), ('markdown', 'Markdown by %'), ('set', 'Set fixed price')], default='markdown', max_length=10)),
+                ('value', models.DecimalField(decimal_places=2, help_text='Percentage for increase/markdown, amount for fixed price', max_digits=10, validators=[django.core.validators.MinValueValidator(Decimal('0.01'))])),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('applied_at', models.DateTimeField(blank=True, null=True)),
+                ('affected_count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='price_rules', to='inventory.category')),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='price_rules', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductPrice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('previous_price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('effective_from', models.DateTimeField(default=django.utils.timezone.now)),
+                ('source', models.CharField(choices=[('manual', 'Manual'), ('rule', 'Price Rule')], default='manual', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('created_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='price_history', to='inventory.product')),
+                ('rule', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='price_changes', to='inventory.pricerule')),
+            ],
+            options={
+                'ordering': ['-effective_from'],
+            },
+        ),
+    ]
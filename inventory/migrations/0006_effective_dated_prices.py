@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:03
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def seed_price_history(apps, schema_editor):
+    """Give every product a starting price row so as-of lookups cover it."""
+    Product = apps.get_model('inventory', 'Product')
+    ProductPrice = apps.get_model('inventory', 'ProductPrice')
+
+    has_history = ProductPrice.objects.filter(product=OuterRef('pk'))
+    products = Product.objects.filter(~Exists(has_history)).values_list('pk', 'price', 'created_at')
+    ProductPrice.objects.bulk_create(
+        (
+            ProductPrice(product_id=pk, price=price, effective_from=created_at, source='manual')
+            for pk, price, created_at in products.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0005_price_rules'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pricerule',
+            name='effective_from',
+            field=models.DateTimeField(blank=True, help_text='Leave blank to change prices immediately', null=True),
+        ),
+        migrations.AddField(
+            model_name='productprice',
+            name='is_applied',
+            field=models.BooleanField(default=True, help_text='Copied onto Product.price'),
+        ),
+        migrations.AddIndex(
+            model_name='productprice',
+            index=models.Index(fields=['product', 'effective_from'], name='inv_price_product_eff_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productprice',
+            index=models.Index(condition=models.Q(('is_applied', False)), fields=['effective_from'], name='inv_price_pending_idx'),
+        ),
+        migrations.RunPython(seed_price_history, migrations.RunPython.noop),
+    ]
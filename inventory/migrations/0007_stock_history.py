@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:04
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def opening_snapshot(apps, schema_editor):
+    """Anchor stock history with today's quantities; earlier history is unknown."""
+    Product = apps.get_model('inventory', 'Product')
+    StockSnapshot = apps.get_model('inventory', 'StockSnapshot')
+
+    now = timezone.now()
+    StockSnapshot.objects.bulk_create(
+        (
+            StockSnapshot(product_id=pk, quantity=quantity, snapshot_date=timezone.localdate(now), taken_at=now)
+            for pk, quantity in Product.objects.values_list('pk', 'quantity').iterator()
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0006_effective_dated_prices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity_change', models.IntegerField()),
+                ('quantity_after', models.PositiveIntegerField(blank=True, null=True)),
+                ('reason', models.CharField(blank=True, max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_movements', to='inventory.product')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['product', 'created_at'], name='inv_movement_product_idx'), models.Index(fields=['created_at'], name='inv_movement_created_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('snapshot_date', models.DateField()),
+                ('quantity', models.PositiveIntegerField()),
+                ('taken_at', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='inventory.product')),
+            ],
+            options={
+                'ordering': ['-snapshot_date'],
+                'indexes': [models.Index(fields=['product', 'taken_at'], name='inv_snapshot_product_idx'), models.Index(fields=['snapshot_date'], name='inv_snapshot_date_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'snapshot_date'), name='inv_snapshot_product_date_uniq')],
+            },
+        ),
+        migrations.RunPython(opening_snapshot, migrations.RunPython.noop),
+    ]
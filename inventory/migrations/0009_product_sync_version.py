@@ -0,0 +1,93 @@
+# Generated by Django 5.2.18 on 2026-10-18 22:46
+
+from django.db import migrations, models
+
+# PostgreSQL: stamp rows with the writing transaction's id (xid8, PG 13+)
+PG_FORWARD = """
+CREATE OR REPLACE FUNCTION inventory_set_sync_version() RETURNS trigger AS $$
+BEGIN
+    NEW.sync_version := pg_current_xact_id()::text::bigint;
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+CREATE TRIGGER inventory_product_sync_version BEFORE INSERT OR UPDATE ON inventory_product
+    FOR EACH ROW EXECUTE FUNCTION inventory_set_sync_version();
+CREATE TRIGGER inventory_tombstone_sync_version BEFORE INSERT ON inventory_producttombstone
+    FOR EACH ROW EXECUTE FUNCTION inventory_set_sync_version();
+"""
+PG_REVERSE = """
+DROP TRIGGER IF EXISTS inventory_product_sync_version ON inventory_product;
+DROP TRIGGER IF EXISTS inventory_tombstone_sync_version ON inventory_producttombstone;
+DROP FUNCTION IF EXISTS inventory_set_sync_version();
+"""
+
+# SQLite (development) has one writer at a time, so a counter is commit-ordered
+SQLITE_NEXT = """(SELECT COALESCE(MAX(v), 0) + 1 FROM (
+    SELECT MAX(sync_version) AS v FROM inventory_product
+    UNION ALL SELECT MAX(sync_version) FROM inventory_producttombstone))"""
+SQLITE_FORWARD = [
+    f"""CREATE TRIGGER inventory_product_sync_version_{event} AFTER {event} ON inventory_product
+    BEGIN UPDATE inventory_product SET sync_version = {SQLITE_NEXT} WHERE id = NEW.id; END"""
+    for event in ('INSERT', 'UPDATE')
+] + [
+    f"""CREATE TRIGGER inventory_tombstone_sync_version AFTER INSERT ON inventory_producttombstone
+    BEGIN UPDATE inventory_producttombstone SET sync_version = {SQLITE_NEXT} WHERE id = NEW.id; END"""
+]
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS inventory_product_sync_version_INSERT',
+    'DROP TRIGGER IF EXISTS inventory_product_sync_version_UPDATE',
+    'DROP TRIGGER IF EXISTS inventory_tombstone_sync_version',
+]
+
+
+def create_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(PG_FORWARD)
+    elif schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_FORWARD:
+            schema_editor.execute(statement)
+
+
+def drop_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(PG_REVERSE)
+    elif schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_REVERSE:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('inventory', '0008_product_sync'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='inv_product_sync_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='producttombstone',
+            name='inv_tombstone_sync_idx',
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='sync_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='producttombstone',
+            name='sync_version',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['sync_version', 'id'], name='inv_product_syncver_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='producttombstone',
+            index=models.Index(fields=['sync_version', 'product_id'], name='inv_tombstone_syncver_idx'),
+        ),
+        migrations.RunPython(create_triggers, drop_triggers),
+    ]
@@ -1,6 +1,14 @@
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.functions import Greatest, Round
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.core.validators import MinValueValidator
+from django.utils import timezone
 from decimal import Decimal
+import uuid
+
+from audit import recorder as audit
 
 
 # SKU Configuration for GrinkraWear
@@ -68,6 +76,42 @@ SIZE_CHOICES = [
 ]
 
 
+def build_sku_prefix(season, category_code, gender, color, size):
+    """SKU without the serial, e.g. GRK-SU-TS-M-RD-M-"""
+    return f"{BRAND_CODE}-{season}-{category_code or 'XX'}-{gender}-{color}-{size}-"
+
+
+def next_serials(prefixes, exclude_pk=None):
+    """
+    Return {prefix: next free serial} for many SKU prefixes using one query.
+    All prefixes share the GRK-SEASON-CATEGORY-GENDER- head when they come
+    from one style, so the database can narrow on the unique SKU index.
+    """
+    prefixes = set(prefixes)
+    if not prefixes:
+        return {}
+
+    query = models.Q()
+    for prefix in prefixes:
+        query |= models.Q(sku__startswith=prefix)
+    existing = Product.objects.filter(query)
+    if exclude_pk is not None:
+        existing = existing.exclude(pk=exclude_pk)
+
+    max_serials = dict.fromkeys(prefixes, 0)
+    for sku in existing.values_list('sku', flat=True):
+        prefix, _, serial_str = sku.rpartition('-')
+        prefix += '-'
+        try:
+            serial = int(serial_str)
+        except ValueError:
+            continue
+        if prefix in max_serials and serial > max_serials[prefix]:
+            max_serials[prefix] = serial
+
+    return {prefix: serial + 1 for prefix, serial in max_serials.items()}
+
+
 class Category(models.Model):
     name = models.CharField(max_length=100, unique=True)
     code = models.CharField(
@@ -160,12 +204,31 @@ class Product(models.Model):
         help_text='Alert when stock falls below this level'
     )
     image = models.ImageField(upload_to='products/', blank=True, null=True)
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        help_text='Generated thumbnail files keyed by size and format'
+    )
+    style_code = models.CharField(
+        max_length=30,
+        blank=True,
+        db_index=True,
+        help_text='Groups the size/color variants of one style'
+    )
     is_active = models.BooleanField(default=True)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Set by a database trigger on every write to the id of the writing
+    # transaction, so delta sync can page in commit-safe order (see inventory.sync)
+    sync_version = models.BigIntegerField(default=0, editable=False)
 
     class Meta:
         ordering = ['name']
+        indexes = [
+            # Delta-sync cursor: WHERE (sync_version, id) > (...) ORDER BY sync_version, id
+            models.Index(fields=['sync_version', 'id'], name='inv_product_syncver_idx'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.sku})"
@@ -175,62 +238,68 @@ class Product(models.Model):
         Generate SKU in format: GRK-SEASON-CATEGORY-GENDER-COLOR-SIZE-SERIAL
         Example: GRK-SU-TS-M-RD-M-001
         """
-        # Get category code
-        cat_code = self.category.code if self.category else 'XX'
-
         # Get the next serial number for this combination
         serial = self._get_next_serial()
 
-        # Build SKU
-        sku_parts = [
-            BRAND_CODE,           # GRK
-            self.season,          # SU, WI, etc.
-            cat_code,             # TS, HD, etc.
-            self.gender,          # M, W, U
-            self.color,           # BK, WH, etc.
-            self.size,            # S, M, L, etc.
-            f'{serial:03d}'       # 001, 002, etc.
-        ]
+        # GRK-SEASON-CATEGORY-GENDER-COLOR-SIZE- + 001, 002, etc.
+        return f'{self.sku_prefix()}{serial:03d}'
 
-        return '-'.join(sku_parts)
+    def sku_prefix(self):
+        cat_code = self.category.code if self.category else 'XX'
+        return build_sku_prefix(self.season, cat_code, self.gender, self.color, self.size)
 
     def _get_next_serial(self):
         """Get next serial number for this product combination."""
-        # Find products with same attributes (excluding serial)
-        prefix = f"{BRAND_CODE}-{self.season}-"
-        if self.category:
-            prefix += f"{self.category.code}-"
-        else:
-            prefix += "XX-"
-        prefix += f"{self.gender}-{self.color}-{self.size}-"
-
-        # Find highest existing serial with this prefix
-        existing = Product.objects.filter(
-            sku__startswith=prefix
-        ).exclude(pk=self.pk)
-
-        if not existing.exists():
-            return 1
-
-        # Extract serial numbers and find max
-        max_serial = 0
-        for product in existing:
-            try:
-                serial_str = product.sku.split('-')[-1]
-                serial = int(serial_str)
-                if serial > max_serial:
-                    max_serial = serial
-            except (ValueError, IndexError):
-                continue
-
-        return max_serial + 1
+        prefix = self.sku_prefix()
+        return next_serials([prefix], exclude_pk=self.pk)[prefix]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember stored price and quantity so save() can record changes
+        if 'price' in field_names:
+            instance._loaded_price = values[field_names.index('price')]
+        if 'quantity' in field_names:
+            instance._loaded_quantity = values[field_names.index('quantity')]
+        return instance
 
     def save(self, *args, **kwargs):
         # Auto-generate SKU only on creation (when no SKU exists)
         if not self.sku:
             # Need to save first to get pk if category needs it
             self.sku = self.generate_sku()
-        super().save(*args, **kwargs)
+
+        adding = self._state.adding
+        previous_price = getattr(self, '_loaded_price', None)
+        # A deferred price was never loaded, so there is nothing to compare against
+        price_changed = adding or (previous_price is not None and previous_price != self.price)
+        previous_quantity = 0 if adding else getattr(self, '_loaded_quantity', None)
+        # The movement commits with the quantity it explains; stock snapshots
+        # rely on never seeing one without the other. No savepoint: inside a
+        # caller's transaction there is nothing extra to protect.
+        with transaction.atomic(savepoint=False):
+            super().save(*args, **kwargs)
+
+            if previous_quantity is not None and previous_quantity != self.quantity:
+                StockMovement.objects.create(
+                    product=self,
+                    quantity_change=self.quantity - previous_quantity,
+                    quantity_after=self.quantity,
+                    reason=getattr(self, '_stock_reason', '') or ('Initial stock' if adding else 'Manual edit'),
+                )
+                self._loaded_quantity = self.quantity
+
+            if price_changed:
+                ProductPrice.objects.create(
+                    product=self,
+                    price=self.price,
+                    previous_price=previous_price,
+                    source='manual',
+                )
+                self._loaded_price = self.price
+        if price_changed:
+            from .pricing import invalidate_prices
+            invalidate_prices([self.pk])
 
     @property
     def stock_status(self):
@@ -255,11 +324,349 @@ class Product(models.Model):
             return ((self.price - self.cost_price) / self.price) * 100
         return None
 
+    @classmethod
+    def create_variants(cls, sizes, colors, style_code='', **fields):
+        """
+        Create one product per size/color combination of a style.
+        SKU serials for the whole matrix are allocated with a single query
+        and the rows are inserted with one bulk_create.
+        """
+        style_code = style_code or uuid.uuid4().hex[:10].upper()
+        variants = [
+            cls(style_code=style_code, color=color, size=size, **fields)
+            for color in colors
+            for size in sizes
+        ]
+
+        with transaction.atomic():
+            serials = next_serials(variant.sku_prefix() for variant in variants)
+            for variant in variants:
+                prefix = variant.sku_prefix()
+                variant.sku = f'{prefix}{serials[prefix]:03d}'
+                serials[prefix] += 1
+            variants = cls.objects.bulk_create(variants)
+            ProductPrice.objects.bulk_create([
+                ProductPrice(product=variant, price=variant.price, source='manual')
+                for variant in variants
+            ])
+            StockMovement.objects.bulk_create([
+                StockMovement(
+                    product=variant,
+                    quantity_change=variant.quantity,
+                    quantity_after=variant.quantity,
+                    reason='Initial stock',
+                )
+                for variant in variants
+                if variant.quantity
+            ])
+            return variants
+
+    def get_variants(self):
+        """All products of the same style, including this one."""
+        if not self.style_code:
+            return Product.objects.filter(pk=self.pk)
+        return Product.objects.filter(style_code=self.style_code).order_by('color', 'size')
+
     def adjust_stock(self, quantity_change, reason=''):
         """Adjust stock quantity. Positive for additions, negative for deductions."""
-        new_quantity = self.quantity + quantity_change
-        if new_quantity < 0:
-            raise ValueError('Insufficient stock')
-        self.quantity = new_quantity
-        self.save()
+        with transaction.atomic(savepoint=False):
+            # Checkout and sync write absolute quantities under the row lock;
+            # take it too and apply the change to the stored quantity
+            current = Product.objects.select_for_update().values_list('quantity', flat=True).get(pk=self.pk)
+            new_quantity = current + quantity_change
+            if new_quantity < 0:
+                raise ValueError('Insufficient stock')
+            self.quantity = new_quantity
+            self._loaded_quantity = current
+            # save() records the change in the stock movement log
+            self._stock_reason = reason or 'Stock adjustment'
+            try:
+                self.save(update_fields=['quantity', 'updated_at'])
+            finally:
+                del self._stock_reason
         return self.quantity
+
+
+class RuleAlreadyApplied(Exception):
+    pass
+
+
+class PriceRule(models.Model):
+    """
+    A bulk repricing rule, e.g. "+8% on WI outerwear" or "30% markdown on
+    SU T-Shirts". Blank filters match everything.
+    """
+    ADJUSTMENT_CHOICES = [
+        ('increase', 'Increase by %'),
+        ('markdown', 'Markdown by %'),
+        ('set', 'Set fixed price'),
+    ]
+
+    name = models.CharField(max_length=100)
+    category = models.ForeignKey(
+        Category,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='price_rules'
+    )
+    season = models.CharField(max_length=2, choices=SEASON_CHOICES, blank=True)
+    gender = models.CharField(max_length=1, choices=GENDER_CHOICES, blank=True)
+    color = models.CharField(max_length=2, choices=COLOR_CHOICES, blank=True)
+    size = models.CharField(max_length=4, choices=SIZE_CHOICES, blank=True)
+    adjustment_type = models.CharField(max_length=10, choices=ADJUSTMENT_CHOICES, default='markdown')
+    value = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        validators=[MinValueValidator(Decimal('0.01'))],
+        help_text='Percentage for increase/markdown, amount for fixed price'
+    )
+    effective_from = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='Leave blank to change prices immediately'
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        related_name='price_rules'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    applied_at = models.DateTimeField(null=True, blank=True)
+    affected_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return self.name
+
+    def matching_products(self):
+        filters = {'is_active': True}
+        if self.category_id:
+            filters['category_id'] = self.category_id
+        for field in ('season', 'gender', 'color', 'size'):
+            if getattr(self, field):
+                filters[field] = getattr(self, field)
+        return Product.objects.filter(**filters)
+
+    def new_price_expression(self):
+        """SQL expression computing the new price from the current one."""
+        if self.adjustment_type == 'set':
+            return models.Value(self.value, output_field=models.DecimalField(max_digits=10, decimal_places=2))
+
+        if self.adjustment_type == 'increase':
+            factor = 1 + self.value / 100
+        else:
+            factor = 1 - self.value / 100
+        new_price = Round(
+            models.F('price') * models.Value(factor, output_field=models.DecimalField()),
+            2,
+            output_field=models.DecimalField(max_digits=10, decimal_places=2)
+        )
+        # Never price below the model's minimum
+        return Greatest(new_price, models.Value(Decimal('0.01')), output_field=models.DecimalField(max_digits=10, decimal_places=2))
+
+    def preview(self):
+        """Affected count and price totals/deltas from a single aggregate query."""
+        new_price = self.new_price_expression()
+        delta = models.ExpressionWrapper(
+            new_price - models.F('price'),
+            output_field=models.DecimalField(max_digits=10, decimal_places=2)
+        )
+        return self.matching_products().aggregate(
+            count=models.Count('id'),
+            current_total=models.Sum('price'),
+            new_total=models.Sum(new_price),
+            min_delta=models.Min(delta),
+            max_delta=models.Max(delta),
+        )
+
+    def apply(self, user=None):
+        """
+        Reprice every matching product with one UPDATE and record the
+        old/new prices in the price history. Returns the number of products.
+
+        Rules with a future effective_from only write the history rows; the
+        checkout price resolver picks them up at that moment and
+        apply_scheduled_prices copies them onto Product.price.
+
+        Raises RuleAlreadyApplied if the rule was applied before, including
+        by a concurrent request that got the rule lock first.
+        """
+        new_price = self.new_price_expression()
+        now = timezone.now()
+        effective_from = self.effective_from or now
+        scheduled = effective_from > now
+
+        with transaction.atomic():
+            # A double submit or a second admin waits here, then sees applied_at
+            locked = PriceRule.objects.select_for_update().get(pk=self.pk)
+            if locked.applied_at:
+                self.applied_at = locked.applied_at
+                raise RuleAlreadyApplied(f'Price rule "{self.name}" has already been applied.')
+
+            products = self.matching_products().select_for_update()
+            changes = products.annotate(new_price=new_price).values_list('pk', 'price', 'new_price')
+            history = [
+                ProductPrice(
+                    product_id=pk,
+                    previous_price=old_price,
+                    price=price,
+                    effective_from=effective_from,
+                    is_applied=not scheduled,
+                    source='rule',
+                    rule=self,
+                    created_by=user,
+                )
+                for pk, old_price, price in changes
+                if price != old_price
+            ]
+            ProductPrice.objects.bulk_create(history, batch_size=1000)
+            if scheduled:
+                count = len(history)
+            else:
+                count = products.update(price=new_price, updated_at=now)
+                audit.record_many('bulk', Product, {
+                    row.product_id: {'price': [str(row.previous_price), str(row.price)], 'price_rule': [None, self.name]}
+                    for row in history
+                }, actor=user)
+
+            self.applied_at = now
+            self.affected_count = count
+            self.save(update_fields=['applied_at', 'affected_count'])
+
+        from .pricing import invalidate_prices
+        transaction.on_commit(invalidate_prices)
+        return count
+
+
+class ProductPrice(models.Model):
+    """
+    Effective-dated price history: the price of a product at time T is the
+    row with the latest effective_from <= T. Rows dated in the future are
+    scheduled changes (is_applied=False until copied onto Product.price).
+    """
+    SOURCE_CHOICES = [
+        ('manual', 'Manual'),
+        ('rule', 'Price Rule'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='price_history')
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    previous_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+    effective_from = models.DateTimeField(default=timezone.now)
+    is_applied = models.BooleanField(default=True, help_text='Copied onto Product.price')
+    source = models.CharField(max_length=10, choices=SOURCE_CHOICES, default='manual')
+    rule = models.ForeignKey(
+        PriceRule,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='price_changes'
+    )
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['-effective_from']
+        indexes = [
+            models.Index(fields=['product', 'effective_from'], name='inv_price_product_eff_idx'),
+            models.Index(
+                fields=['effective_from'],
+                name='inv_price_pending_idx',
+                condition=models.Q(is_applied=False)
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: ₹{self.price} from {self.effective_from:%Y-%m-%d %H:%M}"
+
+
+class StockMovement(models.Model):
+    """Every change to a product's quantity, for stock-as-of queries."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
+    quantity_change = models.IntegerField()
+    quantity_after = models.PositiveIntegerField(null=True, blank=True)
+    reason = models.CharField(max_length=255, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['product', 'created_at'], name='inv_movement_product_idx'),
+            models.Index(fields=['created_at'], name='inv_movement_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.quantity_change:+d} ({self.reason})"
+
+
+class StockSnapshot(models.Model):
+    """Quantity on hand per product, written in bulk by the snapshot_stock command."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots')
+    snapshot_date = models.DateField()
+    quantity = models.PositiveIntegerField()
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-snapshot_date']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'snapshot_date'], name='inv_snapshot_product_date_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['product', 'taken_at'], name='inv_snapshot_product_idx'),
+            models.Index(fields=['snapshot_date'], name='inv_snapshot_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} on {self.snapshot_date}: {self.quantity}"
+
+
+def record_stock_movements(changes, reason=''):
+    """
+    Log quantity changes made with set-based UPDATEs, which bypass save().
+    ``changes`` is an iterable of (product_id, quantity_change), or of
+    (product_id, quantity_change, reason) to give each change its own reason.
+    """
+    changes = [(tuple(change) + (reason,))[:3] for change in changes]
+    movements = StockMovement.objects.bulk_create(
+        [
+            StockMovement(product_id=product_id, quantity_change=change, reason=change_reason)
+            for product_id, change, change_reason in changes
+            if change
+        ],
+        batch_size=1000,
+    )
+    audit.record_many('bulk', Product, [
+        (movement.product_id, {'quantity_change': [None, movement.quantity_change], 'reason': [None, movement.reason]})
+        for movement in movements
+    ])
+
+
+class ProductTombstone(models.Model):
+    """Marks a deleted product so delta-sync clients can drop it from their copy."""
+    product_id = models.BigIntegerField()
+    sku = models.CharField(max_length=50)
+    deleted_at = models.DateTimeField(default=timezone.now)
+    sync_version = models.BigIntegerField(default=0, editable=False)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['sync_version', 'product_id'], name='inv_tombstone_syncver_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.sku} deleted {self.deleted_at:%Y-%m-%d %H:%M}"
+
+
+@receiver(post_delete, sender=Product)
+def record_product_tombstone(sender, instance, **kwargs):
+    ProductTombstone.objects.create(product_id=instance.pk, sku=instance.sku)
@@ -0,0 +1,110 @@
+"""
+Price resolution against the effective-dated ProductPrice table.
+
+current_prices() is used on the checkout path. Resolved prices are kept in a
+per-process cache until the next scheduled change for that product (or
+PRICE_CACHE_SECONDS, whichever comes first), so repeated lookups cost no
+queries and a midnight markdown takes effect exactly at midnight.
+
+Entries are tagged with a price version held in the shared cache and bumped
+by invalidate_prices(), so a price edit in one worker retires the entries
+of every other worker on their next lookup. Without a shared cache there is
+no way to reach the other workers, and PRICE_CACHE_SECONDS defaults to 0
+(no caching).
+"""
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Min, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import Product, ProductPrice
+
+VERSION_KEY = 'inventory:prices:version'
+
+_cache = {}  # product_id -> (price, valid_until, version)
+_lock = threading.Lock()
+
+
+def prices_version():
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # A fresh version never matches entries written before an eviction
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def prices_as_of(product_ids, at):
+    """
+    Return {product_id: price} as of a moment, in one query.
+    Products that had no price yet at that moment map to None.
+    """
+    latest = ProductPrice.objects.filter(
+        product=OuterRef('pk'),
+        effective_from__lte=at,
+    ).order_by('-effective_from').values('price')[:1]
+
+    products = Product.objects.all() if product_ids is None else Product.objects.filter(pk__in=product_ids)
+    return dict(
+        products.annotate(as_of_price=Subquery(latest)).values_list('pk', 'as_of_price')
+    )
+
+
+def current_prices(product_ids):
+    """Return {product_id: price} for the prices in effect right now."""
+    now = timezone.now()
+    if settings.PRICE_CACHE_SECONDS <= 0:
+        return prices_as_of(product_ids, now)
+
+    version = prices_version()
+    result = {}
+    missing = []
+
+    with _lock:
+        for pk in product_ids:
+            entry = _cache.get(pk)
+            if entry and now < entry[1] and entry[2] == version:
+                result[pk] = entry[0]
+            else:
+                missing.append(pk)
+
+    if missing:
+        prices = prices_as_of(missing, now)
+        next_changes = dict(
+            ProductPrice.objects.filter(product_id__in=missing, effective_from__gt=now)
+            .values('product_id')
+            .annotate(next_change=Min('effective_from'))
+            .values_list('product_id', 'next_change')
+        )
+        max_age = now + timedelta(seconds=settings.PRICE_CACHE_SECONDS)
+
+        with _lock:
+            for pk, price in prices.items():
+                result[pk] = price
+                if price is not None:
+                    _cache[pk] = (price, min(next_changes.get(pk, max_age), max_age), version)
+
+    return result
+
+
+def current_price(product):
+    price = current_prices([product.pk]).get(product.pk)
+    return product.price if price is None else price
+
+
+def invalidate_prices(product_ids=None):
+    """
+    Drop cached prices for some products, or all of them. Other processes
+    drop all of theirs, since the shared version moves for any change.
+    """
+    cache.set(VERSION_KEY, time.time_ns(), None)
+    with _lock:
+        if product_ids is None:
+            _cache.clear()
+        else:
+            for pk in product_ids:
+                _cache.pop(pk, None)
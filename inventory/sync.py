@@ -0,0 +1,168 @@
+"""
+Delta sync of the product catalog for POS and web shop clients.
+
+Clients send back the opaque cursor from their previous response and get
+only what changed since: products ordered by (sync_version, id), plus the
+ids of products that were deleted (tombstones) or deactivated. Rows are
+returned column-wise ({"fields": [...], "rows": [[...], ...]}) to keep
+payloads small.
+
+Timestamps cannot order the feed: updated_at is set when a row is written,
+and a transaction that commits later than another can carry an earlier one.
+Instead a trigger stamps every product and tombstone write with the id of
+its transaction (sync_version), and the feed only serves versions below
+pg_snapshot_xmin(), the oldest transaction still running. Every transaction
+under that bound has finished, so nothing can later commit behind a cursor.
+A long-running transaction holds the feed back until it ends; it never
+loses rows. On SQLite, which has one writer at a time, the trigger hands
+out a counter instead and no bound is needed.
+"""
+from datetime import datetime
+from decimal import Decimal
+
+from django.db import connection
+from django.db.models import Q
+
+from .models import Product, ProductTombstone
+
+# API name -> model attribute
+SYNC_FIELDS = {
+    'id': 'id',
+    'sku': 'sku',
+    'name': 'name',
+    'style_code': 'style_code',
+    'category': 'category_id',
+    'season': 'season',
+    'gender': 'gender',
+    'color': 'color',
+    'size': 'size',
+    'description': 'description',
+    'price': 'price',
+    'quantity': 'quantity',
+    'low_stock_threshold': 'low_stock_threshold',
+    'image': 'image',
+    'images': 'image_variants',
+    'updated_at': 'updated_at',
+}
+DEFAULT_FIELDS = ['id', 'sku', 'name', 'category', 'price', 'quantity', 'updated_at']
+MAX_LIMIT = 2000
+
+PRODUCT, TOMBSTONE = 0, 1
+# Cursors from the old updated_at-based feed lack the prefix and are refused,
+# so those clients do one full reload
+CURSOR_PREFIX = 'v'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(version, kind, pk):
+    return f'{CURSOR_PREFIX}{version}-{kind}-{pk}'
+
+
+def decode_cursor(cursor):
+    if not isinstance(cursor, str) or not cursor.startswith(CURSOR_PREFIX):
+        raise InvalidCursor(cursor)
+    try:
+        version, kind, pk = (int(part) for part in cursor[len(CURSOR_PREFIX):].split('-'))
+    except ValueError:
+        raise InvalidCursor(cursor)
+    if kind not in (PRODUCT, TOMBSTONE):
+        raise InvalidCursor(cursor)
+    return version, kind, pk
+
+
+def stable_version():
+    """Versions below this belong to finished transactions; None if all do."""
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint')
+        return cursor.fetchone()[0]
+
+
+def parse_fields(value):
+    if not value:
+        return DEFAULT_FIELDS
+    fields = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in fields if field not in SYNC_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    if 'id' not in fields:
+        fields.insert(0, 'id')
+    return fields
+
+
+def _json_value(value):
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def changes_since(cursor=None, fields=DEFAULT_FIELDS, limit=500):
+    """
+    Return the next page of catalog changes after ``cursor`` (None for a full
+    initial load, which skips deletions the client cannot have seen).
+    """
+    limit = max(1, min(limit, MAX_LIMIT))
+    # Decode first so a bad cursor costs no queries
+    position = decode_cursor(cursor) if cursor is not None else None
+    products = Product.objects.all()
+    tombstones = ProductTombstone.objects.all()
+    until = stable_version()
+    if until is not None:
+        products = products.filter(sync_version__lt=until)
+        tombstones = tombstones.filter(sync_version__lt=until)
+
+    if position is None:
+        products = products.filter(is_active=True)
+        tombstones = tombstones.none()
+    else:
+        # Stream order is (version, kind, id) with products before tombstones
+        version, kind, pk = position
+        if kind == PRODUCT:
+            products = products.filter(Q(sync_version__gt=version) | Q(sync_version=version, id__gt=pk))
+            tombstones = tombstones.filter(sync_version__gte=version)
+        else:
+            products = products.filter(sync_version__gt=version)
+            tombstones = tombstones.filter(
+                Q(sync_version__gt=version) | Q(sync_version=version, product_id__gt=pk)
+            )
+
+    columns = [SYNC_FIELDS[field] for field in fields]
+    product_rows = products.order_by('sync_version', 'id').values_list(
+        'sync_version', 'id', 'is_active', *columns
+    )[:limit + 1]
+    tombstone_rows = tombstones.order_by('sync_version', 'product_id').values_list(
+        'sync_version', 'product_id'
+    )[:limit + 1]
+
+    stream = sorted(
+        [(row[0], PRODUCT, row[1], row) for row in product_rows]
+        + [(version, TOMBSTONE, pk, None) for version, pk in tombstone_rows],
+        key=lambda item: item[:3],
+    )
+    more = len(stream) > limit
+    stream = stream[:limit]
+
+    rows, deleted = [], []
+    for _, kind, pk, row in stream:
+        if kind == PRODUCT and row[2]:
+            rows.append([_json_value(value) for value in row[3:]])
+        else:
+            deleted.append(pk)
+
+    if stream:
+        last_version, last_kind, last_pk, _ = stream[-1]
+        cursor = encode_cursor(last_version, last_kind, last_pk)
+
+    return {
+        'fields': fields,
+        'rows': rows,
+        'deleted': deleted,
+        'cursor': cursor,
+        'more': more,
+    }
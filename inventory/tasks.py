@@ -0,0 +1,19 @@
+from django.core.management import call_command
+
+from jobs.queue import task
+from .thumbnails import process_product_image
+
+
+@task('inventory.generate_thumbnails')
+def generate_thumbnails(product_id, image_name):
+    return process_product_image(product_id, image_name)
+
+
+@task('inventory.apply_scheduled_prices')
+def apply_scheduled_prices():
+    call_command('apply_scheduled_prices')
+
+
+@task('inventory.snapshot_stock')
+def snapshot_stock():
+    call_command('snapshot_stock')
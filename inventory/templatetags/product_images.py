@@ -0,0 +1,44 @@
+from django import template
+from django.core.files.storage import default_storage
+
+from inventory.thumbnails import THUMBNAIL_SIZES
+
+register = template.Library()
+
+
+@register.inclusion_tag('inventory/includes/product_image.html')
+def product_image(product, size='md', css_class='', sizes=None):
+    """
+    Render a product image as a <picture> using generated thumbnails,
+    falling back to the original upload until thumbnails exist.
+    """
+    variants = product.image_variants or {}
+    variant = variants.get(size)
+    context = {
+        'product': product,
+        'css_class': css_class,
+        'src': product.image.url if product.image else '',
+        'width': None,
+        'height': None,
+        'webp_srcset': '',
+        'jpeg_srcset': '',
+        'sizes': sizes or f'{THUMBNAIL_SIZES[size]}px',
+    }
+    if variant:
+        # Small originals are never upscaled, so several sizes can share a width
+        by_width = {v['width']: v for v in variants.values()}
+        context.update({
+            'src': default_storage.url(variant['jpeg']),
+            'width': variant['width'],
+            'height': variant['height'],
+            'webp_srcset': _srcset(by_width, 'webp'),
+            'jpeg_srcset': _srcset(by_width, 'jpeg'),
+        })
+    return context
+
+
+def _srcset(variants_by_width, fmt):
+    return ', '.join(
+        f'{default_storage.url(v[fmt])} {width}w'
+        for width, v in sorted(variants_by_width.items())
+    )
@@ -0,0 +1,116 @@
+"""
+Background thumbnail generation for product images.
+
+Uploads are resized into a few display sizes (JPEG + WebP) by a small thread
+pool so the request that saved the product never waits on Pillow. Resized
+files are named after a hash of the original's content, so a given name never
+changes content and can be served with far-future cache headers.
+"""
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Longest edge in pixels for each generated size
+THUMBNAIL_SIZES = {
+    'sm': 160,
+    'md': 480,
+    'lg': 1024,
+}
+
+THUMBNAIL_FORMATS = {
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+}
+
+THUMBNAIL_DIR = 'products/thumbs'
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'THUMBNAIL_WORKERS', 2),
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def generate_thumbnails(image_name):
+    """
+    Create every size/format of an uploaded image and return
+    {'sm': {'jpeg': name, 'webp': name, 'width': ..., 'height': ...}, ...}.
+    Files that already exist for the same content are reused.
+    """
+    with default_storage.open(image_name, 'rb') as f:
+        data = f.read()
+    digest = hashlib.sha1(data).hexdigest()[:16]
+
+    with Image.open(BytesIO(data)) as original:
+        original = ImageOps.exif_transpose(original)
+        if original.mode not in ('RGB', 'RGBA'):
+            original = original.convert('RGBA' if 'transparency' in original.info else 'RGB')
+
+        variants = {}
+        for size, edge in THUMBNAIL_SIZES.items():
+            resized = original.copy()
+            resized.thumbnail((edge, edge), Image.LANCZOS)
+            variant = {'width': resized.width, 'height': resized.height}
+
+            for ext, options in THUMBNAIL_FORMATS.items():
+                name = f'{THUMBNAIL_DIR}/{digest}-{size}.{ext}'
+                if not default_storage.exists(name):
+                    image = resized.convert('RGB') if ext == 'jpeg' else resized
+                    buffer = BytesIO()
+                    image.save(buffer, **options)
+                    name = default_storage.save(name, ContentFile(buffer.getvalue()))
+                variant[ext] = name
+
+            variants[size] = variant
+
+    return variants
+
+
+def process_product_image(product_id, image_name):
+    """Generate thumbnails and attach them to the product if its image is unchanged."""
+    from .models import Product
+
+    close_old_connections()
+    try:
+        variants = generate_thumbnails(image_name)
+        # Only store the result if the image was not replaced meanwhile
+        Product.objects.filter(pk=product_id, image=image_name).update(
+            image_variants=variants, updated_at=timezone.now()
+        )
+        return variants
+    except Exception:
+        logger.exception('Thumbnail generation failed for product %s (%s)', product_id, image_name)
+        raise
+    finally:
+        close_old_connections()
+
+
+def enqueue_thumbnails(product):
+    """Schedule thumbnail generation once the current transaction commits."""
+    if not product.image:
+        return
+    product_id, image_name = product.pk, product.image.name
+    if getattr(settings, 'THUMBNAIL_QUEUE', 'threads') == 'jobs':
+        # Runs in a run_workers process instead of this web worker
+        from jobs.queue import enqueue
+        enqueue('inventory.generate_thumbnails', product_id=product_id, image_name=image_name)
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(process_product_image, product_id, image_name)
+    )
@@ -5,13 +5,28 @@ urlpatterns = [
     # Products
     path('', views.product_list, name='product_list'),
     path('products/create/', views.product_create, name='product_create'),
+    path('products/variants/create/', views.product_variant_create, name='product_variant_create'),
     path('products/<int:pk>/', views.product_detail, name='product_detail'),
     path('products/<int:pk>/edit/', views.product_edit, name='product_edit'),
     path('products/<int:pk>/delete/', views.product_delete, name='product_delete'),
+    path('products/<int:pk>/schedule-price/', views.product_schedule_price, name='product_schedule_price'),
 
     # Categories
     path('categories/', views.category_list, name='category_list'),
     path('categories/create/', views.category_create, name='category_create'),
     path('categories/<int:pk>/edit/', views.category_edit, name='category_edit'),
     path('categories/<int:pk>/delete/', views.category_delete, name='category_delete'),
+
+    # Reports
+    path('valuation/', views.stock_valuation, name='stock_valuation'),
+
+    # Price rules
+    path('price-rules/', views.price_rule_list, name='price_rule_list'),
+    path('price-rules/<int:pk>/', views.price_rule_preview, name='price_rule_preview'),
+    path('price-rules/<int:pk>/apply/', views.price_rule_apply, name='price_rule_apply'),
+
+    # API
+    path('api/variants/', views.api_variant_create, name='api_variant_create'),
+    path('api/styles/<str:style_code>/', views.api_style_variants, name='api_style_variants'),
+    path('api/products/sync/', views.api_product_sync, name='api_product_sync'),
 ]
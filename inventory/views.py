@@ -1,34 +1,31 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, require_GET
+from django.views.decorators.gzip import gzip_page
+from django.conf import settings
+from django.http import JsonResponse
 from django.db.models import Q, Sum, F
-from functools import wraps
-from .models import Category, Product
-from .forms import CategoryForm, ProductForm, StockAdjustmentForm
-
-
-def permission_required(permission_attr, redirect_url='dashboard'):
-    """Decorator to check user permissions"""
-    def decorator(view_func):
-        @wraps(view_func)
-        def wrapper(request, *args, **kwargs):
-            user = request.user
-            # Admins have all permissions
-            if user.is_admin():
-                return view_func(request, *args, **kwargs)
-            # Check specific permission
-            if getattr(user, permission_attr, False):
-                return view_func(request, *args, **kwargs)
-            messages.error(request, 'You do not have permission to access this page.')
-            return redirect(redirect_url)
-        return login_required(wrapper)
-    return decorator
+import json
+from datetime import datetime, time
+from decimal import Decimal
+from django.utils import timezone
+from accounts.decorators import permission_required
+from accounts.permissions import has_permission
+from store_project.db_routers import use_replica
+from .models import Category, Product, PriceRule, ProductPrice, RuleAlreadyApplied
+from .forms import (
+    CategoryForm, ProductForm, StockAdjustmentForm, VariantMatrixForm, PriceRuleForm, ScheduledPriceForm
+)
+from .pricing import invalidate_prices, prices_as_of
+from .stock import stock_as_of
+from .sync import InvalidCursor, changes_since, parse_fields
+from .thumbnails import enqueue_thumbnails
 
 
 @login_required
 def product_list(request):
-    if not request.user.can_view_inventory and not request.user.is_admin():
+    if not has_permission(request.user, 'can_view_inventory'):
         messages.error(request, 'You do not have permission to view inventory.')
         return redirect('dashboard')
     
@@ -74,7 +71,8 @@ def product_create(request):
     if request.method == 'POST':
         form = ProductForm(request.POST, request.FILES)
         if form.is_valid():
-            form.save()
+            product = form.save()
+            enqueue_thumbnails(product)
             messages.success(request, 'Product created successfully.')
             return redirect('product_list')
     else:
@@ -83,6 +81,74 @@ def product_create(request):
     return render(request, 'inventory/product_form.html', {'form': form, 'title': 'Add Product'})
 
 
+@permission_required('can_add_product')
+def product_variant_create(request):
+    if request.method == 'POST':
+        form = VariantMatrixForm(request.POST)
+        if form.is_valid():
+            variants = form.save()
+            messages.success(request, f'{len(variants)} variants created for style {variants[0].style_code}.')
+            return redirect('product_list')
+    else:
+        form = VariantMatrixForm()
+
+    return render(request, 'inventory/product_variant_form.html', {'form': form, 'title': 'Add Style Variants'})
+
+
+@permission_required('can_add_product')
+@require_POST
+def api_variant_create(request):
+    """API endpoint to create a size/color variant matrix from one JSON style definition."""
+    try:
+        data = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'errors': {'__all__': ['Invalid JSON body.']}}, status=400)
+
+    form = VariantMatrixForm(data)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+
+    variants = form.save()
+    return JsonResponse({
+        'style_code': variants[0].style_code,
+        'products': [{'id': p.pk, 'sku': p.sku, 'color': p.color, 'size': p.size} for p in variants],
+    }, status=201)
+
+
+@login_required
+@require_GET
+def api_style_variants(request, style_code):
+    """API endpoint listing all variants of a style."""
+    variants = Product.objects.filter(style_code=style_code).order_by('color', 'size').values(
+        'id', 'sku', 'name', 'color', 'size', 'price', 'quantity', 'is_active'
+    )
+    return JsonResponse({
+        'style_code': style_code,
+        'products': [dict(v, price=str(v['price'])) for v in variants],
+    })
+
+
+@permission_required('can_view_inventory')
+@require_GET
+@gzip_page
+def api_product_sync(request):
+    """
+    Delta-sync feed: products changed since ?cursor=, in pages of ?limit=,
+    with optional sparse ?fields=sku,name,price. Omit the cursor for a full load.
+    """
+    try:
+        fields = parse_fields(request.GET.get('fields'))
+        limit = int(request.GET.get('limit', 500))
+        page = changes_since(request.GET.get('cursor') or None, fields, limit)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor.'}, status=400)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    page['media_url'] = settings.MEDIA_URL
+    return JsonResponse(page, json_dumps_params={'separators': (',', ':')})
+
+
 @permission_required('can_edit_product')
 def product_edit(request, pk):
     product = get_object_or_404(Product, pk=pk)
@@ -91,6 +157,8 @@ def product_edit(request, pk):
         form = ProductForm(request.POST, request.FILES, instance=product)
         if form.is_valid():
             form.save()
+            if 'image' in form.changed_data:
+                enqueue_thumbnails(product)
             messages.success(request, 'Product updated successfully.')
             return redirect('product_list')
     else:
@@ -132,13 +200,38 @@ def product_detail(request, pk):
 
     return render(request, 'inventory/product_detail.html', {
         'product': product,
-        'stock_form': stock_form
+        'stock_form': stock_form,
+        'price_form': ScheduledPriceForm(),
+        'price_history': product.price_history.select_related('rule')[:10],
+        'variants': product.get_variants().exclude(pk=product.pk) if product.style_code else [],
     })
 
 
+@permission_required('can_edit_product')
+@require_POST
+def product_schedule_price(request, pk):
+    product = get_object_or_404(Product, pk=pk)
+    form = ScheduledPriceForm(request.POST)
+    if form.is_valid():
+        ProductPrice.objects.create(
+            product=product,
+            price=form.cleaned_data['price'],
+            previous_price=product.price,
+            effective_from=form.cleaned_data['effective_from'],
+            is_applied=False,
+            created_by=request.user,
+        )
+        invalidate_prices([product.pk])
+        messages.success(request, f'Price change to ₹{form.cleaned_data["price"]} scheduled.')
+    else:
+        for errors in form.errors.values():
+            messages.error(request, errors[0])
+    return redirect('product_detail', pk=pk)
+
+
 @login_required
 def category_list(request):
-    if not request.user.can_view_inventory and not request.user.is_admin():
+    if not has_permission(request.user, 'can_view_inventory'):
         messages.error(request, 'You do not have permission to view inventory.')
         return redirect('dashboard')
     
@@ -186,3 +279,91 @@ def category_delete(request, pk):
         category.delete()
         messages.success(request, 'Category deleted successfully.')
     return redirect('category_list')
+
+
+@permission_required('can_edit_product')
+def price_rule_list(request):
+    if request.method == 'POST':
+        form = PriceRuleForm(request.POST)
+        if form.is_valid():
+            rule = form.save(commit=False)
+            rule.created_by = request.user
+            rule.save()
+            return redirect('price_rule_preview', pk=rule.pk)
+    else:
+        form = PriceRuleForm()
+
+    rules = PriceRule.objects.select_related('category', 'created_by')[:50]
+    return render(request, 'inventory/price_rule_list.html', {'form': form, 'rules': rules})
+
+
+@permission_required('can_edit_product')
+def price_rule_preview(request, pk):
+    rule = get_object_or_404(PriceRule, pk=pk)
+    preview = rule.preview()
+    sample = rule.matching_products().annotate(
+        new_price=rule.new_price_expression()
+    ).only('name', 'sku', 'price')[:20]
+
+    return render(request, 'inventory/price_rule_preview.html', {
+        'rule': rule,
+        'preview': preview,
+        'sample': sample,
+    })
+
+
+@permission_required('can_edit_product')
+@require_POST
+def price_rule_apply(request, pk):
+    rule = get_object_or_404(PriceRule, pk=pk)
+    try:
+        count = rule.apply(request.user)
+    except RuleAlreadyApplied:
+        messages.error(request, 'This price rule has already been applied.')
+        return redirect('price_rule_preview', pk=pk)
+    messages.success(request, f'Price rule "{rule.name}" applied to {count} products.')
+    return redirect('price_rule_list')
+
+
+@permission_required('can_view_inventory')
+@use_replica
+def stock_valuation(request):
+    """Stock on hand and its value at the end of a given day."""
+    as_of_date = timezone.localdate()
+    date_str = request.GET.get('date', '')
+    if date_str:
+        try:
+            as_of_date = datetime.strptime(date_str, '%Y-%m-%d').date()
+        except ValueError:
+            messages.error(request, 'Invalid date.')
+    at = min(timezone.make_aware(datetime.combine(as_of_date, time.max)), timezone.now())
+
+    rows = stock_as_of(at).values_list('pk', 'category__name', 'cost_price', 'quantity_as_of')
+    rows = [row for row in rows if row[3]]
+    retail_prices = prices_as_of([row[0] for row in rows], at)
+
+    categories = {}
+    for pk, category_name, cost_price, quantity in rows:
+        summary = categories.setdefault(category_name or 'Uncategorized', {
+            'name': category_name or 'Uncategorized',
+            'products': 0,
+            'quantity': 0,
+            'cost_value': Decimal('0.00'),
+            'retail_value': Decimal('0.00'),
+        })
+        summary['products'] += 1
+        summary['quantity'] += quantity
+        summary['cost_value'] += cost_price * quantity
+        summary['retail_value'] += (retail_prices.get(pk) or 0) * quantity
+
+    categories = sorted(categories.values(), key=lambda c: c['name'])
+    totals = {
+        key: sum(c[key] for c in categories)
+        for key in ('products', 'quantity', 'cost_value', 'retail_value')
+    }
+
+    return render(request, 'inventory/stock_valuation.html', {
+        'as_of_date': as_of_date,
+        'categories': categories,
+        'totals': totals,
+    })
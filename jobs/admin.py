@@ -0,0 +1,10 @@
+from django.contrib import admin
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'task', 'status', 'priority', 'attempts', 'run_at', 'started_at', 'finished_at']
+    list_filter = ['status', 'task']
+    search_fields = ['task', 'locked_by']
+    readonly_fields = ['result', 'last_error', 'locked_by', 'started_at', 'heartbeat_at', 'finished_at', 'created_at']
@@ -0,0 +1,94 @@
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from audit import recorder as audit
+from jobs.queue import claim_job, requeue_stale, run_job
+from store_project.db_pool import release_for_fork
+
+STALE_CHECK_SECONDS = 60
+
+
+def work(name, poll, burst):
+    """Claim and run jobs until told to stop (or, in burst mode, until the queue is empty)."""
+    connections.close_all()
+    stopping = threading.Event()
+    # Finish the current job on SIGTERM/SIGINT instead of dying mid-task
+    signal.signal(signal.SIGTERM, lambda *args: stopping.set())
+    signal.signal(signal.SIGINT, lambda *args: stopping.set())
+
+    last_stale_check = 0
+    while not stopping.is_set():
+        if time.monotonic() - last_stale_check > STALE_CHECK_SECONDS:
+            requeue_stale()
+            last_stale_check = time.monotonic()
+
+        job = claim_job(name)
+        if job is None:
+            if burst:
+                break
+            stopping.wait(poll)
+            continue
+        run_job(job)
+        close_old_connections()
+
+    audit.flush()
+    connections.close_all()
+
+
+class Command(BaseCommand):
+    help = 'Run a pool of background job worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=settings.JOB_WORKERS)
+        parser.add_argument('--poll', type=float, default=settings.JOB_POLL_SECONDS,
+                            help='Seconds to sleep when the queue is empty')
+        parser.add_argument('--burst', action='store_true',
+                            help='Exit once no runnable jobs are left (for cron/CI)')
+
+    def handle(self, *args, **options):
+        prefix = f'{socket.gethostname()}:{os.getpid()}'
+        processes, poll, burst = options['processes'], options['poll'], options['burst']
+
+        if processes <= 1:
+            self.stdout.write(f'Worker {prefix} started.')
+            work(f'{prefix}:0', poll, burst)
+            return
+
+        ctx = multiprocessing.get_context('fork')
+        release_for_fork()
+        stopping = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *args: stopping.set())
+        signal.signal(signal.SIGINT, lambda *args: stopping.set())
+
+        def start(index):
+            process = ctx.Process(target=work, args=(f'{prefix}:{index}', poll, burst), daemon=False)
+            process.start()
+            return process
+
+        workers = {index: start(index) for index in range(processes)}
+        self.stdout.write(f'Started {processes} workers ({prefix}).')
+
+        while not stopping.is_set() and workers:
+            for index, process in list(workers.items()):
+                if process.is_alive():
+                    continue
+                if burst:
+                    del workers[index]
+                else:
+                    self.stderr.write(f'Worker {index} exited with {process.exitcode}; restarting.')
+                    workers[index] = start(index)
+            stopping.wait(1)
+
+        for process in workers.values():
+            process.terminate()
+        for process in workers.values():
+            process.join()
+        self.stdout.write('Workers stopped.')
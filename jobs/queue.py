@@ -0,0 +1,154 @@
+"""
+PostgreSQL-backed job queue.
+
+Tasks are plain functions registered with @task and enqueued by name with
+JSON-serialisable keyword arguments. ``run_workers`` processes claim jobs
+one at a time with SELECT ... FOR UPDATE SKIP LOCKED, so any number of
+workers can poll the same table without blocking each other or needing an
+external broker. Failed jobs are retried with exponential backoff until
+max_attempts is reached.
+
+While a job runs, a thread in its worker touches heartbeat_at. Only jobs
+whose heartbeat has gone stale are re-queued, so a slow but healthy job is
+never started a second time alongside itself.
+"""
+import logging
+import threading
+import traceback
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry = {}
+
+
+def task(name):
+    """Register a function as a background task: @task('inventory.snapshot_stock')."""
+    def decorator(func):
+        _registry[name] = func
+        func.task_name = name
+        return func
+    return decorator
+
+
+def get_task(name):
+    return _registry[name]
+
+
+def registered_tasks():
+    return sorted(_registry)
+
+
+def enqueue(task_name, priority=0, run_at=None, max_attempts=3, created_by=None, **kwargs):
+    """Queue a job. Inside a transaction it only becomes visible once committed."""
+    if callable(task_name):
+        task_name = task_name.task_name
+    if task_name not in _registry:
+        raise KeyError(f'Unknown task: {task_name}')
+    return Job.objects.create(
+        task=task_name,
+        kwargs=kwargs,
+        priority=priority,
+        run_at=run_at or timezone.now(),
+        max_attempts=max_attempts,
+        created_by=created_by,
+    )
+
+
+def claim_job(worker_name):
+    """Lock and mark the next runnable job as running, or return None."""
+    with transaction.atomic():
+        job = (
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', run_at__lte=timezone.now())
+            .order_by('-priority', 'run_at', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = 'running'
+        job.attempts += 1
+        job.locked_by = worker_name
+        job.started_at = job.heartbeat_at = timezone.now()
+        job.finished_at = None
+        job.save(update_fields=['status', 'attempts', 'locked_by', 'started_at', 'heartbeat_at', 'finished_at'])
+        return job
+
+
+@contextmanager
+def heartbeat(job, interval=None):
+    """Touch the job's heartbeat_at from a background thread until the block exits."""
+    interval = interval or settings.JOB_HEARTBEAT_SECONDS
+    done = threading.Event()
+
+    def beat():
+        try:
+            while not done.wait(interval):
+                try:
+                    Job.objects.filter(pk=job.pk, status='running', locked_by=job.locked_by).update(
+                        heartbeat_at=timezone.now()
+                    )
+                except Exception:
+                    logger.warning('Heartbeat for job %s failed', job.pk, exc_info=True)
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=beat, name=f'job-{job.pk}-heartbeat', daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        done.set()
+        thread.join()
+
+
+def retry_delay(attempts):
+    return timedelta(seconds=settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+
+
+def run_job(job):
+    """Execute a claimed job and record the outcome."""
+    try:
+        with heartbeat(job):
+            result = get_task(job.task)(**job.kwargs)
+    except Exception:
+        error = traceback.format_exc()
+        logger.exception('Job %s (%s) failed on attempt %s', job.pk, job.task, job.attempts)
+        job.last_error = error[-10000:]
+        job.finished_at = timezone.now()
+        if job.attempts < job.max_attempts:
+            job.status = 'queued'
+            job.run_at = job.finished_at + retry_delay(job.attempts)
+        else:
+            job.status = 'failed'
+        job.save(update_fields=['status', 'run_at', 'last_error', 'finished_at'])
+        return False
+
+    job.status = 'succeeded'
+    job.result = result if isinstance(result, (dict, list, str, int, float, bool)) else None
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'finished_at'])
+    return True
+
+
+def requeue_stale(timeout=None):
+    """
+    Put back jobs whose worker died mid-run, i.e. whose heartbeat stopped.
+    Jobs that have used up their attempts are marked failed instead.
+    """
+    timeout = timeout or timedelta(seconds=settings.JOB_HEARTBEAT_TIMEOUT_SECONDS)
+    stale = Job.objects.filter(status='running', heartbeat_at__lt=timezone.now() - timeout)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', last_error='Worker stopped responding', finished_at=timezone.now()
+    )
+    requeued = stale.update(status='queued', locked_by='', run_at=timezone.now())
+    return requeued, failed
+
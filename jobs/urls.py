@@ -0,0 +1,7 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('', views.job_list, name='job_list'),
+    path('<int:pk>/retry/', views.job_retry, name='job_retry'),
+]
@@ -0,0 +1,46 @@
+from django.contrib import messages
+from django.core.paginator import Paginator
+from django.db.models import Count, Min
+from django.shortcuts import get_object_or_404, redirect, render
+from django.utils import timezone
+from django.views.decorators.http import require_POST
+
+from accounts.decorators import admin_required
+from .models import Job
+
+
+@admin_required
+def job_list(request):
+    jobs = Job.objects.select_related('created_by')
+    status = request.GET.get('status', '')
+    task = request.GET.get('task', '')
+    if status:
+        jobs = jobs.filter(status=status)
+    if task:
+        jobs = jobs.filter(task=task)
+
+    counts = dict(Job.objects.values_list('status').annotate(n=Count('id')))
+    oldest_ready = Job.objects.filter(status='queued', run_at__lte=timezone.now()).aggregate(
+        oldest=Min('run_at')
+    )['oldest']
+
+    return render(request, 'jobs/job_list.html', {
+        'page': Paginator(jobs, 50).get_page(request.GET.get('page')),
+        'status_counts': [(value, label, counts.get(value, 0)) for value, label in Job.STATUS_CHOICES],
+        'queue_lag': timezone.now() - oldest_ready if oldest_ready else None,
+        'tasks': Job.objects.order_by('task').values_list('task', flat=True).distinct(),
+        'selected_status': status,
+        'selected_task': task,
+    })
+
+
+@admin_required
+@require_POST
+def job_retry(request, pk):
+    job = get_object_or_404(Job, pk=pk, status='failed')
+    job.status = 'queued'
+    job.attempts = 0
+    job.run_at = timezone.now()
+    job.save(update_fields=['status', 'attempts', 'run_at'])
+    messages.success(request, f'Job #{job.pk} queued again.')
+    return redirect('job_list')
@@ -0,0 +1,69 @@
+"""
+Database connection reuse: helpers and per-process metrics.
+
+Connections are either pooled (DB_POOL=true, psycopg 3 pool) or persistent
+per worker thread (CONN_MAX_AGE with CONN_HEALTH_CHECKS). Both avoid a
+fresh TCP/TLS handshake per request; the numbers here show whether that is
+actually happening and how long requests wait for a pooled connection.
+"""
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+_opened = Counter()
+_started = time.monotonic()
+
+
+@receiver(connection_created)
+def count_connection(sender, connection, **kwargs):
+    _opened[connection.alias] += 1
+
+
+def existing_pool(connection):
+    """The alias's psycopg pool if one has been created, without creating it."""
+    return getattr(type(connection), '_connection_pools', {}).get(connection.alias)
+
+
+def release_for_fork():
+    """
+    Close connections and pools before forking worker processes. Sockets
+    must not be shared with children; each process opens its own.
+    """
+    connections.close_all()
+    for connection in connections.all():
+        if existing_pool(connection) is not None:
+            connection.close_pool()
+
+
+def connection_mode(settings_dict):
+    if settings_dict['OPTIONS'].get('pool'):
+        return 'pool'
+    if settings_dict['CONN_MAX_AGE']:
+        return 'persistent'
+    return 'per request'
+
+
+def connection_stats():
+    uptime = time.monotonic() - _started
+    stats = []
+    for alias in settings.DATABASES:
+        connection = connections[alias]
+        pool = existing_pool(connection)
+        pool_stats = pool.get_stats() if pool is not None else {}
+        requests = pool_stats.get('requests_num', 0)
+        stats.append({
+            'alias': alias,
+            'mode': connection_mode(connection.settings_dict),
+            'max_age': connection.settings_dict['CONN_MAX_AGE'],
+            'health_checks': connection.settings_dict['CONN_HEALTH_CHECKS'],
+            # With a pool this counts checkouts, otherwise real new connections
+            'opened': _opened[alias],
+            'opened_per_minute': _opened[alias] / uptime * 60 if uptime else 0,
+            'pool': pool_stats,
+            'avg_wait_ms': pool_stats.get('requests_wait_ms', 0) / requests if requests else 0,
+        })
+    return stats
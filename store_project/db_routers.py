@@ -0,0 +1,120 @@
+"""
+Read-replica routing for reporting traffic.
+
+Only views wrapped in @use_replica read from a replica; everything else,
+including checkout and stock changes, stays on the primary. A client that
+has just written something is pinned to the primary for
+REPLICA_STICKY_SECONDS (via a cookie set by ReplicaStickinessMiddleware) so
+it always sees its own writes. Replicas lagging more than
+REPLICA_MAX_LAG_SECONDS, or that cannot be reached, are skipped and reads
+fall back to the primary. A request reads from one replica throughout, so
+a page and its count never come from replicas with different lag; querysets
+evaluated after the view returns (streamed exports) bind to it with
+.using(read_alias()).
+"""
+import contextvars
+import logging
+import random
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'pin_primary'
+
+_replica = contextvars.ContextVar('replica', default=None)
+_lag_cache = {}
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica')]
+
+
+def replica_lag(alias):
+    """Seconds the replica is behind the primary (0 if it has replayed everything)."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+        )
+        return float(cursor.fetchone()[0] or 0)
+
+
+def replica_is_fresh(alias):
+    """Cached per process for REPLICA_LAG_CHECK_SECONDS to keep the check off the hot path."""
+    checked_at, fresh = _lag_cache.get(alias, (0, False))
+    if time.monotonic() - checked_at < settings.REPLICA_LAG_CHECK_SECONDS:
+        return fresh
+    try:
+        fresh = replica_lag(alias) <= settings.REPLICA_MAX_LAG_SECONDS
+    except DatabaseError:
+        logger.warning('Replica %s is unreachable; reading from the primary', alias, exc_info=True)
+        connections[alias].close()
+        fresh = False
+    _lag_cache[alias] = (time.monotonic(), fresh)
+    return fresh
+
+
+def healthy_replicas():
+    return [alias for alias in replica_aliases() if replica_is_fresh(alias)]
+
+
+def read_alias():
+    """The database this request reads from: its replica under @use_replica, else the primary."""
+    return _replica.get() or 'default'
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        return _replica.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
+
+
+def use_replica(view_func):
+    """Serve this read-only view from a replica unless the client was just pinned to the primary."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or PIN_COOKIE in request.COOKIES:
+            return view_func(request, *args, **kwargs)
+        replicas = healthy_replicas()
+        if not replicas:
+            return view_func(request, *args, **kwargs)
+        token = _replica.set(random.choice(replicas))
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _replica.reset(token)
+    return wrapper
+
+
+class ReplicaStickinessMiddleware:
+    """After any mutating request, keep the client on the primary for a few seconds."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') and replica_aliases():
+            response.set_cookie(
+                PIN_COOKIE, '1',
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -0,0 +1,160 @@
+"""
+Per-request SQL and template instrumentation.
+
+RequestInstrumentationMiddleware counts queries, database time, template
+time and repeated SQL for every request, reports them in a Server-Timing
+header and logs requests over the configured thresholds as one JSON line.
+Recent timings are kept per endpoint in memory for the performance page.
+"""
+import json
+import logging
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+from statistics import quantiles
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger('store_project.requests')
+
+_current_stats = ContextVar('request_stats', default=None)
+
+# endpoint -> deque of (duration_ms, query_count)
+_endpoint_samples = defaultdict(lambda: deque(maxlen=getattr(settings, 'REQUEST_STATS_SAMPLES', 500)))
+_samples_lock = threading.Lock()
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'template_time', 'template_db_time', 'template_depth', 'sql_counts')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_db_time = 0.0
+        self.template_depth = 0
+        self.sql_counts = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        """connection.execute_wrapper hook."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += elapsed
+            if self.template_depth:
+                self.template_db_time += elapsed
+            self.sql_counts[sql] += 1
+
+    @property
+    def duplicate_queries(self):
+        """Queries whose SQL text already ran in this request (N+1 patterns)."""
+        return self.queries - len(self.sql_counts)
+
+
+def _instrumented_render(render):
+    def wrapper(self, context):
+        stats = _current_stats.get()
+        if stats is None:
+            return render(self, context)
+        # Only the outermost render is timed; includes are part of it
+        stats.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            stats.template_depth -= 1
+            if not stats.template_depth:
+                stats.template_time += time.perf_counter() - start
+    wrapper.instrumented = True
+    return wrapper
+
+
+def endpoint_report():
+    """Per-endpoint request count, p50/p95 latency and query counts, slowest first."""
+    with _samples_lock:
+        samples = {endpoint: list(values) for endpoint, values in _endpoint_samples.items()}
+
+    report = []
+    for endpoint, values in samples.items():
+        durations = sorted(v[0] for v in values)
+        query_counts = [v[1] for v in values]
+        if len(durations) > 1:
+            cuts = quantiles(durations, n=100, method='inclusive')
+            p50, p95 = cuts[49], cuts[94]
+        else:
+            p50 = p95 = durations[0]
+        report.append({
+            'endpoint': endpoint,
+            'requests': len(durations),
+            'p50_ms': p50,
+            'p95_ms': p95,
+            'max_ms': durations[-1],
+            'avg_queries': sum(query_counts) / len(query_counts),
+            'max_queries': max(query_counts),
+        })
+    return sorted(report, key=lambda r: r['p95_ms'], reverse=True)
+
+
+class RequestInstrumentationMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_INSTRUMENTATION', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_ms = getattr(settings, 'SLOW_REQUEST_MS', 500)
+        self.slow_queries = getattr(settings, 'SLOW_REQUEST_QUERIES', 50)
+        if not getattr(Template.render, 'instrumented', False):
+            Template.render = _instrumented_render(Template.render)
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current_stats.set(stats)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats))
+                response = self.get_response(request)
+        finally:
+            _current_stats.reset(token)
+        total_ms = (time.perf_counter() - start) * 1000
+
+        db_ms = stats.db_time * 1000
+        template_ms = (stats.template_time - stats.template_db_time) * 1000
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db_ms:.1f};desc="{stats.queries} queries"',
+            f'tpl;dur={template_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ])
+
+        match = request.resolver_match
+        endpoint = match.view_name if match else 'unresolved'
+        with _samples_lock:
+            _endpoint_samples[endpoint].append((total_ms, stats.queries))
+
+        if total_ms >= self.slow_ms or stats.queries >= self.slow_queries:
+            logger.warning(json.dumps({
+                'event': 'slow_request',
+                'method': request.method,
+                'path': request.path,
+                'endpoint': endpoint,
+                'status': response.status_code,
+                'total_ms': round(total_ms, 1),
+                'db_ms': round(db_ms, 1),
+                'template_ms': round(template_ms, 1),
+                'queries': stats.queries,
+                'duplicate_queries': stats.duplicate_queries,
+                'top_repeated_sql': [
+                    {'sql': sql[:300], 'count': count}
+                    for sql, count in stats.sql_counts.most_common(3)
+                    if count > 1
+                ],
+            }))
+        return response
@@ -0,0 +1,176 @@
+"""
+On-demand profiling of single requests.
+
+An admin adds ``?_profile=1`` to a URL (or sends the signed X-Profile-Token
+header from the profiles page, for API clients) and that one request runs
+under cProfile. The stats are written to PROFILE_DIR together with a small
+JSON file of endpoint/timing metadata, browsable from the dashboard.
+"""
+import cProfile
+import json
+import os
+import pstats
+import re
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils import timezone
+from django.utils.text import slugify
+
+PROFILE_QUERY_PARAM = '_profile'
+PROFILE_HEADER = 'HTTP_X_PROFILE_TOKEN'
+TOKEN_SALT = 'store_project.profiling'
+PROFILE_NAME_RE = re.compile(r'^[\w-]+$')
+
+
+def profile_dir():
+    return Path(getattr(settings, 'PROFILE_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def make_profile_token(user):
+    """Signed token an admin can send as X-Profile-Token."""
+    return signing.dumps({'user': user.pk}, salt=TOKEN_SALT)
+
+
+def _token_user_id(token):
+    try:
+        data = signing.loads(token, salt=TOKEN_SALT, max_age=getattr(settings, 'PROFILE_TOKEN_MAX_AGE', 86400))
+    except signing.BadSignature:
+        return None
+    return data.get('user')
+
+
+def should_profile(request):
+    user = getattr(request, 'user', None)
+    if not user or not user.is_authenticated or not user.is_admin():
+        return False
+    if request.GET.get(PROFILE_QUERY_PARAM) == '1':
+        return True
+    token = request.META.get(PROFILE_HEADER)
+    return bool(token) and _token_user_id(token) == user.pk
+
+
+def save_profile(profiler, request, response, duration_ms):
+    directory = profile_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    match = request.resolver_match
+    endpoint = match.view_name if match else 'unresolved'
+    created = timezone.now()
+    name = f"{created:%Y%m%d-%H%M%S-%f}-{slugify(endpoint) or 'request'}"
+
+    profiler.dump_stats(directory / f'{name}.prof')
+    meta = {
+        'name': name,
+        'endpoint': endpoint,
+        'method': request.method,
+        'path': request.get_full_path(),
+        'status': response.status_code,
+        'user': request.user.username,
+        'duration_ms': round(duration_ms, 1),
+        'created': created.isoformat(),
+    }
+    (directory / f'{name}.json').write_text(json.dumps(meta))
+    prune_profiles(directory)
+    return name
+
+
+def prune_profiles(directory):
+    keep = getattr(settings, 'PROFILE_KEEP', 200)
+    metas = sorted(directory.glob('*.json'), key=os.path.getmtime, reverse=True)
+    for meta_path in metas[keep:]:
+        meta_path.with_suffix('.prof').unlink(missing_ok=True)
+        meta_path.unlink(missing_ok=True)
+
+
+def list_profiles(limit=100):
+    """Recent profiles' metadata, slowest first."""
+    directory = profile_dir()
+    if not directory.exists():
+        return []
+    paths = sorted(directory.glob('*.json'), key=os.path.getmtime, reverse=True)[:limit]
+    profiles = [json.loads(path.read_text()) for path in paths]
+    return sorted(profiles, key=lambda p: p['duration_ms'], reverse=True)
+
+
+def load_profile(name):
+    """Return (metadata, pstats.Stats) or None for an unknown/invalid name."""
+    if not PROFILE_NAME_RE.match(name):
+        return None
+    directory = profile_dir()
+    meta_path, prof_path = directory / f'{name}.json', directory / f'{name}.prof'
+    if not meta_path.exists() or not prof_path.exists():
+        return None
+    return json.loads(meta_path.read_text()), pstats.Stats(str(prof_path))
+
+
+def _label(func):
+    filename, line, name = func
+    if filename == '~':
+        return name
+    parts = Path(filename).parts
+    return f"{'/'.join(parts[-2:])}:{line}({name})"
+
+
+def top_functions(stats, limit=40):
+    """Functions sorted by cumulative time."""
+    rows = []
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        rows.append({'function': _label(func), 'ncalls': nc, 'tottime': tt * 1000, 'cumtime': ct * 1000})
+    rows.sort(key=lambda r: r['cumtime'], reverse=True)
+    return rows[:limit]
+
+
+def call_tree(stats, max_depth=12, min_fraction=0.01, max_rows=500):
+    """
+    Flatten the caller/callee graph into icicle rows (depth, label, ms, %)
+    so the template can draw flamegraph-style bars. cProfile only records
+    caller->callee edges, so time under a node is the edge's cumulative time.
+    """
+    callees = {}
+    for func, (cc, nc, tt, ct, callers) in stats.stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    if not stats.stats:
+        return []
+    # The middleware chain calls itself recursively, so the entry point is
+    # simply the function with the largest cumulative time
+    root = max(stats.stats.items(), key=lambda item: item[1][3])
+    total = root[1][3] or 1
+    rows = []
+
+    def visit(func, cumtime, depth, path):
+        fraction = cumtime / total
+        if fraction < min_fraction or depth > max_depth or len(rows) >= max_rows:
+            return
+        rows.append({'depth': depth, 'function': _label(func), 'ms': cumtime * 1000, 'percent': fraction * 100})
+        for child, child_time in sorted(callees.get(func, []), key=lambda c: c[1], reverse=True):
+            if child not in path:
+                visit(child, child_time, depth + 1, path | {child})
+
+    visit(root[0], root[1][3], 0, {root[0]})
+    return rows
+
+
+class RequestProfilerMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'REQUEST_PROFILING', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not should_profile(request):
+            return self.get_response(request)
+
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        response = profiler.runcall(self.get_response, request)
+        duration_ms = (time.perf_counter() - start) * 1000
+
+        name = save_profile(profiler, request, response, duration_ms)
+        response['X-Profile-Id'] = name
+        return response
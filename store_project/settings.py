@@ -18,25 +18,43 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'accounts',
     'inventory',
     'billing',
     'dashboard',
+    'audit',
+    'jobs',
 ]
 
 MIDDLEWARE = [
+    'store_project.instrumentation.RequestInstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'accounts.permissions.CachedAuthenticationMiddleware',
+    'store_project.profiling.RequestProfilerMiddleware',
+    'audit.middleware.AuditContextMiddleware',
+    'store_project.db_routers.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
 ROOT_URLCONF = 'store_project.urls'
 
+# Per-request query/template timing (Server-Timing header + slow request log)
+REQUEST_INSTRUMENTATION = os.environ.get('REQUEST_INSTRUMENTATION', 'True').lower() == 'true'
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', '500'))
+SLOW_REQUEST_QUERIES = int(os.environ.get('SLOW_REQUEST_QUERIES', '50'))
+REQUEST_STATS_SAMPLES = 500
+
+# Admin-only, opt-in cProfile of single requests (?_profile=1 or X-Profile-Token)
+REQUEST_PROFILING = os.environ.get('REQUEST_PROFILING', 'True').lower() == 'true'
+PROFILE_DIR = Path(os.environ.get('PROFILE_DIR', BASE_DIR / 'profiles'))
+PROFILE_KEEP = 200
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -48,6 +66,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'accounts.context_processors.permissions',
             ],
         },
     },
@@ -67,6 +86,47 @@ DATABASES = {
     }
 }
 
+# Connection reuse. DB_POOL=true uses a psycopg 3 pool per worker process
+# (size it so gunicorn workers x DB_POOL_MAX_SIZE stays under the server's
+# max_connections); otherwise each worker thread keeps one persistent
+# connection for DB_CONN_MAX_AGE seconds. Either way connections are
+# health-checked before use.
+if os.environ.get('DB_POOL', 'False').lower() == 'true':
+    from psycopg_pool import ConnectionPool
+
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '1')),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '4')),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+            'max_idle': 300,
+            'max_lifetime': 1800,
+            'check': ConnectionPool.check_connection,
+        },
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', '600'))
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Read replicas for reporting views: DB_REPLICA_HOSTS=host[:port][/name],...
+# Views opt in with store_project.db_routers.use_replica.
+for index, replica in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(','))):
+    address, _, name = replica.strip().partition('/')
+    host, _, port = address.partition(':')
+    DATABASES[f'replica_{index}'] = {
+        **DATABASES['default'],
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'NAME': name or DATABASES['default']['NAME'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['store_project.db_routers.ReplicaRouter']
+REPLICA_MAX_LAG_SECONDS = float(os.environ.get('REPLICA_MAX_LAG_SECONDS', '5'))
+REPLICA_LAG_CHECK_SECONDS = 5
+# How long a client reads from the primary after its own write
+REPLICA_STICKY_SECONDS = 10
+
 AUTH_PASSWORD_VALIDATORS = [
     {'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator'},
     {'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator'},
@@ -94,6 +154,74 @@ else:
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Product thumbnails are generated in a background thread pool
+THUMBNAIL_WORKERS = int(os.environ.get('THUMBNAIL_WORKERS', '2'))
+# 'threads' resizes in the web process, 'jobs' hands it to run_workers
+THUMBNAIL_QUEUE = os.environ.get('THUMBNAIL_QUEUE', 'threads')
+# Thumbnail names are content hashes, so they can be cached "forever"
+THUMBNAIL_CACHE_MAX_AGE = 60 * 60 * 24 * 365
+
+# Rendered invoice PDFs/receipts; kept outside MEDIA_ROOT so they are never public
+INVOICE_DOCUMENT_ROOT = os.environ.get('INVOICE_DOCUMENT_ROOT', str(BASE_DIR / 'documents'))
+INVOICE_DOCUMENT_WORKERS = int(os.environ.get('INVOICE_DOCUMENT_WORKERS', '2'))
+# 'threads' renders in the web process, 'jobs' hands it to run_workers
+INVOICE_DOCUMENT_QUEUE = os.environ.get('INVOICE_DOCUMENT_QUEUE', 'threads')
+
+# Shared cache for sessions, users and permission bitsets. Without REDIS_URL
+# every process has its own LocMem cache, so sessions stay DB-backed and user
+# caching is off; otherwise logouts and permission changes could go stale
+# in other workers.
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+USER_CACHE_SECONDS = int(os.environ.get('USER_CACHE_SECONDS', '300' if REDIS_URL else '0'))
+# Checkout price cache per worker; invalidated across workers through the shared cache
+PRICE_CACHE_SECONDS = int(os.environ.get('PRICE_CACHE_SECONDS', '60' if REDIS_URL else '0'))
+
+# Audit entries are queued in-process and bulk-written by a background thread
+AUDIT_ASYNC = os.environ.get('AUDIT_ASYNC', 'True').lower() == 'true'
+AUDIT_QUEUE_SIZE = 10000
+AUDIT_BATCH_SIZE = 500
+AUDIT_FLUSH_SECONDS = 1.0
+# Entries that still fail to write after retries are appended here as JSON lines
+AUDIT_DEAD_LETTER_FILE = os.environ.get('AUDIT_DEAD_LETTER_FILE', str(BASE_DIR / 'audit_dead_letter.jsonl'))
+
+# Offline POS uploads: invoices per request, and per transaction
+POS_SYNC_MAX_INVOICES = 2000
+POS_SYNC_CHUNK_SIZE = 100
+
+# Loyalty: one point per LOYALTY_SPEND_PER_POINT rupees paid, times the tier
+# multiplier; a redeemed point is worth LOYALTY_POINT_VALUE rupees off.
+# Tiers are (name, lifetime points, multiplier), highest first.
+LOYALTY_SPEND_PER_POINT = 100
+LOYALTY_POINT_VALUE = '1.00'
+LOYALTY_TIERS = [
+    ('Gold', 5000, '1.5'),
+    ('Silver', 1000, '1.25'),
+    ('Bronze', 0, '1'),
+]
+
+# Background jobs (manage.py run_workers)
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+JOB_POLL_SECONDS = 1.0
+JOB_RETRY_BASE_SECONDS = 30
+# Workers touch a running job's heartbeat this often; jobs whose heartbeat is
+# older than the timeout are assumed to have lost their worker and re-queued
+JOB_HEARTBEAT_SECONDS = 30
+JOB_HEARTBEAT_TIMEOUT_SECONDS = 5 * 60
+
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'accounts.CustomUser'
@@ -101,3 +229,20 @@ AUTH_USER_MODEL = 'accounts.CustomUser'
 LOGIN_URL = 'login'
 LOGIN_REDIRECT_URL = 'dashboard'
 LOGOUT_REDIRECT_URL = 'login'
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'store_project.requests': {
+            'handlers': ['console'],
+            'level': os.environ.get('REQUEST_LOG_LEVEL', 'WARNING'),
+            'propagate': False,
+        },
+    },
+}
@@ -1,7 +1,11 @@
+import re
+
 from django.contrib import admin
-from django.urls import path, include
+from django.urls import include, path, re_path
 from django.conf import settings
 from django.conf.urls.static import static
+from django.views.decorators.cache import cache_control
+from django.views.static import serve
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -9,6 +13,19 @@ urlpatterns = [
     path('accounts/', include('accounts.urls')),
     path('inventory/', include('inventory.urls')),
     path('billing/', include('billing.urls')),
+    path('audit/', include('audit.urls')),
+    path('jobs/', include('jobs.urls')),
+]
+
+# Content-hashed thumbnails never change, so let browsers keep them. Nothing
+# else serves media on the Render/Vercel deployments, so Django serves these
+# in production too; with immutable caching each client fetches one once.
+urlpatterns += [
+    re_path(
+        r'^%s(?P<path>.*)$' % re.escape(settings.MEDIA_URL.lstrip('/') + 'products/thumbs/'),
+        cache_control(max_age=settings.THUMBNAIL_CACHE_MAX_AGE, public=True, immutable=True)(serve),
+        {'document_root': settings.MEDIA_ROOT / 'products' / 'thumbs'},
+    ),
 ]
 
 if settings.DEBUG: